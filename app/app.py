@@ -5,17 +5,16 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
                              QCheckBox, QSpinBox, QMessageBox)
 from PyQt5.QtGui import QPainter, QColor, QBrush
 from PyQt5.QtCore import Qt, QRect, QTimer, QDateTime
-import matplotlib.pyplot as plt
-from scapy.all import sniff, IP, TCP
-from collections import defaultdict, deque
-import threading
-import datetime
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
 import encoder.network_noise_generator as network_noise_generator  # Import the noise generation module
 
 # Import your backend modules
 import encoder.encoder as encoder
 import decoder.decoder as decoder
 import encoder.stego_utils as stego_utils
+import encoder.planner as planner
+from encoder.monitor import PacketRateCounter, PacketMonitor, build_monitor_filter
 
 class PacketVisualization(QWidget):
     def __init__(self, parent=None):
@@ -47,6 +46,51 @@ class PacketVisualization(QWidget):
         self.selected_headers = headers
         self.update()
 
+class PacketRatePlot(FigureCanvasQTAgg):
+    """Embedded packets-per-second plot of a PacketRateCounter, updated with blitting.
+
+    The axes are drawn once and cached; each refresh only restores that
+    background and redraws the line. A full redraw happens only when the
+    y range has to change.
+    """
+
+    def __init__(self, counter, parent=None):
+        self.figure = Figure(figsize=(5, 2.5), tight_layout=True)
+        super().__init__(self.figure)
+        self.setParent(parent)
+        self.counter = counter
+        self.axes = self.figure.add_subplot(111)
+        self.axes.set_xlim(-counter.size + 1, 0)
+        self.axes.set_ylim(0, 10)
+        self.axes.set_xlabel('Seconds ago')
+        self.axes.set_ylabel('Packets per second')
+        self.axes.set_title('Number of Packets Over Time')
+        self.axes.grid(True)
+        # Animated artists are left out of full draws and drawn over the cached background
+        self.line, = self.axes.plot(range(-counter.size + 1, 1), [0] * counter.size, linestyle='-', color='blue', animated=True)
+        self.background = None
+        self.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        self.background = self.copy_from_bbox(self.axes.bbox)
+        self.axes.draw_artist(self.line)
+
+    def refresh(self):
+        counts = self.counter.series()
+        self.line.set_ydata(counts)
+        peak = max(counts)
+        top = self.axes.get_ylim()[1]
+        if peak > top or (top > 10 and peak < top / 4):
+            self.axes.set_ylim(0, max(10, peak * 1.25))
+            self.draw()
+            return
+        if self.background is None:
+            self.draw()
+            return
+        self.restore_region(self.background)
+        self.axes.draw_artist(self.line)
+        self.blit(self.axes.bbox)
+
 class SteganographyApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -65,16 +109,12 @@ class SteganographyApp(QMainWindow):
         header_layout = QVBoxLayout(header_group)
         self.header_checkboxes = {}
         self.header_spinboxes = {}
-        headers = {
-            'ipid': 16, 'ttl': 8, 'window': 16, 'tcp_reserved': 4,
-            'tcp_options': 320, 'ip_options': 320, 'user_agent': 8
-        }
-        for header, max_bits in headers.items():
+        for header, max_bits in planner.FIELD_CAPACITY.items():
             row = QHBoxLayout()
             checkbox = QCheckBox(header)
             spinbox = QSpinBox()
             spinbox.setRange(0, max_bits)
-            spinbox.setSingleStep(8)
+            spinbox.setSingleStep(8 if header in planner.BYTE_FIELDS else 1)
             spinbox.setEnabled(False)
             spinbox.setToolTip(f"Maximum bits: {max_bits}")
             checkbox.setToolTip(f"Select this field (Max bits: {max_bits})")
@@ -86,6 +126,33 @@ class SteganographyApp(QMainWindow):
             header_layout.addLayout(row)
             self.header_checkboxes[header] = checkbox
             self.header_spinboxes[header] = spinbox
+        plan_row = QHBoxLayout()
+        self.budget_input = QSpinBox()
+        self.budget_input.setRange(0, 1000)  # Summed planner.field_cost of the allocation
+        self.budget_input.setValue(40)
+        self.budget_input.setToolTip("Stealth budget: higher allows more conspicuous fields and bits")
+        self.plan_button = QPushButton("Plan Allocation")
+        self.plan_button.clicked.connect(self.plan_allocation)
+        plan_row.addWidget(QLabel("Stealth Budget:"))
+        plan_row.addWidget(self.budget_input)
+        plan_row.addWidget(self.plan_button)
+        header_layout.addLayout(plan_row)
+        seq_row = QHBoxLayout()
+        self.seq_bits_input = QSpinBox()
+        self.seq_bits_input.setRange(0, 32)  # 0 disables in-band sequence numbers
+        self.seq_bits_input.setToolTip("Bits of each packet reserved for its sequence number, so the decoder can reorder and detect losses")
+        seq_row.addWidget(QLabel("Sequence Bits:"))
+        seq_row.addWidget(self.seq_bits_input)
+        header_layout.addLayout(seq_row)
+        fec_row = QHBoxLayout()
+        self.fec_input = QSpinBox()
+        self.fec_input.setRange(0, 100)  # Parity packets as a percentage of data packets; needs sequence bits
+        self.fec_input.setToolTip("Reed-Solomon parity packets added per block of 32 data packets, in percent")
+        fec_row.addWidget(QLabel("FEC Redundancy (%):"))
+        fec_row.addWidget(self.fec_input)
+        header_layout.addLayout(fec_row)
+        self.compression_checkbox = QCheckBox("Compress Payload (picks the smallest codec per message)")
+        header_layout.addWidget(self.compression_checkbox)
         left_panel.addWidget(header_group)
         
         # Destination Settings
@@ -120,9 +187,16 @@ class SteganographyApp(QMainWindow):
         self.delay_input.setValue(1)  # Default delay value
         self.delay_input.setEnabled(False)  # Disabled by default
         self.delay_checkbox.stateChanged.connect(lambda state: self.delay_input.setEnabled(state == Qt.Checked))
+        self.burst_input = QSpinBox()
+        self.burst_input.setRange(1, 1000)  # Packets allowed back-to-back by the token bucket
+        self.burst_input.setValue(1)
+        self.burst_mode_checkbox = QCheckBox("Burst Mode (send pre-built batches back-to-back)")
         delay_layout.addWidget(self.delay_checkbox)
         delay_layout.addWidget(QLabel("Delay Period (seconds):"))
         delay_layout.addWidget(self.delay_input)
+        delay_layout.addWidget(QLabel("Burst Size (packets):"))
+        delay_layout.addWidget(self.burst_input)
+        delay_layout.addWidget(self.burst_mode_checkbox)
         left_panel.addWidget(delay_group)
 
         # Noise Generation Checkbox
@@ -141,11 +215,13 @@ class SteganographyApp(QMainWindow):
         main_layout.addLayout(left_panel)
         main_layout.addLayout(right_panel)
 
-        self.packet_times = deque()
-        self.monitoring = False
-        self.monitor_thread = None
+        # Packets per second over the last 5 minutes
+        self.packet_rate = PacketRateCounter(300)
+        self.rate_plot = PacketRatePlot(self.packet_rate, self)
+        right_panel.addWidget(self.rate_plot)
+        self.monitor = None
         self.update_timer = QTimer(self)
-        self.update_timer.timeout.connect(self.plot_packet_counts_over_time)
+        self.update_timer.timeout.connect(self.update_packet_rate)
 
         # Send Button
         self.send_button = QPushButton("Send")
@@ -174,13 +250,25 @@ class SteganographyApp(QMainWindow):
             destination_ip = self.ip_input.text()
             destination_port = int(self.port_input.text())
 
-            stego_utils.save_to_config(destination_ip, destination_port, selected_headers)
+            stego_utils.save_to_config(destination_ip, destination_port, selected_headers, self.seq_bits_input.value(), self.fec_input.value() / 100, compression=self.compression_setting())
             QMessageBox.information(self, "Success", "Configurations saved successfully!")
             self.status_label.setText("Configurations saved successfully!")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save configurations: {str(e)}")
             self.status_label.setText(f"Error: {str(e)}")
 
+    def plan_allocation(self):
+        """Fill in the header fields with the planner's best allocation for the stealth budget."""
+        allocation = dict(planner.plan_allocation(budget=self.budget_input.value()))
+        for header, checkbox in self.header_checkboxes.items():
+            checkbox.setChecked(header in allocation)
+            self.header_spinboxes[header].setValue(allocation.get(header, 0))
+        self.update_visualization()
+        self.status_label.setText(f"Planned {planner.describe(list(allocation.items()))}")
+
+    def compression_setting(self):
+        return 'auto' if self.compression_checkbox.isChecked() else None
+
     def toggle_network_noise(self):
         """Start network noise generation when the checkbox is checked."""
         destination_ip = self.ip_input.text()
@@ -208,8 +296,9 @@ class SteganographyApp(QMainWindow):
         message = self.message_input.toPlainText()
         message_bits = len(message) * 8
 
-        if (total_bits % 8 != 0):
-            self.status_label.setText(f"Warning: Total number of bits must be a multiple of 8 ({total_bits} bits)")
+        # Any total works: bytes span packet boundaries and the decoder realigns after each message
+        if total_bits - self.seq_bits_input.value() <= 0:
+            self.status_label.setText(f"Warning: No data bits left per packet ({total_bits} bits selected)")
             self.send_button.setEnabled(False)
         elif not self.is_valid_ip(self.ip_input.text()) or not self.is_valid_port(self.port_input.text()):
             self.status_label.setText("Invalid IP address or port")
@@ -246,16 +335,18 @@ class SteganographyApp(QMainWindow):
             print(f"Encoding message: {message}")
             print(f"Using headers: {selected_headers}")
             print(f"Sending to: {destination_ip}:{destination_port}")
-            stego_utils.save_to_config(destination_ip, destination_port, selected_headers)
+            stego_utils.save_to_config(destination_ip, destination_port, selected_headers, self.seq_bits_input.value(), self.fec_input.value() / 100, compression=self.compression_setting())
 
-            # Check if delay is enabled and get the delay value
+            # Check if delay is enabled and get the delay value; 0 means no rate limit
             delay = self.delay_input.value() if self.delay_checkbox.isChecked() else 0
 
             encoder.start_encoder(
                 load_config=True,
                 use_noise=True,
                 messages=[message],
-                delay=delay  # Pass the delay value here
+                delay=delay,  # Becomes a token bucket rate of 1/delay packets/s
+                burst=self.burst_input.value(),
+                burst_mode=self.burst_mode_checkbox.isChecked()
             )
 
             self.status_label.setText("Message sent successfully!")
@@ -265,79 +356,44 @@ class SteganographyApp(QMainWindow):
             QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
 
 
-    def packet_callback(self, packet):
-        """Packet callback function to record timestamps of incoming packets."""
-        if IP in packet and TCP in packet:
-            timestamp = datetime.datetime.now()
-            self.packet_times.append(timestamp)
-
     def start_packet_monitoring(self):
-        """Start monitoring packets and updating the graph."""
-        if not self.monitoring:
-            self.monitoring = True
-            self.packet_times.clear()
-            self.status_label.setText("Monitoring packets...")
+        """Start counting packets to the destination in a capture process and updating the graph."""
+        if self.monitor is None:
+            destination_ip = self.ip_input.text()
+            destination_port = self.port_input.text()
+            if not self.is_valid_ip(destination_ip) or not self.is_valid_port(destination_port):
+                self.status_label.setText("Invalid IP address or port")
+                return
+            self.packet_rate.clear()
+            # The capture process sends one packet count per interval instead of every packet
+            self.monitor = PacketMonitor(self.packet_rate, build_monitor_filter(destination_ip, int(destination_port)), interval=0.5).start()
+            self.status_label.setText(f"Monitoring packets to {destination_ip}:{destination_port}...")
             self.start_graph_button.setEnabled(False)
             self.stop_graph_button.setEnabled(True)
 
-            # Start the sniffing in a background thread
-            self.monitor_thread = threading.Thread(target=self.sniff_packets)
-            self.monitor_thread.daemon = True
-            self.monitor_thread.start()
-
             # Start updating the graph every 0.5 seconds
             self.update_timer.start(500)
 
+    def update_packet_rate(self):
+        """Apply the counts received from the capture process and redraw the graph."""
+        error = self.monitor.poll() if self.monitor is not None else None
+        self.rate_plot.refresh()
+        if error:
+            self.stop_packet_monitoring()
+            self.status_label.setText(f"Monitoring failed: {error}")
+
     def stop_packet_monitoring(self):
         """Stop monitoring packets and updating the graph."""
-        if self.monitoring:
-            self.monitoring = False
+        if self.monitor is not None:
+            self.monitor.stop()
+            self.monitor = None
             self.status_label.setText("Monitoring stopped.")
             self.start_graph_button.setEnabled(True)
             self.stop_graph_button.setEnabled(False)
             self.update_timer.stop()
 
-    def sniff_packets(self):
-        """Sniff packets in the background."""
-        sniff(prn=self.packet_callback, filter="tcp and dst host 192.168.1.100 and dst port 80", stop_filter=lambda x: not self.monitoring)
-
-    def plot_packet_counts_over_time(self):
-        """Plot packet counts over time using matplotlib."""
-        # Ensure there is always at least one point on the graph
-        current_time = datetime.datetime.now().replace(microsecond=0)
-        if not self.packet_times:
-            self.packet_times.append(current_time)
-
-        # Group packet times by second
-        time_bins = defaultdict(int)
-        for time in self.packet_times:
-            rounded_time = time.replace(microsecond=0)
-            time_bins[rounded_time] += 1
-
-        # Fill in any gaps with zero counts
-        start_time = min(time_bins.keys())
-        end_time = current_time
-        full_time_range = [start_time + datetime.timedelta(seconds=i) for i in range((end_time - start_time).seconds + 1)]
-        counts = [time_bins.get(time, 0) for time in full_time_range]
-
-        self.show_graph_over_time(full_time_range, counts)
-
-    def show_graph_over_time(self, times, counts):
-        """Display the graph of packet counts over time using matplotlib."""
-        plt.gcf().clear()  # Clears the current figure instead of creating a new one
-        plt.plot(times, counts, marker='o', linestyle='-', color='blue')
-        plt.xlabel('Time')
-        plt.ylabel('Number of Packets')
-        plt.title('Number of Packets Over Time')
-        plt.xticks(rotation=45, ha="right")
-        plt.tight_layout()
-        plt.grid(True)
-        plt.pause(0.001)  # Allow for dynamic updates in real-time
-
-
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = SteganographyApp()
     window.show()
-    plt.ion()  # Turn on interactive mode for real-time plotting
     sys.exit(app.exec_())
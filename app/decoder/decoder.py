@@ -1,157 +1,564 @@
-from scapy.all import IP, TCP, IPOption, sniff, Raw
-from encoder.stego_utils import read_config
-
-# Global variables to store the accumulated binary message
-binary_message = ""
-bit_accumulator = ""
-callback_global = None
-verbose_global = False
-str_accumulator= ""
-packet_counter_global = 1
-
-def packet_handler(pkt):
-    global binary_message, bit_accumulator, header_bit_fields, callback_global, verbose_global, str_accumulator, packet_counter_global
-    if IP in pkt and TCP in pkt:
-        try: 
-            payload = pkt[Raw].load.decode()
-            if "AN21NY" not in payload:
-                return
-        except Exception as e:
+import argparse
+import time
+from collections import OrderedDict
+import encoder.metrics as metrics
+from scapy.all import IP, TCP, IPOption, Raw
+import encoder.config as stego_config
+from encoder.stego_utils import build_http_payload, COVERT_MARKER
+from decoder.stream import MessageStream
+from decoder.reassembly import ReassemblyWindow, FecReassembler
+from decoder.workers import ParallelDecoder
+from encoder.transport import capture_raw, PcapTransport
+from decoder.fast_parser import FieldExtractor, MalformedPacket, ip_offset, LINKTYPE_RAW
+
+class DecoderConfig:
+    """What a sender embeds: header fields plus the framing options around the data.
+
+    Each packet's covert bits are laid out as
+    [version tag][session id][sequence][data] with version_bits,
+    session_bits and seq_bits possibly zero.
+    """
+
+    def __init__(self, header_bit_fields, seq_bits=0, fec_shards=None, compression=None, session_bits=0, reorder_window=256, version=0, version_bits=0):
+        self.header_bit_fields = list(header_bit_fields)
+        self.extractor = FieldExtractor(self.header_bit_fields)
+        self.total_bits = self.extractor.total_bits
+        self.seq_bits = seq_bits
+        self.fec_shards = fec_shards
+        self.compression = compression
+        self.session_bits = session_bits
+        self.reorder_window = reorder_window
+        self.version = version
+        self.version_bits = version_bits
+        self.version_tag = version & ((1 << version_bits) - 1)
+        self.tag_shift = self.total_bits - version_bits
+
+    @classmethod
+    def from_stego_config(cls, config, reorder_window=256):
+        """Build the decoder side of a saved StegoConfig."""
+        return cls(config.header_bit_fields, config.seq_bits, config.fec_shards, config.compression,
+                   config.session_bits, reorder_window, config.version, config.version_bits)
+
+    @classmethod
+    def from_config_file(cls, reorder_window=256, path=None):
+        """Load the saved configuration (config.json)."""
+        return cls.from_stego_config(stego_config.load_config(path), reorder_window)
+
+    def matches(self, packed):
+        """Whether a packet's bits carry this version's in-band tag (always true untagged)."""
+        return not self.version_bits or packed >> self.tag_shift == self.version_tag
+
+    def describe(self):
+        lines = [f"Header: {header}, Bits: {bits}" for header, bits in self.header_bit_fields]
+        if self.session_bits:
+            lines.append(f"Session id bits: {self.session_bits}")
+        if self.fec_shards:
+            lines.append(f"Sequence bits: {self.seq_bits}, FEC: {self.fec_shards[0]} data + {self.fec_shards[1]} parity packets per block")
+        elif self.seq_bits:
+            lines.append(f"Sequence bits: {self.seq_bits} (reorder window {self.reorder_window} packets)")
+        if self.compression is not None:
+            lines.append(f"Compression: {self.compression}")
+        lines.append(f"Config version: {self.version}" + (f" (tagged in {self.version_bits} bits)" if self.version_bits else ''))
+        return "\n".join(lines)
+
+def extract_with_scapy(pkt, header_bit_fields, verbose=False):
+    """Extract the configured field values from a dissected scapy packet, or None."""
+    try:
+        payload = pkt[Raw].load.decode()
+        if COVERT_MARKER not in payload:
+            return None
+    except Exception as e:
+        return None
+
+    values = []
+    for header, num_bits in header_bit_fields:
+        mask = (1 << num_bits) - 1
+        value = None
+        if header == 'ipid':
+            value = pkt[IP].id & mask
+        elif header == 'ttl':
+            value = pkt[IP].ttl & mask
+        elif header == 'window':
+            value = pkt[TCP].window & mask
+        elif header == 'tcp_reserved':
+            value = pkt[TCP].reserved & mask
+        elif header == 'tcp_options':
+            # Extract data from TCP Options
+            for opt in pkt[TCP].options:
+                if isinstance(opt, tuple) and opt[0] == 254:  # Our experimental option kind
+                    value = int.from_bytes(opt[1], 'big') & mask
+                    break
+        elif header == 'ip_options':
+            # Extract data from IP Options
+            for opt in pkt[IP].options:
+                if isinstance(opt, IPOption) and opt.option == 30:  # Our experimental option number
+                    value = int.from_bytes(opt.value, 'big') & mask
+                    break
+        elif header == 'user_agent':
+            if "User-Agent: " in payload:
+                user_agent = payload.split("User-Agent: ")[1].split("\r\n")[0]
+                if user_agent:
+                    value = ord(user_agent[-1]) & mask
+        else:
+            print(f"Unknown header: {header}")
+        if value is None:
+            metrics.FIELD_FAILURES.inc(label=header)
+            return None
+        if verbose:
+            print(f"{header} bits: {value:0{num_bits}b} (last {num_bits} bits)")
+        values.append(value)
+    return values
+
+class Session:
+    """Decode state for one covert stream: reassembly window, bit buffer and output callback."""
+
+    def __init__(self, key, config, callback=None, verbose=False, echo=True):
+        self.key = key
+        self.config = config
+        self.callback = callback
+        self.verbose = verbose
+        self.echo = echo  # Print decoded text when not verbose
+        self.shared = True  # Follows the decoder's configuration changes
+        self.stream = MessageStream(compressed=config.compression is not None)
+        self._configure(config)
+        self.packets = 0
+        self.last_seen = time.monotonic()
+
+    def _configure(self, config):
+        self.config = config
+        self.data_bits = config.total_bits - config.version_bits - config.session_bits - config.seq_bits
+        self.reassembly = None
+        if config.fec_shards:
+            self.reassembly = FecReassembler(config.seq_bits, self.data_bits, *config.fec_shards, on_gap=self.report_gap)
+        elif config.seq_bits:
+            self.reassembly = ReassemblyWindow(config.seq_bits, self.data_bits, config.reorder_window, on_gap=self.report_gap)
+
+    def switch(self, config):
+        """Continue under a new configuration version.
+
+        Senders switch between messages, so whatever the old reassembly
+        stage holds is flushed and the new framing starts fresh.
+        """
+        self.flush()
+        self.stream.restart(compressed=config.compression is not None)
+        self._configure(config)
+        if self.verbose:
+            print(f"{self.label()}switched to config version {config.version}")
+
+    def push(self, packed, num_bits):
+        """Take one packet's bits after the version tag and session id: sequence number (if any) then data."""
+        self.packets += 1
+        if self.reassembly is None:
+            self.emit_bits(packed, num_bits)
             return
-        
-        data_bits = ""
-        # print("\n--- Debug Info ---")  # Start of debug information
-        # print(f"Packet {packet_counter_global}: Source IP {pkt[IP].src}, Destination IP {pkt[IP].dst}")
-
-        total_bits = sum(num_bits for _, num_bits in header_bit_fields)
-        
-        # Extract bits based on headers specified in config
-        for header, num_bits in header_bit_fields:
-            if header == 'ipid':
-                ipid_bits = format(pkt[IP].id, '016b')[-num_bits:]
-                print(f"IPID bits: {ipid_bits} (last {num_bits} bits)")
-                data_bits += ipid_bits
-            elif header == 'ttl':
-                ttl_bits = format(pkt[IP].ttl, '08b')[-num_bits:]
-                print(f"TTL bits: {ttl_bits} (last {num_bits} bits)")
-                data_bits += ttl_bits
-            elif header == 'window':
-                window_bits = format(pkt[TCP].window, '016b')[-num_bits:]
-                print(f"Window bits: {window_bits} (last {num_bits} bits)")
-                data_bits += window_bits
-            elif header == 'tcp_reserved':
-                reserved_bits = format(pkt[TCP].reserved, '04b')[-num_bits:]
-                print(f"TCP Reserved bits: {reserved_bits} (last {num_bits} bits)")
-                data_bits += reserved_bits
-            elif header == 'tcp_options':
-                # Extract data from TCP Options
-                options = pkt[TCP].options
-                for opt in options:
-                    if isinstance(opt, tuple) and opt[0] == 254:  # Our experimental option kind
-                        option_data = opt[1]
-                        option_data_bits = ''.join(format(byte, '08b') for byte in option_data)
-                        option_data_bits = option_data_bits[-num_bits:]
-                        print(f"TCP Option bits: {option_data_bits} (last {num_bits} bits)")
-                        data_bits += option_data_bits
-                        break
-            elif header == 'ip_options':
-                # Extract data from IP Options
-                options = pkt[IP].options
-                for opt in options:
-                    if isinstance(opt, IPOption) and opt.option == 30:  # Our experimental option number
-                        option_data = opt.value
-                        option_data_bits = ''.join(format(byte, '08b') for byte in option_data)
-                        option_data_bits = option_data_bits[-num_bits:]
-                        print(f"IP Option bits: {option_data_bits} (last {num_bits} bits)")
-                        data_bits += option_data_bits
-                        break
-            elif header == 'user_agent':
-                if Raw in pkt:
-                    try:
-                        payload = pkt[Raw].load.decode()
-                        if "AN21NY" not in payload:
-                            return
-                        if "User-Agent: " in payload:
-                            parts = payload.split("User-Agent: ")
-                            user_agent = parts[1].split("\r\n")[0]
-                            user_agent_binary = ''.join(format(ord(c), '08b') for c in user_agent)
-                            ua_bits = user_agent_binary[-num_bits:]
-                            print(f"User-Agent bits: {ua_bits} (last {num_bits} bits)")
-                            data_bits += ua_bits
-                    except Exception as e:
-                        print(f"Error processing User-Agent: {e}")
-                        return
+        seq = packed >> self.data_bits
+        if self.verbose:
+            print(f"sequence number: {seq}")
+        self.emit_released(self.reassembly.push(seq, packed & ((1 << self.data_bits) - 1)))
+
+    def flush(self):
+        """Emit whatever the reassembly window still holds, zero-filling holes."""
+        if self.reassembly is not None:
+            self.emit_released(self.reassembly.flush())
+
+    def emit_released(self, items):
+        """Emit data released by the reassembly stage: FEC shards are bytes, plain packets are ints."""
+        for data in items:
+            if isinstance(data, bytes):
+                self.emit_text(self.stream.push_bytes(data), len(data))
+            elif data is None:
+                # Keep the bit position of a lost packet without treating it as a message end
+                self.emit_bits(0, self.data_bits, realign=False)
             else:
-                print(f"Unknown header: {header}")
+                self.emit_bits(data, self.data_bits)
 
-        print(f"Extracted data bits from packet: {data_bits}")  # Debug print for accumulated bits
-        print("--- End Debug Info ---\n")  # End of debug information
+    def report_gap(self, start, end):
+        print(f"\n[{self.label()}lost packets {start}-{end - 1}]", flush=True)
 
-        if (len(data_bits) != total_bits):
+    def emit_bits(self, packed, num_bits, realign=True):
+        """Append one packet's data bits to the message stream and emit decoded text."""
+        decoded_before = self.stream.bytes_decoded
+        text = self.stream.push_bits(packed, num_bits, realign)
+        self.emit_text(text, self.stream.bytes_decoded - decoded_before)
+
+    def emit_text(self, text, num_bytes):
+        metrics.BYTES_DECODED.inc(num_bytes)
+        if not text:
             return
-        if verbose_global:
-            print(f"packet {packet_counter_global} received! bits extracted: >{data_bits}<")
-            packet_counter_global += 1
-        
-        # Accumulate bits
-        bit_accumulator += data_bits
-
-        if verbose_global:
-            # Accumulate all bits without decoding in verbose mode until all messages are received
-            while len(bit_accumulator) >= 8:
-                byte_bits = bit_accumulator[:8]
-                bit_accumulator = bit_accumulator[8:]
-                try:
-                    char = chr(int(byte_bits, 2))
-                    if callback_global:
-                        callback_global(char)
-                    str_accumulator += char
-                except ValueError:
-                    print(f"Invalid byte sequence: {byte_bits}")
+        if self.callback:
+            self.callback(text)
+        if self.echo and not self.verbose:
+            # Print decoded text immediately in non-verbose mode
+            print(text, end='', flush=True)
+
+    def label(self):
+        return '' if self.key is None else f"{self.key} "
+
+def _source_ip(data, offset):
+    return '.'.join(str(b) for b in data[offset + 12:offset + 16])
+
+def _flow(data, offset):
+    tcp = offset + (data[offset] & 0x0F) * 4
+    return (_source_ip(data, offset), '.'.join(str(b) for b in data[offset + 16:offset + 20]), (data[tcp + 2] << 8) | data[tcp + 3])
+
+SESSION_KEYS = {
+    'single': None,           # One stream, like the old module-global decoder
+    'source_ip': _source_ip,  # One stream per sender address
+    'flow': _flow,            # Per (source, destination, destination port); source ports are random per packet
+    'session_id': None,       # In-band id in the first session_bits of every packet
+}
+
+class Decoder:
+    """Demultiplex covert packets into per-session streams.
+
+    Sessions are keyed by source IP (default), by flow, by an in-band
+    session id carried after the version tag of every packet, or not at all
+    ('single'). The table is an LRU bounded to max_sessions, and sessions
+    idle for idle_timeout seconds are flushed and dropped.
+    session_factory(key) may return a (config, callback) pair to give a
+    session its own configuration and output, or (None, callback) to keep
+    the shared configuration; otherwise every session uses config and
+    callback. With in-band ids the id is read before the session is known,
+    so every factory config must share config's field layout.
+
+    set_config() switches the shared configuration mid-capture. The last
+    few versions stay known, and packets are matched to one by their
+    in-band version tag, so packets still in flight under the old version
+    decode with it until their session sees the new one.
+    """
+
+    def __init__(self, config, callback=None, verbose=False, session_key='source_ip', max_sessions=1024, idle_timeout=300.0, session_factory=None, echo=True):
+        if session_key not in SESSION_KEYS:
+            raise ValueError(f"Unknown session key: {session_key}")
+        if session_key == 'session_id' and not config.session_bits:
+            raise ValueError("session_key='session_id' needs a config with session_bits")
+        self.config = config
+        self.layouts = [config]  # Known configuration versions, newest first
+        self.callback = callback
+        self.verbose = verbose
+        self.session_key = session_key
+        self.key_for = SESSION_KEYS[session_key]
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.session_factory = session_factory
+        self.made = None  # (key, factory result) asked for a packet whose session does not exist yet
+        self.echo = echo
+        self.sessions = OrderedDict()  # Least recently used first
+        self.sweep_interval = min(1.0, idle_timeout / 4) if idle_timeout else None
+        self.last_sweep = time.monotonic()
+        self.packet_counter = 1
+
+    def session(self, key, config=None):
+        """Return the session for key, creating it (and evicting the LRU one if full).
+
+        A new shared session starts with config, the version its first packet was built with.
+        """
+        session = self.sessions.get(key)
+        if session is not None:
+            self.sessions.move_to_end(key)
+            return session
+        own_config, callback = None, self.callback
+        if self.session_factory is not None:
+            if self.made is not None and self.made[0] == key:
+                own_config, callback = self.made[1]
+            else:
+                own_config, callback = self.session_factory(key)
+            self.made = None
+        session = Session(key if self.session_key != 'single' else None, own_config or config or self.config, callback, self.verbose, self.echo)
+        session.shared = own_config is None
+        self.sessions[key] = session
+        metrics.SESSIONS_STARTED.inc()
+        while len(self.sessions) > self.max_sessions:
+            self._evict(next(iter(self.sessions)), 'capacity')
+        return session
+
+    def _evict(self, key, reason):
+        session = self.sessions.pop(key)
+        session.flush()
+        metrics.SESSIONS_EVICTED.inc(label=reason)
+        if self.verbose:
+            print(f"session {key} closed ({reason}) after {session.packets} packets")
+
+    def expire(self, now=None):
+        """Flush and drop sessions idle for longer than idle_timeout."""
+        if not self.idle_timeout:
+            return
+        now = time.monotonic() if now is None else now
+        self.last_sweep = now
+        while self.sessions:
+            key, session = next(iter(self.sessions.items()))
+            if now - session.last_seen < self.idle_timeout:
+                break
+            self._evict(key, 'idle')
+
+    def flush(self):
+        """Flush every session, e.g. when capture stops."""
+        for session in self.sessions.values():
+            session.flush()
+
+    def set_config(self, config, max_layouts=4):
+        """Make config the current version; safe to call from another thread while packets are decoded.
+
+        Older versions are kept for their in-flight packets only while both
+        sides carry version tags that tell them apart.
+        """
+        layouts = [config]
+        if config.version_bits:
+            tags = {(config.version_bits, config.version_tag)}
+            for old in self.layouts:
+                tag = (old.version_bits, old.version_tag)
+                if old.version_bits and old.version < config.version and tag not in tags and len(layouts) < max_layouts:
+                    layouts.append(old)
+                    tags.add(tag)
+        # One assignment, so the capture thread sees either the old or the new list
+        self.layouts = layouts
+        self.config = config
+
+    def handle_raw(self, data, linktype=LINKTYPE_RAW):
+        """Decode a raw captured frame on the fast path, falling back to scapy if malformed."""
+        if metrics.enabled:
+            start = time.perf_counter()
+        offset = None
+        try:
+            offset = ip_offset(data, linktype)
+            if offset is None:
+                return
+            key = self.key_for(data, offset) if self.key_for is not None else None
+            for config in self._layouts_for(key):
+                packed = config.extractor.extract_packed(data, offset)
+                if packed is not None and config.matches(packed):
+                    break
+            else:
+                packed = None
+            extractor = config.extractor
+        except (MalformedPacket, IndexError, ValueError):
+            if offset is None:
+                return
+            if self.verbose:
+                print("Malformed packet, falling back to scapy dissection")
+            try:
+                pkt = IP(bytes(data[offset:]))
+            except Exception:
+                return
+            self.handle_packet(pkt)
+            return
+        if metrics.enabled:
+            parsed = time.perf_counter()
+            metrics.PARSE_SECONDS.observe(parsed - start)
+            if packed is not None:
+                metrics.COVERT_PACKETS_SEEN.inc()
+            elif extractor.failed_field is not None:
+                metrics.FIELD_FAILURES.inc(label=extractor.failed_field)
+            else:
+                metrics.COVER_PACKETS_SEEN.inc()
+        if packed is not None:
+            if self.verbose:
+                self.log_packet_bits(extractor.unpack(packed), config.header_bit_fields)
+            self.dispatch(key, packed, config)
+            if metrics.enabled:
+                metrics.DECODE_SECONDS.observe(time.perf_counter() - start)
+
+    def handle_packet(self, pkt):
+        """Decode a dissected scapy packet (used as the slow path and by sniff callers)."""
+        if IP not in pkt or TCP not in pkt:
+            return
+        key = None
+        if self.session_key == 'source_ip':
+            key = pkt[IP].src
+        elif self.session_key == 'flow':
+            key = (pkt[IP].src, pkt[IP].dst, pkt[TCP].dport)
+        for config in self._layouts_for(key):
+            values = extract_with_scapy(pkt, config.header_bit_fields, self.verbose)
+            if values is None:
+                continue
+            # Pack the whole packet into one value so the accumulator sees a single write
+            packed = 0
+            for value, (_, num_bits) in zip(values, config.header_bit_fields):
+                packed = (packed << num_bits) | value
+            if config.matches(packed):
+                break
         else:
-            # Decode bytes from accumulated bits immediately in non-verbose mode
-            while len(bit_accumulator) >= 8:
-                byte_bits = bit_accumulator[:8]
-                bit_accumulator = bit_accumulator[8:]
-                try:
-                    char = chr(int(byte_bits, 2))
-                    if callback_global:
-                        callback_global(char)
-                    print(char, end='', flush=True)
-                except ValueError:
-                    print(f"Invalid byte sequence: {byte_bits}")
-                    continue  # Ignore incomplete or invalid byte sequences
-
-def start_decoder(config_file='config.txt', sniff_filter=None, timeout=None, callback=None, verbose=False):
-    global header_bit_fields, bit_accumulator, binary_message, callback_global, verbose_global, str_accumulator
-    verbose_global = verbose
-    callback_global = callback
-    # Read configuration from config.txt
-    config, port, _ = read_config()
-    header_bit_fields = []
-    for header, bits in config.items():
-        header_bit_fields.append((header, bits))
-    
+            metrics.COVER_PACKETS_SEEN.inc()
+            return
+        metrics.COVERT_PACKETS_SEEN.inc()
+        if self.verbose:
+            self.log_packet_bits(values, config.header_bit_fields)
+        self.dispatch(key, packed, config)
+
+    def _layouts_for(self, key):
+        """Configurations a packet of this session may have been built with, newest first."""
+        if self.session_factory is None or self.session_key == 'session_id':
+            return self.layouts
+        session = self.sessions.get(key)
+        if session is None:
+            # Cover traffic must not fill the session table: the session is only created once a packet matches
+            self.made = (key, self.session_factory(key))
+            own_config = self.made[1][0]
+            return self.layouts if own_config is None else (own_config,)
+        return self.layouts if session.shared else (session.config,)
+
+    def dispatch(self, key, packed, config):
+        """Route one covert packet's bits to its session."""
+        payload_bits = config.total_bits - config.version_bits - config.session_bits
+        if self.session_key == 'session_id':
+            key = (packed >> payload_bits) & ((1 << config.session_bits) - 1)
+        session = self.session(key, config)
+        if session.shared and session.config is not config:
+            if config.version < session.config.version:
+                # A straggler from before the switch: its message was already flushed
+                if self.verbose:
+                    print(f"{session.label()}dropped a packet from config version {config.version}")
+                return
+            session.switch(config)
+        session.last_seen = now = time.monotonic()
+        session.push(packed & ((1 << payload_bits) - 1), payload_bits)
+        if self.sweep_interval is not None and now - self.last_sweep >= self.sweep_interval:
+            self.expire(now)
+
+    def log_packet_bits(self, values, header_bit_fields):
+        bits = ''.join(format(value, f'0{num_bits}b') for value, (_, num_bits) in zip(values, header_bit_fields))
+        print(f"packet {self.packet_counter} received! bits extracted: >{bits}<")
+        self.packet_counter += 1
+
+    def text(self, key=None):
+        """Return the retained decoded text of one session (the only one by default)."""
+        if key is None and len(self.sessions) == 1:
+            key = next(iter(self.sessions))
+        session = self.sessions.get(key)
+        return session.stream.text() if session is not None else ''
+
+def build_sniff_filter(header_bit_fields, port, destination_ip):
+    """Derive a BPF filter from the config so only covert packets reach Decoder.handle_raw.
+
+    Covert packets are SYNs to the configured port, carry our experimental
+    TCP option 254 / IP option 30 when those fields are used, and have the
+    marker at a fixed offset in the HTTP payload.
+    """
+    headers = dict(header_bit_fields)
+    clauses = [f"tcp dst port {port}", "tcp[tcpflags] & tcp-syn != 0"]
+    if 'ip_options' in headers:
+        # Option type byte: copy flag set, class 0, number 30
+        clauses.append("ip[0] & 0xf > 5 and ip[20] = 0x9e")
+    if 'tcp_options' in headers:
+        clauses.append("tcp[12] & 0xf0 > 0x50 and tcp[20] = 254")
+    marker = COVERT_MARKER.encode()
+    marker_offset = build_http_payload(destination_ip).encode().index(marker)
+    payload_start = "((tcp[12:1] & 0xf0) >> 2)"
+    # BPF loads 1, 2 or 4 bytes at a time, so compare the marker in pieces
+    i = 0
+    while i < len(marker):
+        size = 4 if len(marker) - i >= 4 else 2 if len(marker) - i >= 2 else 1
+        clauses.append(f"tcp[{payload_start} + {marker_offset + i}:{size}] = 0x{marker[i:i + size].hex()}")
+        i += size
+    return " and ".join(clauses)
+
+def build_decoder(config, callback=None, verbose=False, session_key='source_ip', max_sessions=1024, idle_timeout=300.0, workers=1):
+    """Return a Decoder, or a ParallelDecoder when workers > 1, and print its settings."""
+    if session_key == 'source_ip' and config.session_bits:
+        session_key = 'session_id'
+    if workers > 1:
+        decoder = ParallelDecoder(config, callback, verbose, session_key, workers, max_sessions=max_sessions, idle_timeout=idle_timeout)
+    else:
+        decoder = Decoder(config, callback, verbose, session_key, max_sessions, idle_timeout)
+
     # Print the configuration being used
     print("Configuration loaded in decoder:")
-    for header, bits in header_bit_fields:
-        print(f"Header: {header}, Bits: {bits}")
+    print(config.describe())
+    print(f"Sessions keyed by: {session_key}")
+    if workers > 1:
+        print(f"Decoding on {workers} worker processes")
+    return decoder
+
+def print_sessions(decoder):
+    for key in decoder.sessions:
+        label = '' if key is None else f"{key} "
+        print(f"final accumulated message {label}> {decoder.text(key)}")
+
+def start_decoder(config_file=None, sniff_filter=None, timeout=None, callback=None, verbose=False, iface=None, metrics_port=None, reorder_window=256, session_key='source_ip', max_sessions=1024, idle_timeout=300.0, workers=1, transport=None, watch=True, watch_interval=1.0):
+    """Load the saved config and decode covert traffic until timeout or Ctrl+C.
+
+    With workers > 1, frames are sharded by session over that many decoder
+    processes (see decoder.workers). transport (see encoder.transport)
+    replaces live sniffing, e.g. a QueueTransport fed by an in-process
+    encoder. With watch, a newly saved config version is picked up without
+    restarting the capture; the destination stays the one loaded at start.
+    Returns the Decoder so callers can read each session's decoded text.
+    """
+    if metrics_port is not None:
+        metrics.start_http_server(metrics_port)
+    saved = stego_config.load_config(config_file)
+    config = DecoderConfig.from_stego_config(saved, reorder_window)
+    port, destination_ip = saved.destination_port, saved.destination_ip
+    decoder = build_decoder(config, callback, verbose, session_key, max_sessions, idle_timeout, workers)
     
     print(f"Listening on port: {port}")
     print("Decoding messages... Press Ctrl+C to stop.\n")
 
-    # Build the sniff filter if not provided
+    # Build the sniff filter if not provided; a watched config may change fields, so only the fixed parts are filtered on
     if sniff_filter is None:
-        sniff_filter = f"tcp port {port}"
+        sniff_filter = build_sniff_filter([] if watch else config.header_bit_fields, port, destination_ip)
+
+    watcher = None
+    if watch:
+        def on_change(new):
+            if (new.destination_ip, new.destination_port) != (destination_ip, port):
+                print(f"\nConfig version {new.version} changes the destination; restart the decoder to listen there")
+            decoder.set_config(DecoderConfig.from_stego_config(new, reorder_window))
+            print(f"\nSwitched to config version {new.version}")
+        watcher = stego_config.ConfigWatcher(on_change, config_file, watch_interval).start()
 
     try:
-        # Start sniffing packets and process each packet with packet_handler
-        sniff(filter=sniff_filter, prn=packet_handler, store=0, timeout=timeout)
+        # Capture raw frames and decode them on the fast path
+        if transport is None:
+            capture_raw(sniff_filter, decoder.handle_raw, timeout=timeout, iface=iface, on_idle=decoder.expire)
+        else:
+            transport.receive(decoder.handle_raw, timeout=timeout, on_idle=decoder.expire, sniff_filter=sniff_filter, iface=iface)
     except KeyboardInterrupt:
         print("\nSniffing stopped by user.")
+    if watcher is not None:
+        watcher.stop()
+    decoder.flush()
     
-    if verbose_global:
-        print(f"final accumulated message > {str_accumulator}")
+    if verbose:
+        print_sessions(decoder)
+    return decoder
+
+def decode_pcap(path, callback=None, verbose=False, reorder_window=256, session_key='source_ip', max_sessions=1024, workers=1, config=None):
+    """Decode a pcap/pcapng capture offline with the saved (or given) config.
+
+    The file is streamed record by record, so captures larger than memory
+    work. Sessions are only closed by max_sessions or at the end of the
+    file, since wall-clock idle times mean nothing when replaying. Returns
+    the Decoder.
+    """
+    if config is None:
+        config = DecoderConfig.from_config_file(reorder_window)
+    decoder = build_decoder(config, callback, verbose, session_key, max_sessions, None, workers)
+    print(f"Reading {path}\n")
+    PcapTransport(path, 'r').receive(decoder.handle_raw)
+    decoder.flush()
+
+    if verbose:
+        print_sessions(decoder)
+    return decoder
 
 if __name__ == "__main__":
-    start_decoder()
+    parser = argparse.ArgumentParser(description="Covert channel decoder")
+    parser.add_argument("--pcap", help="Decode this .pcap/.pcapng file instead of sniffing live traffic")
+    parser.add_argument("--timeout", type=float, help="Stop sniffing after this many seconds")
+    parser.add_argument("--iface", help="Interface to sniff on")
+    parser.add_argument("--session_key", default='source_ip', choices=list(SESSION_KEYS), help="How packets are grouped into messages")
+    parser.add_argument("--workers", type=int, default=1, help="Decoder processes (frames are sharded by session)")
+    parser.add_argument("--verbose", action="store_true", help="Print every extracted packet")
+    parser.add_argument("--config", help="Config file to load (default: config.json next to app/)")
+    parser.add_argument("--no_watch", action="store_true", help="Do not pick up config changes while sniffing")
+    parser.add_argument("--metrics_port", type=int, help="Serve Prometheus metrics on this localhost port")
+    args = parser.parse_args()
+
+    if args.pcap:
+        if args.metrics_port is not None:
+            metrics.start_http_server(args.metrics_port)
+        config = DecoderConfig.from_config_file(path=args.config) if args.config else None
+        decode_pcap(args.pcap, verbose=args.verbose, session_key=args.session_key, workers=args.workers, config=config)
+    else:
+        start_decoder(args.config, timeout=args.timeout, verbose=args.verbose, iface=args.iface, session_key=args.session_key, workers=args.workers, metrics_port=args.metrics_port, watch=not args.no_watch)
@@ -0,0 +1,177 @@
+import struct
+from encoder.stego_utils import COVERT_MARKER
+
+# pcap link types (DLT_*) we know how to strip down to the IP header
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+
+_LINKTYPES_BY_LAYER = {
+    'Ether': LINKTYPE_ETHERNET,
+    'CookedLinux': LINKTYPE_LINUX_SLL,
+    'Loopback': LINKTYPE_NULL,
+    'IP': LINKTYPE_RAW,
+}
+
+TCP_OPTION_KIND = 254     # Experimental TCP option kind used by the encoder
+IP_OPTION_NUMBER = 30     # Experimental IP option number used by the encoder
+USER_AGENT_PREFIX = b"User-Agent: "
+MARKER = COVERT_MARKER.encode()
+
+class MalformedPacket(ValueError):
+    """Raised when a frame cannot be parsed at fixed offsets."""
+
+def linktype_for_layer(cls):
+    """Map the link-layer class returned by a scapy socket's recv_raw() to a DLT."""
+    return _LINKTYPES_BY_LAYER.get(getattr(cls, '__name__', ''), LINKTYPE_ETHERNET)
+
+def ip_offset(frame, linktype):
+    """Return the offset of the IPv4 header in frame, or None if it is not IPv4 or too short to tell."""
+    if linktype == LINKTYPE_ETHERNET:
+        offset = 12
+        if len(frame) < offset + 2:
+            return None
+        ethertype = struct.unpack_from('!H', frame, offset)[0]
+        while ethertype in (0x8100, 0x88A8):  # 802.1Q / 802.1ad VLAN tags
+            offset += 4
+            if len(frame) < offset + 2:
+                return None
+            ethertype = struct.unpack_from('!H', frame, offset)[0]
+        return offset + 2 if ethertype == 0x0800 else None
+    if linktype == LINKTYPE_RAW:
+        return 0 if len(frame) > 0 and frame[0] >> 4 == 4 else None
+    if linktype == LINKTYPE_LINUX_SLL:
+        return 16 if len(frame) > 16 and struct.unpack_from('!H', frame, 14)[0] == 0x0800 else None
+    if linktype == LINKTYPE_NULL:
+        return 4 if len(frame) > 4 and frame[4] >> 4 == 4 else None
+    return None
+
+def _find_option(data, start, end, match):
+    """Walk IP/TCP option TLVs in data[start:end] and return the value of the first match."""
+    i = start
+    while i < end:
+        kind = data[i]
+        if kind == 0:     # End of option list
+            return None
+        if kind == 1:     # NOP
+            i += 1
+            continue
+        if i + 1 >= end:
+            raise MalformedPacket("truncated option")
+        length = data[i + 1]
+        if length < 2 or i + length > end:
+            raise MalformedPacket("bad option length")
+        if match(kind):
+            return data[i + 2:i + length]
+        i += length
+    return None
+
+def _read_ipid(data, view, offset, tcp, payload, end):
+    return (data[offset + 4] << 8) | data[offset + 5]
+
+def _read_ttl(data, view, offset, tcp, payload, end):
+    return data[offset + 8]
+
+def _read_window(data, view, offset, tcp, payload, end):
+    return (data[tcp + 14] << 8) | data[tcp + 15]
+
+def _read_tcp_reserved(data, view, offset, tcp, payload, end):
+    # scapy's 3-bit reserved field sits between dataofs and the NS flag
+    return (data[tcp + 12] >> 1) & 0x07
+
+def _read_tcp_options(data, view, offset, tcp, payload, end):
+    value = _find_option(view, tcp + 20, payload, lambda kind: kind == TCP_OPTION_KIND)
+    return None if value is None else int.from_bytes(value, 'big')
+
+def _read_ip_options(data, view, offset, tcp, payload, end):
+    value = _find_option(view, offset + 20, tcp, lambda kind: kind & 0x1F == IP_OPTION_NUMBER)
+    return None if value is None else int.from_bytes(value, 'big')
+
+def _read_user_agent(data, view, offset, tcp, payload, end):
+    start = data.find(USER_AGENT_PREFIX, payload, end)
+    if start == -1:
+        return None
+    start += len(USER_AGENT_PREFIX)
+    stop = data.find(b"\r\n", start, end)
+    try:
+        user_agent = bytes(view[start:stop if stop != -1 else end]).decode()
+    except UnicodeDecodeError:
+        return None
+    return ord(user_agent[-1]) if user_agent else None
+
+_READERS = {
+    'ipid': _read_ipid,
+    'ttl': _read_ttl,
+    'window': _read_window,
+    'tcp_reserved': _read_tcp_reserved,
+    'tcp_options': _read_tcp_options,
+    'ip_options': _read_ip_options,
+    'user_agent': _read_user_agent,
+}
+
+class FieldExtractor:
+    """Extract configured covert fields from raw IPv4 bytes as integers.
+
+    Reads every header at fixed offsets with struct and memoryview, so no
+    scapy dissection or string formatting happens on the hot path. Values
+    mirror what Decoder.handle_packet takes from a dissected packet.
+    """
+
+    def __init__(self, header_bit_fields):
+        self.header_bit_fields = list(header_bit_fields)
+        self.readers = [(_READERS.get(header), bits, (1 << bits) - 1) for header, bits in self.header_bit_fields]
+        self.known = all(reader is not None for reader, _, _ in self.readers)
+        self.total_bits = sum(bits for _, bits in self.header_bit_fields)
+        self.failed_field = None  # Field missing from the last marked packet, if any
+
+    def extract_packed(self, data, offset=0):
+        """Return all configured fields packed MSB-first into one int, or None.
+
+        Returns None if this is not a covert packet and raises MalformedPacket
+        if the headers cannot be walked. When a marked packet lacks one of the
+        configured fields, its name is left in failed_field.
+        """
+        self.failed_field = None
+        try:
+            first = data[offset]
+            if first >> 4 != 4:
+                return None
+            ihl = (first & 0x0F) * 4
+            if ihl < 20 or data[offset + 9] != 6:  # Not TCP
+                return None
+            end = min(len(data), offset + struct.unpack_from('!H', data, offset + 2)[0])
+            tcp = offset + ihl
+            data_offset = (data[tcp + 12] >> 4) * 4
+            payload = tcp + data_offset
+            if data_offset < 20 or payload > end:
+                raise MalformedPacket("bad header length")
+        except (IndexError, struct.error) as e:
+            raise MalformedPacket(str(e))
+
+        if data.find(MARKER, payload, end) == -1 or not self.known:
+            return None
+
+        view = memoryview(data)
+        packed = 0
+        for index, (reader, bits, mask) in enumerate(self.readers):
+            value = reader(data, view, offset, tcp, payload, end)
+            if value is None:
+                self.failed_field = self.header_bit_fields[index][0]
+                return None
+            packed = (packed << bits) | (value & mask)
+        return packed
+
+    def unpack(self, packed):
+        """Split a packed value back into one int per configured field."""
+        values = []
+        shift = self.total_bits
+        for _, bits, mask in self.readers:
+            shift -= bits
+            values.append((packed >> shift) & mask)
+        return values
+
+    def extract(self, data, offset=0):
+        """Return one int per configured field, or None if this is not a covert packet."""
+        packed = self.extract_packed(data, offset)
+        return None if packed is None else self.unpack(packed)
@@ -0,0 +1,189 @@
+import encoder.metrics as metrics
+from encoder.fec import ReedSolomon
+
+def unwrap(seq, expected, modulus):
+    """Map a wrapped sequence number to the absolute index nearest expected."""
+    delta = (seq - expected) % modulus
+    if delta >= modulus // 2 and modulus > 1:
+        delta -= modulus  # Behind expected: a late duplicate or an already skipped packet
+    return expected + delta
+
+class ReassemblyWindow:
+    """Put sequenced packets back in order with a bounded reorder window.
+
+    Every packet carries the low seq_bits of its index. Indices are unwrapped
+    against the next index we are waiting for, so the counter may wrap any
+    number of times as long as reordering stays within half the sequence
+    space. Packets are held until everything before them has arrived and are
+    then released in order. When a packet arrives more than `window` indices
+    ahead, the oldest missing packets are given up on: they are reported as a
+    gap and released as None, so the caller can fill them with zero bits and
+    keep later data bit-aligned.
+    """
+
+    def __init__(self, seq_bits, data_bits, window=None, on_gap=None):
+        self.seq_bits = seq_bits
+        self.data_bits = data_bits
+        self.modulus = 1 << seq_bits
+        half = max(1, self.modulus // 2)
+        self.window = min(window or 256, half)
+        self.on_gap = on_gap
+        self.next_index = 0
+        self.pending = {}        # Absolute index -> packed data bits
+        self.packets_lost = 0
+        self.duplicates = 0
+        self.reordered = 0
+
+    def unwrap(self, seq):
+        """Map a wrapped sequence number to the absolute index nearest the next expected one."""
+        return unwrap(seq, self.next_index, self.modulus)
+
+    def push(self, seq, data):
+        """Add one packet's data bits and return the data values now in order (None for a lost packet)."""
+        index = self.unwrap(seq)
+        if index < self.next_index or index in self.pending:
+            self.duplicates += 1
+            metrics.SEQUENCE_DUPLICATES.inc()
+            return []
+        if index != self.next_index:
+            self.reordered += 1
+            metrics.SEQUENCE_REORDERED.inc()
+        self.pending[index] = data
+        ready = []
+        if index >= self.next_index + self.window:
+            # Too far ahead: give up on the oldest holes so the window can slide
+            self._release_until(index - self.window + 1, ready)
+        self._release_contiguous(ready)
+        return ready
+
+    def flush(self):
+        """Release everything still held, with None for holes, and return it in order."""
+        ready = []
+        if self.pending:
+            self._release_until(max(self.pending) + 1, ready)
+        return ready
+
+    def _release_contiguous(self, ready):
+        while self.next_index in self.pending:
+            ready.append(self.pending.pop(self.next_index))
+            self.next_index += 1
+
+    def _release_until(self, index, ready):
+        """Advance next_index to index, reporting missing packets and releasing them as None."""
+        gap_start = None
+        while self.next_index < index:
+            data = self.pending.pop(self.next_index, None)
+            if data is None:
+                if gap_start is None:
+                    gap_start = self.next_index
+                self.packets_lost += 1
+                metrics.SEQUENCE_LOST.inc()
+            elif gap_start is not None:
+                self._report_gap(gap_start, self.next_index)
+                gap_start = None
+            ready.append(data)
+            self.next_index += 1
+        if gap_start is not None:
+            self._report_gap(gap_start, self.next_index)
+
+    def _report_gap(self, start, end):
+        if self.on_gap:
+            self.on_gap(start, end)
+
+
+class FecReassembler:
+    """Rebuild Reed-Solomon protected blocks from sequenced packets.
+
+    A packet's absolute index gives its block (index // n) and its shard
+    position inside the block. Data shards are released as soon as every
+    earlier one in the block has arrived, so a clean block streams with no
+    added latency. After a loss the block is held until any k of its n
+    shards are in, then the missing data shards are rebuilt. Blocks are
+    released in order; once a packet arrives more than `window` blocks
+    ahead, the oldest block is given up on, reported as a gap and its
+    missing data shards are zero-filled.
+    """
+
+    def __init__(self, seq_bits, data_bits, data_shards, parity_shards, window=None, on_gap=None):
+        self.codec = ReedSolomon(data_shards, parity_shards)
+        self.data_shards = data_shards
+        self.block_packets = data_shards + parity_shards
+        self.data_bits = data_bits
+        self.shard_bytes = data_bits // 8
+        self.spare_bits = data_bits - self.shard_bytes * 8
+        self.modulus = 1 << seq_bits
+        # Unwrapping is only unambiguous within half the sequence space
+        max_window = max(1, self.modulus // 2 // self.block_packets)
+        self.window = min(window or 4, max_window)
+        self.on_gap = on_gap
+        self.next_block = 0
+        self.released = 0        # Data shards of next_block already handed out
+        self.blocks = {}         # Block number -> {position: shard bytes}
+        self.blocks_recovered = 0
+        self.blocks_lost = 0
+        self.duplicates = 0
+
+    def push(self, seq, data):
+        """Add one packet's data bits and return the list of data shards (bytes) now in order."""
+        index = unwrap(seq, self.next_block * self.block_packets + self.released, self.modulus)
+        block, position = divmod(index, self.block_packets)
+        if block < self.next_block and position >= self.data_shards:
+            return []  # Parity for a block that was already complete
+        shards = self.blocks.setdefault(block, {}) if block >= self.next_block else None
+        if shards is None or position in shards:
+            self.duplicates += 1
+            metrics.SEQUENCE_DUPLICATES.inc()
+            return []
+        shards[position] = (data >> self.spare_bits).to_bytes(self.shard_bytes, 'big')
+        ready = []
+        while self.next_block + self.window <= block:
+            self._finish_block(ready, give_up=True)
+        self._release(ready)
+        return ready
+
+    def flush(self):
+        """Release every held block, rebuilding or zero-filling as needed."""
+        ready = []
+        while self.blocks:
+            self._finish_block(ready, give_up=True)
+        return ready
+
+    def _release(self, ready):
+        while True:
+            shards = self.blocks.get(self.next_block)
+            if shards is None:
+                return
+            # Stream data shards that arrive in order
+            while self.released < self.data_shards and self.released in shards:
+                ready.append(shards[self.released])
+                self.released += 1
+            if self.released == self.data_shards:
+                self._next()
+            elif len(shards) >= self.data_shards:
+                self._finish_block(ready)
+            else:
+                return
+
+    def _finish_block(self, ready, give_up=False):
+        shards = self.blocks.get(self.next_block, {})
+        if self.released < self.data_shards:
+            if len(shards) >= self.data_shards:
+                data = self.codec.decode(shards)
+                self.blocks_recovered += 1
+                metrics.FEC_BLOCKS_RECOVERED.inc()
+            else:
+                data = [shards.get(i, bytes(self.shard_bytes)) for i in range(self.data_shards)]
+                lost = sum(1 for i in range(self.released, self.data_shards) if i not in shards)
+                self.blocks_lost += 1
+                metrics.FEC_BLOCKS_LOST.inc()
+                metrics.SEQUENCE_LOST.inc(lost)
+                if self.on_gap:
+                    start = self.next_block * self.block_packets
+                    self.on_gap(start, start + self.block_packets)
+            ready.extend(data[self.released:])
+        self._next()
+
+    def _next(self):
+        self.blocks.pop(self.next_block, None)
+        self.next_block += 1
+        self.released = 0
@@ -0,0 +1,85 @@
+import codecs
+from collections import deque
+from encoder.bitpack import BitWriter
+from encoder.compression import StreamDecompressor
+
+class TextHistory:
+    """The most recent max_history characters of a text that arrives in pieces."""
+
+    def __init__(self, max_history=65536):
+        self.max_history = max_history
+        self.parts = deque()
+        self.length = 0
+
+    def append(self, text):
+        self.parts.append(text)
+        self.length += len(text)
+        while self.parts and self.length - len(self.parts[0]) >= self.max_history:
+            self.length -= len(self.parts.popleft())
+
+    def text(self):
+        return ''.join(self.parts)[-self.max_history:]
+
+class MessageStream:
+    """Turn extracted covert bits into text with bounded memory.
+
+    Bits go into a bytearray-backed BitWriter that is drained after every
+    packet, so it never holds more than one packet's worth of bytes. Whole
+    bytes are fed to an incremental UTF-8 decoder, so multi-byte characters
+    split across packets decode correctly. Only the most recent max_history
+    characters of decoded text are kept. With compressed=True the bytes are
+    first run through a streaming decompressor for framed messages.
+    """
+
+    def __init__(self, max_history=65536, compressed=False):
+        self.bits = BitWriter()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.max_history = max_history
+        self.history = TextHistory(max_history)
+        self.bytes_decoded = 0
+        self.decompressor = StreamDecompressor() if compressed else None
+
+    def restart(self, compressed=False):
+        """Drop any partial byte and start the next message, e.g. after a config change."""
+        self.bits = BitWriter()
+        self.decompressor = StreamDecompressor() if compressed else None
+
+    def push_bits(self, packed, total_bits, realign=True):
+        """Append one packet's total_bits of data and return the newly decoded text.
+
+        Messages start on packet boundaries, so the rest of the packet a
+        message ends in is zero padding. When packets do not carry whole
+        bytes, realign drops that padding's incomplete trailing byte so the
+        next message starts byte-aligned. The end of a message is a NUL byte
+        for plain text and the end of a frame for compressed messages.
+        """
+        self.bits.write(packed, total_bits)
+        data = self.bits.take_bytes()
+        if not realign or not self.bits.pending_bits:
+            return self.push_bytes(data)
+        if self.decompressor is None:
+            if 0 in data:
+                self.bits.discard_pending()
+            return self.push_bytes(data)
+        messages = self.decompressor.messages
+        text = self.push_bytes(data)
+        if self.decompressor.messages != messages and self.decompressor.codec is None:
+            self.bits.discard_pending()
+        return text
+
+    def push_bytes(self, data):
+        """Decode whole message bytes and return the newly decoded text."""
+        if not data:
+            return ''
+        self.bytes_decoded += len(data)
+        if self.decompressor is not None:
+            data = self.decompressor.feed(data)
+        # NUL bytes only come from the zero padding of a message's last packet
+        text = self.utf8.decode(data).replace('\x00', '')
+        if text:
+            self.history.append(text)
+        return text
+
+    def text(self):
+        """Return the retained tail of the decoded text."""
+        return self.history.text()
@@ -0,0 +1,212 @@
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+import encoder.metrics as metrics
+from decoder.fast_parser import ip_offset, LINKTYPE_RAW
+from decoder.stream import TextHistory
+
+def _source_shard(data, offset):
+    return data[offset + 12:offset + 16]
+
+def _flow_shard(data, offset):
+    tcp = offset + (data[offset] & 0x0F) * 4
+    return data[offset + 12:offset + 20] + data[tcp + 2:tcp + 4]
+
+# Bytes a frame is sharded on for each Decoder session_key. In-band session
+# ids are only known after extraction, so they shard by source address: every
+# sender behind one address lands on the same worker and is split there.
+SHARD_KEYS = {
+    'single': None,
+    'source_ip': _source_shard,
+    'flow': _flow_shard,
+    'session_id': _source_shard,
+}
+
+def worker_main(config, options, inbox, outbox, metrics_enabled=False):
+    """Decode batches of raw frames from inbox and put ([(session key, text)], metric updates) on outbox.
+
+    A DecoderConfig on the inbox switches the worker to that config version.
+    With metrics_enabled the worker's metric updates since the last item
+    (see metrics.drain) go with each item; otherwise that part is None.
+    """
+    import decoder.decoder as decoder
+    if metrics_enabled:
+        metrics.enable()
+        metrics.drain()  # A forked worker starts with a copy of the parent's values
+    pending = []
+    try:
+        decoder_options = dict(options, echo=False)
+        decoder_options['session_factory'] = lambda key: (None, lambda text: pending.append((key, text)))
+        worker_decoder = decoder.Decoder(config, **decoder_options)
+        while True:
+            try:
+                batch = inbox.get(timeout=1.0)
+            except queue.Empty:
+                worker_decoder.expire()
+            else:
+                if batch is None:
+                    break
+                if isinstance(batch, decoder.DecoderConfig):
+                    worker_decoder.set_config(batch)
+                    continue
+                linktype, frames = batch
+                for data in frames:
+                    worker_decoder.handle_raw(data, linktype)
+            if pending or metrics.enabled:
+                outbox.put((pending, metrics.drain() if metrics.enabled else None))
+                pending = []
+        worker_decoder.flush()
+        outbox.put((pending, metrics.drain() if metrics.enabled else None))
+    finally:
+        # The collector counts these to know every worker is done, even one that failed
+        outbox.put(None)
+
+class ParallelDecoder:
+    """Decode raw frames on a pool of worker processes, sharded by flow.
+
+    The calling process only hashes each frame's session key to pick a
+    worker and batches frames to it, so packet parsing and decoding run on
+    every core instead of under one GIL. All packets of a session go to the
+    same worker in capture order, so each session's text comes back in
+    order; text from different sessions may interleave. Decoded text is
+    delivered to callback(text) (and printed, prefixed with the session key
+    when there is more than one session) from a collector thread. Only the
+    tail of each session's text is kept for text(), for the max_sessions
+    most recently active sessions.
+    """
+
+    def __init__(self, config, callback=None, verbose=False, session_key='source_ip', workers=None, batch_size=256, max_delay=0.1, echo=True, max_history=65536, **options):
+        if session_key not in SHARD_KEYS:
+            raise ValueError(f"Unknown session key: {session_key}")
+        import decoder.decoder as decoder
+        # Raise bad options here rather than in every worker
+        decoder.Decoder(config, verbose=verbose, session_key=session_key, echo=False, **options)
+        self.callback = callback
+        self.echo = echo and not verbose
+        self.shard_key = SHARD_KEYS[session_key]
+        self.batch_size = batch_size
+        self.max_delay = max_delay  # Longest a frame waits in a partial batch while traffic flows
+        self.last_send = time.monotonic()
+        self.workers = workers or multiprocessing.cpu_count()
+        options = dict(options, verbose=verbose, session_key=session_key)
+        self.outbox = multiprocessing.Queue()
+        self.inboxes = []
+        self.processes = []
+        for _ in range(self.workers):
+            inbox = multiprocessing.Queue()
+            process = multiprocessing.Process(target=worker_main, args=(config, options, inbox, self.outbox, metrics.enabled), daemon=True)
+            process.start()
+            self.inboxes.append(inbox)
+            self.processes.append(process)
+        self.batches = [[] for _ in range(self.workers)]
+        self.linktypes = [LINKTYPE_RAW] * self.workers
+        self.lock = threading.Lock()  # Batches are filled by the capture thread and flushed by set_config
+        self.max_history = max_history
+        self.max_sessions = options.get('max_sessions', 1024)
+        self.sessions = OrderedDict()  # TextHistory per session key, least recently active first
+        self.packets = 0
+        self.closed = False
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.collector.start()
+
+    def handle_raw(self, data, linktype=LINKTYPE_RAW):
+        """Queue one captured frame for the worker that owns its flow."""
+        shard = 0
+        if self.shard_key is not None and self.workers > 1:
+            offset = ip_offset(data, linktype)
+            if offset is None:
+                return
+            try:
+                shard = hash(self.shard_key(data, offset)) % self.workers
+            except IndexError:
+                pass  # Truncated frame: any worker can reject it
+        with self.lock:
+            batch = self.batches[shard]
+            if batch and self.linktypes[shard] != linktype:
+                self._send(shard)
+            self.linktypes[shard] = linktype
+            batch.append(bytes(data))
+            self.packets += 1
+            if len(batch) >= self.batch_size:
+                self._send(shard)
+            elif self.packets % 64 == 0 and time.monotonic() - self.last_send > self.max_delay:
+                self._send_all()
+
+    def _send(self, shard):
+        self.inboxes[shard].put((self.linktypes[shard], self.batches[shard]))
+        self.batches[shard] = []
+
+    def _send_all(self):
+        for shard, batch in enumerate(self.batches):
+            if batch:
+                self._send(shard)
+        self.last_send = time.monotonic()
+
+    def expire(self, now=None):
+        """Push out partial batches so quiet links still decode promptly (workers expire their own sessions)."""
+        with self.lock:
+            self._send_all()
+
+    def set_config(self, config):
+        """Switch every worker to a new config version after the frames already captured.
+
+        Called from the config watcher thread, so the batches are swapped under the capture lock.
+        """
+        with self.lock:
+            self._send_all()
+            for inbox in self.inboxes:
+                inbox.put(config)
+
+    def flush(self):
+        """Send the remaining frames, let every worker flush its sessions and wait for their output."""
+        if self.closed:
+            return
+        self.closed = True
+        self.expire()
+        for inbox in self.inboxes:
+            inbox.put(None)
+        self.collector.join()
+        for process in self.processes:
+            process.join()
+
+    close = flush
+
+    def _collect(self):
+        finished = 0
+        while finished < self.workers:
+            try:
+                items = self.outbox.get(timeout=1.0)
+            except queue.Empty:
+                # A worker killed before its sentinel would otherwise block flush() forever
+                if not any(process.is_alive() for process in self.processes):
+                    break
+                continue
+            if items is None:
+                finished += 1
+                continue
+            items, updates = items
+            if updates is not None:
+                metrics.merge(updates)
+            for key, text in items:
+                history = self.sessions.get(key)
+                if history is None:
+                    history = self.sessions[key] = TextHistory(self.max_history)
+                    if len(self.sessions) > self.max_sessions:
+                        self.sessions.popitem(last=False)
+                else:
+                    self.sessions.move_to_end(key)
+                history.append(text)
+                if self.callback:
+                    self.callback(text)
+                if self.echo:
+                    prefix = f"[{key}] " if key is not None and len(self.sessions) > 1 else ''
+                    print(prefix + text, end='', flush=True)
+
+    def text(self, key=None):
+        """Return the retained tail of one session's decoded text (the only session by default)."""
+        if key is None and len(self.sessions) == 1:
+            key = next(iter(self.sessions))
+        history = self.sessions.get(key)
+        return history.text() if history is not None else ''
@@ -6,6 +6,7 @@ from PyQt5.QtGui import QTextCursor
 
 # Import your decoder module
 import decoder.decoder as decoder
+import encoder.config as stego_config
 
 class DecoderThread(QThread):
     message_received = pyqtSignal(str)
@@ -41,7 +42,9 @@ class PacketDecoderApp(QMainWindow):
         config_group = QGroupBox("Decoder Configuration")
         config_layout = QVBoxLayout(config_group)
 
-        self.config_file_input = QLineEdit('config.txt')
+        # Left empty, load_config picks config.json or falls back to the legacy config.txt
+        self.config_file_input = QLineEdit()
+        self.config_file_input.setPlaceholderText(stego_config.CONFIG_PATH)
         config_layout.addWidget(QLabel("Config File:"))
         config_layout.addWidget(self.config_file_input)
 
@@ -80,7 +83,9 @@ class PacketDecoderApp(QMainWindow):
         self.accumulated_message = ""
 
     def start_decoding(self):
-        config_file = self.config_file_input.text()
+        config_file = self.config_file_input.text() or None
+        if config_file == stego_config.CONFIG_PATH:
+            config_file = None
         sniff_filter = self.sniff_filter_input.text() or None
         timeout = self.timeout_input.text()
         timeout = int(timeout) if timeout else None
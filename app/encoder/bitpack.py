@@ -0,0 +1,141 @@
+class BitWriter:
+    """Accumulate variable-width integer values into a bytearray, MSB first."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._acc = 0       # Pending bits that do not yet fill a whole byte
+        self._acc_bits = 0
+
+    def write(self, value, num_bits):
+        """Append the low num_bits of value."""
+        self._acc = (self._acc << num_bits) | (value & ((1 << num_bits) - 1))
+        self._acc_bits += num_bits
+        if self._acc_bits >= 8:
+            whole = self._acc_bits // 8
+            self._acc_bits -= whole * 8
+            self.buffer += (self._acc >> self._acc_bits).to_bytes(whole, 'big')
+            self._acc &= (1 << self._acc_bits) - 1
+
+    def take_bytes(self):
+        """Return and drop the completed bytes, keeping any partial byte pending."""
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+    def getvalue(self):
+        """Return all written bits as bytes, zero-padding the last partial byte."""
+        if self._acc_bits:
+            return bytes(self.buffer) + bytes([(self._acc << (8 - self._acc_bits)) & 0xFF])
+        return bytes(self.buffer)
+
+    def discard_pending(self):
+        """Drop the bits of an incomplete trailing byte."""
+        self._acc = 0
+        self._acc_bits = 0
+
+    @property
+    def pending_bits(self):
+        return self._acc_bits
+
+
+class BitReader:
+    """Read variable-width integer values out of a bytes object, MSB first.
+
+    Reads past the end are zero-padded, matching the ljust('0') padding the
+    encoder applied to the final chunk.
+    """
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.total_bits = len(self.data) * 8
+        self.position = 0
+
+    @property
+    def remaining(self):
+        return max(0, self.total_bits - self.position)
+
+    def read(self, num_bits):
+        """Return the next num_bits as an int."""
+        start = self.position
+        end = start + num_bits
+        self.position = end
+        first_byte = start >> 3
+        last_byte = (end + 7) >> 3
+        chunk = self.data[first_byte:last_byte]
+        value = int.from_bytes(chunk, 'big')
+        # Zero-pad a read that runs off the end of the data
+        available_bits = len(chunk) * 8
+        needed_bits = (last_byte - first_byte) * 8
+        value <<= needed_bits - available_bits
+        value >>= needed_bits - (end - (first_byte << 3))
+        return value & ((1 << num_bits) - 1)
+
+    def read_fields(self, header_bit_fields):
+        """Return one int per (header, bits) entry, in order."""
+        return [self.read(num_bits) for _, num_bits in header_bit_fields]
+
+
+def iter_field_values(blocks, header_bit_fields):
+    """Lazily slice an iterable of byte blocks into per-packet field value lists.
+
+    Bits left over at the end of a block are carried into the next one, so
+    packets span block boundaries exactly as if the payload were one bytes
+    object. The final packet is zero-padded.
+    """
+    total_bits_per_packet = sum(bits for header, bits in header_bit_fields)
+    carry = b''
+    offset = 0  # Bit position of the first unread bit inside carry
+    for block in blocks:
+        if not block:
+            continue
+        reader = BitReader(carry + bytes(block))
+        reader.position = offset
+        while reader.remaining >= total_bits_per_packet:
+            yield reader.read_fields(header_bit_fields)
+        carry = reader.data[reader.position >> 3:]
+        offset = reader.position & 7
+    if len(carry) * 8 > offset:
+        reader = BitReader(carry)
+        reader.position = offset
+        yield reader.read_fields(header_bit_fields)
+
+def nul_terminated(blocks, data_bits):
+    """Pass byte blocks through, adding a NUL byte if the padding after them would be under a byte.
+
+    Packets carrying data_bits bits need not hold whole bytes, so the zero
+    padding in a message's last packet may be shorter than a byte. The
+    decoder realigns on the first NUL byte after a message, so one is added
+    whenever the padding alone would not contain one.
+    """
+    total = 0
+    for block in blocks:
+        total += len(block)
+        yield block
+    padding = -(total * 8) % data_bits
+    if 0 < padding < 8:
+        yield b'\x00'
+
+def split_packed(packed, header_bit_fields):
+    """Split an MSB-first packed int into one value per (header, bits) entry."""
+    values = []
+    shift = sum(bits for header, bits in header_bit_fields)
+    for header, bits in header_bit_fields:
+        shift -= bits
+        values.append((packed >> shift) & ((1 << bits) - 1))
+    return values
+
+def iter_sequenced_values(blocks, header_bit_fields, seq_bits, sequence):
+    """Like iter_field_values, but the first seq_bits of every packet carry an index.
+
+    sequence is an iterator of packet indices (e.g. itertools.count()); only
+    the low seq_bits of each index are sent. The remaining bits of the packet
+    carry payload, so each packet holds seq_bits fewer payload bits.
+    """
+    total_bits_per_packet = sum(bits for header, bits in header_bit_fields)
+    data_bits = total_bits_per_packet - seq_bits
+    if data_bits <= 0:
+        raise ValueError(f"{seq_bits} sequence bits leave no room for data in a {total_bits_per_packet}-bit packet")
+    seq_mask = (1 << seq_bits) - 1
+    # zip pulls the payload first, so the sequence is not advanced past the last packet
+    for (value,), index in zip(iter_field_values(blocks, [('data', data_bits)]), sequence):
+        yield split_packed(((index & seq_mask) << data_bits) | value, header_bit_fields)
@@ -0,0 +1,218 @@
+import itertools
+import lzma
+import zlib
+from collections import Counter
+
+# Every compressed message starts with one header byte: 0xF8 | codec id.
+# 0xF8-0xFB never appear in UTF-8 text, so the decoder can tell a header
+# from plain message bytes, and NUL padding between messages is skipped.
+HEADER_FLAG = 0xF8
+HEADER_MASK = 0xFC
+
+CODEC_RAW = 0        # Uncompressed, varint length prefix
+CODEC_ZLIB = 1       # Raw deflate
+CODEC_ZLIB_DICT = 2  # Raw deflate primed with PRESET_DICTIONARY
+CODEC_LZMA = 3       # Raw LZMA2
+
+CODECS = {'raw': CODEC_RAW, 'zlib': CODEC_ZLIB, 'zlib_dict': CODEC_ZLIB_DICT, 'lzma': CODEC_LZMA}
+
+LZMA_FILTERS = [{'id': lzma.FILTER_LZMA2, 'preset': 9, 'dict_size': 1 << 16}]
+
+# Typical covert messages; the preset dictionary is trained from these at import
+SAMPLE_MESSAGES = [
+    "Hello, this is a covert message",
+    "Meet me at the usual place tomorrow at 10:00.",
+    "The package has been delivered. Please confirm when you receive it.",
+    "Can you send the report by the end of the day?",
+    "Everything is going according to the plan, no problems so far.",
+    "I will call you later tonight with more information.",
+    "Please do not reply to this message until further notice.",
+    "The meeting has been moved to next Monday morning.",
+    "Thank you for the update, I will let the others know.",
+    "We need to change the password for the server before Friday.",
+    "The files are in the shared folder under the project directory.",
+    "Let me know if you have any questions about the new schedule.",
+    "The network is being monitored, keep the messages short.",
+    "Send the address and the time, and I will be there.",
+    "The quick brown fox jumps over the lazy dog",
+    "Testing message over HTTP port",
+    "Are you available for a call this afternoon or tomorrow morning?",
+    "The results from the last test look good, we should continue.",
+    "Please check your email for the latest version of the document.",
+    "I have attached the information you asked for in the previous message.",
+]
+
+def train_dictionary(samples, size=2048):
+    """Build a zlib preset dictionary from the words and phrases that recur in samples.
+
+    Substrings are scored by how many bytes they would save (count x length)
+    and the best ones are placed last, where deflate reaches them most cheaply.
+    """
+    counts = Counter()
+    for sample in samples:
+        words = sample.split(' ')
+        for n in (1, 2, 3):
+            for i in range(len(words) - n + 1):
+                phrase = ' '.join(words[i:i + n])
+                if len(phrase) >= 3:
+                    counts[' ' + phrase] += 1
+    ranked = sorted(counts.items(), key=lambda item: (item[1] * len(item[0]), item[0]), reverse=True)
+    chosen = []
+    total = 0
+    for phrase, count in ranked:
+        encoded = phrase.encode('utf-8')
+        if count < 2 and len(encoded) < 5:
+            continue
+        if any(encoded in other for other in chosen):
+            continue
+        if total + len(encoded) > size:
+            break
+        chosen.append(encoded)
+        total += len(encoded)
+    return b''.join(reversed(chosen))
+
+PRESET_DICTIONARY = train_dictionary(SAMPLE_MESSAGES)
+
+def encode_varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def make_compressor(codec, level=9):
+    """Return a streaming compressor object (compress/flush) for a codec id."""
+    if codec == CODEC_ZLIB:
+        return zlib.compressobj(level, zlib.DEFLATED, -15, 9)
+    if codec == CODEC_ZLIB_DICT:
+        return zlib.compressobj(level, zlib.DEFLATED, -15, 9, zdict=PRESET_DICTIONARY)
+    if codec == CODEC_LZMA:
+        return lzma.LZMACompressor(lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+    raise ValueError(f"Codec {codec} has no streaming compressor")
+
+def make_decompressor(codec):
+    """Return a streaming decompressor with eof/unused_data for a codec id."""
+    if codec == CODEC_ZLIB:
+        return zlib.decompressobj(-15)
+    if codec == CODEC_ZLIB_DICT:
+        return zlib.decompressobj(-15, zdict=PRESET_DICTIONARY)
+    if codec == CODEC_LZMA:
+        return lzma.LZMADecompressor(lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+    raise ValueError(f"Unknown codec {codec}")
+
+def frame(codec, data):
+    """Return one framed message: header byte then the codec's body."""
+    if codec == CODEC_RAW:
+        return bytes([HEADER_FLAG | CODEC_RAW]) + encode_varint(len(data)) + data
+    compressor = make_compressor(codec)
+    return bytes([HEADER_FLAG | codec]) + compressor.compress(data) + compressor.flush()
+
+def compress_message(data, codec='auto'):
+    """Frame a whole message, picking the smallest codec when codec is 'auto'.
+
+    'auto' always considers the uncompressed frame too, so compression is
+    skipped whenever it would not make the message shorter.
+    """
+    if codec != 'auto':
+        return frame(CODECS[codec], data)
+    return min((frame(codec_id, data) for codec_id in CODECS.values()), key=len)
+
+def compress_stream(blocks, codec='auto'):
+    """Lazily frame an iterable of byte blocks as one compressed message.
+
+    The length of a stream is not known up front, so with 'auto' the codec
+    is chosen on the first block, falling back to stored (level 0) deflate
+    when nothing compresses it.
+    """
+    blocks = iter(blocks)
+    first = next(blocks, b'')
+    level = 9
+    if codec == 'auto':
+        sizes = {codec_id: len(frame(codec_id, first)) for codec_id in (CODEC_ZLIB, CODEC_ZLIB_DICT, CODEC_LZMA)}
+        codec_id = min(sizes, key=sizes.get)
+        if sizes[codec_id] >= len(first) + 1:
+            codec_id, level = CODEC_ZLIB, 0
+    elif codec == 'raw':
+        codec_id, level = CODEC_ZLIB, 0
+    else:
+        codec_id = CODECS[codec]
+    compressor = make_compressor(codec_id, level)
+    yield bytes([HEADER_FLAG | codec_id])
+    for block in itertools.chain([first], blocks):
+        out = compressor.compress(block)
+        if out:
+            yield out
+    yield compressor.flush()
+
+class StreamDecompressor:
+    """Undo frame()/compress_stream() incrementally on a byte stream of messages.
+
+    Bytes may be fed in any split. NUL padding between messages is skipped,
+    and a byte that is not a frame header is passed through as plain text,
+    so uncompressed senders still decode.
+    """
+
+    def __init__(self):
+        self.codec = None
+        self.decompressor = None
+        self.remaining = 0   # Bytes left in a raw frame
+        self.length = None   # Varint being read for a raw frame: [value, shift]
+        self.messages = 0
+
+    def feed(self, data):
+        """Return the message bytes recovered from data."""
+        out = bytearray()
+        data = bytes(data)
+        while data:
+            if self.codec is None:
+                data = self._read_header(data, out)
+            elif self.codec == CODEC_RAW:
+                data = self._read_raw(data, out)
+            else:
+                out += self.decompressor.decompress(data)
+                if not self.decompressor.eof:
+                    break
+                data = self.decompressor.unused_data
+                self._end()
+        return bytes(out)
+
+    def _read_header(self, data, out):
+        for i, byte in enumerate(data):
+            if byte == 0:
+                continue
+            if byte & HEADER_MASK != HEADER_FLAG:
+                out.append(byte)
+                continue
+            self.codec = byte & ~HEADER_MASK
+            if self.codec == CODEC_RAW:
+                self.length = [0, 0]
+            else:
+                self.decompressor = make_decompressor(self.codec)
+            return data[i + 1:]
+        return b''
+
+    def _read_raw(self, data, out):
+        i = 0
+        while self.length is not None and i < len(data):
+            byte = data[i]
+            i += 1
+            self.length[0] |= (byte & 0x7F) << self.length[1]
+            self.length[1] += 7
+            if not byte & 0x80:
+                self.remaining = self.length[0]
+                self.length = None
+        take = min(self.remaining, len(data) - i) if self.length is None else 0
+        out += data[i:i + take]
+        self.remaining -= take
+        if self.length is None and self.remaining == 0:
+            self._end()
+        return data[i + take:]
+
+    def _end(self):
+        self.codec = None
+        self.decompressor = None
+        self.messages += 1
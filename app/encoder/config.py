@@ -0,0 +1,255 @@
+import ipaddress
+import json
+import math
+import os
+import threading
+import encoder.planner as planner
+from encoder.compression import CODECS
+
+# The shared configuration lives next to app/, wherever the programs are started from
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CONFIG_PATH = os.path.join(ROOT, 'config.json')
+LEGACY_CONFIG_PATH = os.path.join(ROOT, 'config.txt')
+
+class StegoConfig:
+    """One version of the shared encoder/decoder configuration.
+
+    Each packet's covert bits are laid out as
+    [version tag][session id][sequence][data]; version_bits carries
+    version modulo 2**version_bits so a decoder that has switched to a new
+    version can still tell packets built under the previous ones apart.
+    """
+
+    def __init__(self, destination_ip, destination_port, header_bit_fields, seq_bits=0, fec_block=32, fec_redundancy=0.0, compression=None, session_bits=0, session_id=0, version=1, version_bits=0):
+        self.destination_ip = destination_ip
+        self.destination_port = destination_port
+        self.header_bit_fields = [(header, bits) for header, bits in header_bit_fields]
+        self.seq_bits = seq_bits
+        self.fec_block = fec_block
+        self.fec_redundancy = fec_redundancy
+        self.compression = compression
+        self.session_bits = session_bits
+        self.session_id = session_id
+        self.version = version
+        self.version_bits = version_bits
+
+    @property
+    def total_bits(self):
+        return sum(bits for header, bits in self.header_bit_fields)
+
+    @property
+    def version_tag(self):
+        return self.version & ((1 << self.version_bits) - 1)
+
+    @property
+    def fec_shards(self):
+        """(data_shards, parity_shards), or None if FEC is off."""
+        if not self.fec_block or self.fec_redundancy <= 0:
+            return None
+        return self.fec_block, math.ceil(self.fec_block * self.fec_redundancy)
+
+    @property
+    def prefix(self):
+        """(bits, value) of the fixed in-band prefix (version tag then session id), or None."""
+        bits = self.version_bits + self.session_bits
+        if not bits:
+            return None
+        return bits, (self.version_tag << self.session_bits) | self.session_id
+
+    def validate(self):
+        """Raise ValueError if the configuration cannot work."""
+        try:
+            ipaddress.IPv4Address(self.destination_ip)
+        except ValueError:
+            raise ValueError(f"Invalid destination IP: {self.destination_ip}")
+        if not 0 < self.destination_port < 65536:
+            raise ValueError(f"Invalid destination port: {self.destination_port}")
+        if not self.header_bit_fields:
+            raise ValueError("At least one header field is needed")
+        for header, bits in self.header_bit_fields:
+            if header not in planner.FIELD_CAPACITY:
+                raise ValueError(f"Unknown header: {header}")
+            if not 0 < bits <= planner.FIELD_CAPACITY[header]:
+                raise ValueError(f"{header} carries 1 to {planner.FIELD_CAPACITY[header]} bits, not {bits}")
+        if min(self.seq_bits, self.session_bits, self.version_bits) < 0:
+            raise ValueError("Bit counts cannot be negative")
+        total_bits = self.total_bits
+        if self.seq_bits and self.seq_bits >= total_bits:
+            raise ValueError(f"Sequence bits ({self.seq_bits}) must be fewer than the total bits per packet ({total_bits})")
+        prefix_bits = self.version_bits + self.session_bits + self.seq_bits
+        if (self.version_bits or self.session_bits) and prefix_bits >= total_bits:
+            raise ValueError(f"Version, session and sequence bits ({prefix_bits}) must be fewer than the total bits per packet ({total_bits})")
+        if self.session_id < 0 or self.session_id >= (1 << self.session_bits):
+            raise ValueError(f"Session id {self.session_id} does not fit in {self.session_bits} bits")
+        if self.fec_redundancy > 0:
+            # Lost packets are found from sequence gaps, and a whole block must fit in half the sequence space
+            block_packets = sum(self.fec_shards)
+            if not self.seq_bits or (1 << self.seq_bits) < 2 * block_packets:
+                raise ValueError(f"FEC blocks of {block_packets} packets need at least {(2 * block_packets - 1).bit_length()} sequence bits")
+            if total_bits - prefix_bits < 8:
+                raise ValueError("FEC needs at least 8 data bits per packet after the sequence number")
+        if self.compression is not None and self.compression != 'auto' and self.compression not in CODECS:
+            raise ValueError(f"Unknown compression codec: {self.compression}")
+        return self
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'destination_ip': self.destination_ip,
+            'destination_port': self.destination_port,
+            'fields': [{'header': header, 'bits': bits} for header, bits in self.header_bit_fields],
+            'sequence_bits': self.seq_bits,
+            'fec': {'block': self.fec_block, 'redundancy': self.fec_redundancy} if self.fec_redundancy > 0 else None,
+            'compression': self.compression,
+            'session': {'bits': self.session_bits, 'id': self.session_id} if self.session_bits else None,
+            'version_bits': self.version_bits,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        try:
+            fec = data.get('fec') or {}
+            session = data.get('session') or {}
+            return cls(
+                data['destination_ip'], int(data['destination_port']),
+                [(field['header'], int(field['bits'])) for field in data['fields']],
+                seq_bits=int(data.get('sequence_bits', 0)),
+                fec_block=int(fec.get('block', 32)), fec_redundancy=float(fec.get('redundancy', 0.0)),
+                compression=data.get('compression'),
+                session_bits=int(session.get('bits', 0)), session_id=int(session.get('id', 0)),
+                version=int(data.get('version', 1)), version_bits=int(data.get('version_bits', 0)),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Malformed configuration: {e!r}")
+
+    def save(self, path=None):
+        """Validate and write the configuration; readers never see a half-written file."""
+        path = path or CONFIG_PATH
+        self.validate()
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write('\n')
+        os.replace(tmp, path)
+        _cache.pop(path, None)
+
+    def describe(self):
+        lines = [f"Header: {header}, Bits: {bits}" for header, bits in self.header_bit_fields]
+        lines.append(f"Total bits per packet: {self.total_bits}")
+        if self.seq_bits:
+            lines.append(f"Sequence bits: {self.seq_bits}")
+        if self.fec_shards:
+            lines.append(f"FEC: {self.fec_block} data packets per block, redundancy {self.fec_redundancy}")
+        if self.compression:
+            lines.append(f"Compression: {self.compression}")
+        if self.session_bits:
+            lines.append(f"Session id: {self.session_id} ({self.session_bits} bits)")
+        lines.append(f"Config version: {self.version}" + (f" (tagged in {self.version_bits} bits)" if self.version_bits else ''))
+        return "\n".join(lines)
+
+def parse_legacy(path):
+    """Read the old line-based config.txt as version 0."""
+    fields = []
+    values = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if line.startswith('Header:'):
+                parts = line.strip().split(',')
+                fields.append((parts[0].split(':')[1].strip(), int(parts[1].split(':')[1].strip())))
+            elif ':' in line:
+                name, value = line.split(':', 1)
+                values[name.strip()] = value.strip()
+    return StegoConfig(
+        values.get('Destination IP'), int(values.get('Port', 0)), fields,
+        seq_bits=int(values.get('Sequence bits', 0)),
+        fec_block=int(values.get('FEC block', 32)), fec_redundancy=float(values.get('FEC redundancy', 0.0)),
+        compression=values.get('Compression'),
+        session_bits=int(values.get('Session bits', 0)), session_id=int(values.get('Session id', 0)),
+        version=0,
+    )
+
+_cache = {}  # path -> (mtime_ns, StegoConfig)
+_cache_lock = threading.Lock()
+
+def load_config(path=None):
+    """Return the validated configuration at path, parsing the file only when it changed.
+
+    Falls back to the legacy config.txt when there is no config.json yet.
+    """
+    if path is None:
+        path = CONFIG_PATH if os.path.exists(CONFIG_PATH) or not os.path.exists(LEGACY_CONFIG_PATH) else LEGACY_CONFIG_PATH
+    mtime = os.stat(path).st_mtime_ns
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    if path.endswith('.txt'):
+        config = parse_legacy(path)
+    else:
+        with open(path, 'r') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Malformed configuration: {e}")
+        config = StegoConfig.from_dict(data)
+    config.validate()
+    with _cache_lock:
+        _cache[path] = (mtime, config)
+    return config
+
+def next_version(path=None):
+    """Version number for the next saved configuration."""
+    try:
+        return load_config(path).version + 1
+    except (OSError, ValueError):
+        return 1
+
+class ConfigWatcher:
+    """Poll a config file and call on_change(config) whenever a new valid version appears.
+
+    Invalid or half-edited files are reported and skipped, so the current
+    configuration stays in force until the file is fixed.
+    """
+
+    def __init__(self, on_change, path=None, interval=1.0):
+        self.on_change = on_change
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.version = None
+        self.error = None
+        try:
+            self.version = load_config(path).version
+        except (OSError, ValueError):
+            pass
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def poll(self):
+        """Check the file once; return the new config if it changed."""
+        try:
+            config = load_config(self.path)
+        except (OSError, ValueError) as e:
+            # Report a broken file once, not on every poll
+            if str(e) != self.error:
+                self.error = str(e)
+                print(f"Ignoring configuration change: {e}")
+            return None
+        self.error = None
+        if config.version == self.version:
+            return None
+        self.version = config.version
+        self.on_change(config)
+        return config
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.poll()
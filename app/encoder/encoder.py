@@ -1,65 +1,283 @@
-from scapy.all import IP, TCP, send, Raw
-from encoder.stego_utils import read_config
+from encoder.bitpack import iter_field_values, iter_sequenced_values, nul_terminated
 import encoder.stego_utils as stego_utils
+import encoder.config as stego_config
+import encoder.packet_template as packet_template
+import encoder.sender as packet_sender
+import encoder.pacing as pacing
+import encoder.metrics as metrics
+import encoder.fec as fec
+import encoder.compression as compression_stage
+import encoder.planner as planner
+import argparse
+import asyncio
+import itertools
 import random
-import time
+import sys
 import threading
+import time
 import encoder.network_noise_generator as network_noise_generator  # Ensure this is in the same directory or properly installed
 
-# Define available headers and their maximum bits
-headers_info = {
-    'ipid': {'max_bits': 16},
-    'ttl': {'max_bits': 8},
-    'window': {'max_bits': 16},
-    'tcp_reserved': {'max_bits': 4},
-    'tcp_options': {'max_bits': 320},  # Up to 40 bytes
-    'ip_options': {'max_bits': 320},   # Up to 40 bytes
-    'user_agent': {'max_bits': 8},     # Modifiable within the constraints
-}
+# Available headers and their maximum bits, as validated by StegoConfig
+headers_info = {header: {'max_bits': bits} for header, bits in planner.FIELD_CAPACITY.items()}
 packet_counter_global = 1
+# Next packet index per (destination_ip, destination_port) when sequence numbers are on.
+# The decoder sees one continuous stream per destination, so indices carry on across messages.
+sequence_counters = {}
 
 def encode_message(message):
-    """Convert message to a binary string."""
-    return ''.join(format(ord(char), '08b') for char in message)
+    """Convert message to UTF-8 bytes."""
+    return message.encode('utf-8')
 
-def split_into_chunks(data, chunk_size=8):
-    """Split binary data into chunks of specified size."""
-    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+def split_into_chunks(data, header_bit_fields):
+    """Split encoded bytes into per-packet lists of integer field values."""
+    return list(iter_field_values([data], header_bit_fields))
 
-def send_covert_message(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, delay=1):
-    global packet_counter_global
-    """Send a covert message to the destination IP and port with a delay between packets."""
-    binary_message = encode_message(message)
-    total_bits_per_packet = sum(bits for header, bits in header_bit_fields)
-    chunks = split_into_chunks(binary_message, total_bits_per_packet)
+def next_sequence(destination_ip, destination_port, align=1):
+    """Yield packet indices for a destination, starting at the next multiple of align.
+
+    The stored counter only advances for indices actually taken, so an
+    unfinished message does not leave a hole in the sequence.
+    """
+    key = (destination_ip, destination_port)
+    start = -(-sequence_counters.get(key, 0) // align) * align
+    for index in itertools.count(start):
+        sequence_counters[key] = index + 1
+        yield index
+
+def iter_chunks(destination_ip, destination_port, blocks, header_bit_fields, seq_bits=0, fec_shards=None, terminate=True, prefix=None):
+    """Lazily slice byte blocks into per-packet field values.
+
+    With seq_bits every packet is prefixed with its sequence index. fec_shards
+    is a (data_shards, parity_shards) pair that adds Reed-Solomon parity
+    packets after every data_shards packets; it requires seq_bits. terminate
+    makes sure a NUL byte follows the data so the decoder can realign when
+    packets do not carry whole bytes; compressed frames mark their own end.
+    prefix is a (bits, value) pair sent in front of the sequence number in
+    every packet: the config version tag and session id (StegoConfig.prefix).
+    """
+    fixed_bits, fixed_value = prefix or (0, 0)
+    prefix_bits = fixed_bits + seq_bits
+    if fec_shards:
+        data_shards, parity_shards = fec_shards
+        sequence = next_sequence(destination_ip, destination_port, data_shards + parity_shards)
+        return fec.iter_fec_values(blocks, header_bit_fields, prefix_bits, with_prefix(sequence, fixed_bits, fixed_value, seq_bits), data_shards, parity_shards)
+    if terminate:
+        blocks = nul_terminated(blocks, sum(bits for header, bits in header_bit_fields) - prefix_bits)
+    if seq_bits:
+        sequence = with_prefix(next_sequence(destination_ip, destination_port), fixed_bits, fixed_value, seq_bits)
+        return iter_sequenced_values(blocks, header_bit_fields, prefix_bits, sequence)
+    if fixed_bits:
+        return iter_sequenced_values(blocks, header_bit_fields, fixed_bits, itertools.repeat(fixed_value))
+    return iter_field_values(blocks, header_bit_fields)
+
+def with_prefix(sequence, fixed_bits, fixed_value, seq_bits):
+    """Put fixed_value in front of each sequence index (a no-op without fixed bits)."""
+    if not fixed_bits:
+        return sequence
+    seq_mask = (1 << seq_bits) - 1
+    return ((fixed_value << seq_bits) | (index & seq_mask) for index in sequence)
+
+def read_blocks(source, block_size=4096):
+    """Yield byte blocks from a file path ('-' for stdin), a binary file object or an iterable of bytes."""
+    if isinstance(source, str):
+        if source == '-':
+            yield from read_blocks(sys.stdin.buffer, block_size)
+            return
+        with open(source, 'rb') as f:
+            yield from read_blocks(f, block_size)
+        return
+    if hasattr(source, 'read'):
+        while True:
+            block = source.read(block_size)
+            if not block:
+                return
+            yield block.encode('utf-8') if isinstance(block, str) else block
+        return
+    for block in source:
+        yield block.encode('utf-8') if isinstance(block, str) else block
+
+def format_chunk(field_values, header_bit_fields):
+    """Render a chunk's field values as a bit string for verbose output."""
+    return ''.join(format(value, f'0{bits}b') for value, (header, bits) in zip(field_values, header_bit_fields))
+
+def build_pacer(header_bit_fields, delay=1, rate=None, bitrate=None, burst=1, jitter=None, noise_type='none', noise_level=0, add_noise=False):
+    """Map the delay/rate settings onto a token bucket.
+
+    rate is in packets/s and bitrate in covert bits/s; either overrides delay.
+    jitter is a (distribution, scale) pair for pacing.make_jitter. The 'delay'
+    noise type becomes per-packet jitter instead of an extra sleep.
+    """
+    if add_noise and noise_type == 'delay':
+        jitter_fn = pacing.noise_jitter(noise_level)
+    elif jitter:
+        jitter_fn = pacing.make_jitter(*jitter)
+    else:
+        jitter_fn = None
+    if bitrate:
+        total_bits_per_packet = sum(bits for header, bits in header_bit_fields)
+        return pacing.TokenBucket.from_bitrate(bitrate, total_bits_per_packet, burst, jitter_fn)
+    if rate is not None:
+        return pacing.TokenBucket(rate, burst, jitter_fn)
+    return pacing.TokenBucket.from_delay(delay, burst, jitter_fn)
+
+def pcap_output(path, pacer):
+    """Return a PcapSender that timestamps packets as pacer would space them, and a pacer that never waits."""
+    interval = 1 / pacer.rate if pacer.rate else 0.0
+    return packet_sender.PcapSender(path, interval), pacing.TokenBucket(None, pacer.capacity)
+
+def iter_packets(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, seq_bits=0, fec_shards=None, compression=None, prefix=None):
+    """Yield the serialized covert packets for a message, one per chunk."""
+    data = encode_message(message)
+    if compression:
+        data = compression_stage.compress_message(data, compression)
+    chunks = iter_chunks(destination_ip, destination_port, [data], header_bit_fields, seq_bits, fec_shards, terminate=not compression, prefix=prefix)
     
     if verbose:
-        print(f"message converted to bits: {chunks}")
+        # Only the printout needs every chunk up front
+        chunks = list(chunks)
+        print(f"message converted to bits: {[format_chunk(chunk, header_bit_fields) for chunk in chunks]}")
     
-    for i, chunk in enumerate(chunks):
+    yield from build_packets(destination_ip, destination_port, chunks, header_bit_fields, noise_type, noise_level, add_noise, verbose)
+
+def build_packets(destination_ip, destination_port, chunks, header_bit_fields, noise_type, noise_level, add_noise, verbose):
+    """Lazily turn an iterable of per-packet field values into serialized packets."""
+    global packet_counter_global
+    template = packet_template.get_template(destination_ip, destination_port, header_bit_fields)
+    total_bits_per_packet = sum(bits for header, bits in header_bit_fields)
+
+    for chunk in chunks:
         if verbose:
             print()
-            print(f"embedding chunk >{chunk}< into packet {packet_counter_global}")
+            print(f"embedding chunk >{format_chunk(chunk, header_bit_fields)}< into packet {packet_counter_global}")
             packet_counter_global += 1
-        
-        if len(chunk) < total_bits_per_packet:
-            chunk = chunk.ljust(total_bits_per_packet, '0')
+            for value, (header, bits) in zip(chunk, header_bit_fields):
+                print(f"embedding >{value:0{bits}b}< in {header}")
 
-        ip = IP(dst=destination_ip)
-        tcp = TCP(sport=random.randint(1024, 65535), dport=destination_port, flags='S', window=1024)
-        unique_identifier = "AN21NY "
-        http_payload = f"GET / HTTP/1.1\r\nHost: {destination_ip}\r\nUser-Agent: Mozilla/5.0 {unique_identifier}\r\n\r\n"
-        pkt = ip / tcp / Raw(load=http_payload)
+        if metrics.enabled:
+            start = time.perf_counter()
+            pkt_bytes = template.build_with_noise(chunk, random.randint(1024, 65535), noise_type, noise_level, add_noise)
+            metrics.EMBED_SECONDS.observe(time.perf_counter() - start)
+            metrics.PACKETS_BUILT.inc()
+            metrics.BITS_EMBEDDED.inc(total_bits_per_packet)
+            yield pkt_bytes
+        else:
+            yield template.build_with_noise(chunk, random.randint(1024, 65535), noise_type, noise_level, add_noise)
+
+def send_covert_message(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, delay=1, sender=None, pacer=None, burst_mode=False, seq_bits=0, fec_shards=None, compression=None, prefix=None):
+    """Send a covert message to the destination IP and port, paced by a token bucket.
+
+    In burst mode packets are pre-built in batches of the bucket's burst size
+    and each batch is pushed back-to-back. With seq_bits, every packet starts
+    with its index so the decoder can reorder and detect losses, and
+    fec_shards adds parity packets so it can also rebuild lost ones.
+    compression is a codec name (or 'auto') from encoder.compression.
+    """
+    if sender is None:
+        sender = packet_sender.acquire_sender()
+        try:
+            return send_covert_message(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, delay, sender, pacer, burst_mode, seq_bits, fec_shards, compression, prefix)
+        finally:
+            packet_sender.release_sender()
+    if pacer is None:
+        pacer = build_pacer(header_bit_fields, delay, noise_type=noise_type, noise_level=noise_level, add_noise=add_noise)
 
-        pkt = stego_utils.embed_with_noise(pkt, chunk, header_bit_fields, noise_type, noise_level, add_noise, verbose)
-        send(pkt, verbose=0)
+    packets = iter_packets(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, seq_bits, fec_shards, compression, prefix)
+    send_packets(destination_ip, packets, sender, pacer, burst_mode)
+
+def send_covert_stream(destination_ip, destination_port, source, header_bit_fields, noise_type, noise_level, add_noise, verbose, delay=1, sender=None, pacer=None, burst_mode=False, block_size=4096, seq_bits=0, fec_shards=None, compression=None, prefix=None):
+    """Send a file, stdin ('-') or iterable of bytes as one covert message with bounded memory.
+
+    The payload is read in blocks and sliced into packets on demand, so the
+    first packet goes out as soon as the first block is read.
+    """
+    if sender is None:
+        sender = packet_sender.acquire_sender()
+        try:
+            return send_covert_stream(destination_ip, destination_port, source, header_bit_fields, noise_type, noise_level, add_noise, verbose, delay, sender, pacer, burst_mode, block_size, seq_bits, fec_shards, compression, prefix)
+        finally:
+            packet_sender.release_sender()
+    if pacer is None:
+        pacer = build_pacer(header_bit_fields, delay, noise_type=noise_type, noise_level=noise_level, add_noise=add_noise)
 
-        # Introduce delay between each packet
-        time.sleep(delay)
+    blocks = read_blocks(source, block_size)
+    if compression:
+        blocks = compression_stage.compress_stream(blocks, compression)
+    chunks = iter_chunks(destination_ip, destination_port, blocks, header_bit_fields, seq_bits, fec_shards, terminate=not compression, prefix=prefix)
+    packets = build_packets(destination_ip, destination_port, chunks, header_bit_fields, noise_type, noise_level, add_noise, verbose)
+    send_packets(destination_ip, packets, sender, pacer, burst_mode)
 
-def start_noise_generation(destination_ip, destination_port, server=False):
+def send_packets(destination_ip, packets, sender, pacer, burst_mode=False):
+    """Send an iterable of serialized packets, paced by pacer."""
+    batch = []
+    for pkt_bytes in packets:
+        if burst_mode:
+            batch.append(pkt_bytes)
+            if len(batch) >= pacer.capacity:
+                pacer.send_burst(sender, batch, destination_ip)
+                batch = []
+        else:
+            pacer.wait()
+            sender.send(pkt_bytes, destination_ip)
+
+    if batch:
+        pacer.send_burst(sender, batch, destination_ip)
+
+async def send_covert_message_async(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, sender, pacer, burst_mode=False, seq_bits=0, fec_shards=None, compression=None, prefix=None):
+    """Coroutine version of send_covert_message that paces with asyncio.sleep."""
+    batch = []
+    for pkt_bytes in iter_packets(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, seq_bits, fec_shards, compression, prefix):
+        if burst_mode:
+            batch.append(pkt_bytes)
+            if len(batch) < pacer.capacity:
+                continue
+            await asyncio.sleep(pacer.reserve(len(batch)))
+            for data in batch:
+                sender.send(data, destination_ip)
+            batch = []
+        else:
+            # Always yield to the loop so unpaced jobs still interleave
+            await asyncio.sleep(pacer.reserve())
+            sender.send(pkt_bytes, destination_ip)
+
+    if batch:
+        await asyncio.sleep(pacer.reserve(len(batch)))
+        for data in batch:
+            sender.send(data, destination_ip)
+
+async def send_many(jobs, noise_type='none', noise_level=0, add_noise=False, verbose=False, delay=1, rate=None, bitrate=None, burst=1, jitter=None, burst_mode=False, pacers=None, seq_bits=0, fec_shards=None, compression=None, prefix=None, sender=None):
+    """Send (destination_ip, destination_port, message, header_bit_fields) jobs concurrently.
+
+    All jobs share one sender and one event loop, so total time follows the
+    slowest destination. Jobs for the same destination share a pacer and run
+    in order, because the decoder rebuilds each destination's stream in
+    arrival order. Pass a pacers dict to keep rates across calls, and a
+    sender (e.g. a PcapSender) to use instead of the shared raw socket.
+    """
+    if pacers is None:
+        pacers = {}
+    locks = {}
+    shared = sender is None
+    if shared:
+        sender = packet_sender.acquire_sender()
+
+    async def run_job(destination_ip, destination_port, message, header_bit_fields):
+        key = (destination_ip, destination_port)
+        if key not in pacers:
+            pacers[key] = build_pacer(header_bit_fields, delay, rate, bitrate, burst, jitter, noise_type, noise_level, add_noise)
+        if key not in locks:
+            locks[key] = asyncio.Lock()
+        async with locks[key]:
+            await send_covert_message_async(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, sender, pacers[key], burst_mode, seq_bits, fec_shards, compression, prefix)
+
+    try:
+        await asyncio.gather(*(run_job(*job) for job in jobs))
+    finally:
+        if shared:
+            packet_sender.release_sender()
+
+def start_noise_generation(destination_ip, destination_port, server=False, transport=None):
     """Start background noise generation."""
-    network_noise_generator.start_noise(destination_ip, destination_port, server=server)
+    network_noise_generator.start_noise(destination_ip, destination_port, server=server, transport=transport)
 
 def get_user_configuration():
     print("Available headers for embedding:")
@@ -94,25 +312,61 @@ def get_user_configuration():
         exit()
     return selected_headers
 
-def start_encoder(load_config=False, use_noise=None, messages=None, verbose=False, delay=1):
+def framing(config):
+    """Keyword arguments for the send functions from a StegoConfig."""
+    return dict(seq_bits=config.seq_bits, fec_shards=config.fec_shards, compression=config.compression, prefix=config.prefix)
+
+def reload_config(config):
+    """Return the latest saved configuration if it differs from config (the file is only re-read when it changed)."""
+    try:
+        latest = stego_config.load_config()
+    except (OSError, ValueError) as e:
+        print(f"Keeping configuration version {config.version}: {e}")
+        return config
+    if latest.version != config.version:
+        print(f"Switched to configuration version {latest.version}.")
+        # Decoders start a new version's reassembly at index 0
+        sequence_counters.clear()
+        return latest
+    return config
+
+def start_encoder(load_config=False, use_noise=None, messages=None, verbose=False, delay=1, rate=None, bitrate=None, burst=1, jitter=None, burst_mode=False, metrics_port=None, plan_budget=None, pcap_path=None, transport=None):
+    """Run the encoder. Without load_config the headers are prompted for, or,
+    with plan_budget, chosen by planner.plan_allocation for that stealth budget.
+    With pcap_path the packets are written to that capture file instead of
+    the network, timestamped delay seconds apart without actually waiting.
+    transport (see encoder.transport) carries the packets and any background
+    noise instead; the caller keeps ownership and closes it.
+    A newer saved configuration version is picked up before each message."""
+    if metrics_port is not None:
+        metrics.start_http_server(metrics_port)
     if load_config:
-        config, destination_port, destination_ip = read_config()
-        header_bit_fields = []
-        for header, bits in config.items():
-            header_bit_fields.append((header, bits))
-        print("Configuration loaded in encoder.")
+        config = stego_config.load_config()
+        print(f"Configuration version {config.version} loaded in encoder.")
     else:
         # Prompt for destination IP and port if not provided
         destination_ip = input("Enter destination IP address: ")
         destination_port = int(input("Enter destination port number: "))
     
         # Get user configuration for embedding if not provided
-        selected_headers = get_user_configuration()
-        header_bit_fields = []
-        for header, bits in selected_headers.items():
-            header_bit_fields.append((header, bits))
-        stego_utils.save_to_config(destination_ip, destination_port, header_bit_fields)
+        if plan_budget is not None:
+            header_bit_fields = planner.plan_allocation(budget=plan_budget)
+            print(f"Planned allocation: {planner.describe(header_bit_fields)}")
+        else:
+            selected_headers = get_user_configuration()
+            header_bit_fields = []
+            for header, bits in selected_headers.items():
+                header_bit_fields.append((header, bits))
+        seq_bits = int(input("Enter number of sequence bits per packet (0 for none): ") or 0)
+        fec_redundancy = 0.0
+        if seq_bits:
+            fec_redundancy = float(input("Enter FEC redundancy ratio (e.g. 0.25, 0 for none): ") or 0)
+        compression = None
+        if input("Compress messages? (yes/no): ").lower() == 'yes':
+            compression = 'auto'
+        config = stego_utils.save_to_config(destination_ip, destination_port, header_bit_fields, seq_bits, fec_redundancy=fec_redundancy, compression=compression)
         verbose = input("Verbose? (yes/no): ").lower() == 'yes'
+    destination_ip, destination_port = config.destination_ip, config.destination_port
         
     # Ask if the user wants to add noise at the start if not provided
     if use_noise is None:
@@ -126,7 +380,7 @@ def start_encoder(load_config=False, use_noise=None, messages=None, verbose=Fals
             start_noise = input("Start background noise generation? (yes/no): ").lower() == 'yes'
             if start_noise:
                 noise_server = input("Start noise as server? (yes/no): ").lower() == 'yes'
-                noise_thread = threading.Thread(target=noise.start_noise_generation, args=(destination_ip, destination_port, noise_server))
+                noise_thread = threading.Thread(target=start_noise_generation, args=(destination_ip, destination_port, noise_server, transport))
                 noise_thread.daemon = True
                 noise_thread.start()
                 print("Background noise generation started.")
@@ -139,19 +393,82 @@ def start_encoder(load_config=False, use_noise=None, messages=None, verbose=Fals
         noise_level = 0
         add_noise = False
     
-    # Message input loop
-    if messages is None:
-        while True:
-            message = input("Enter covert message (or 'exit' to quit): ")
-            if message.lower() == 'exit':
-                print("Exiting.")
-                break
-            send_covert_message(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, delay)
-            print("Message sent successfully.\n")
+    # One pacer keeps the rate across message boundaries
+    pacer = build_pacer(config.header_bit_fields, delay, rate, bitrate, burst, jitter, noise_type, noise_level, add_noise)
+    if transport is not None:
+        sender = transport
+    elif pcap_path is not None:
+        sender, pacer = pcap_output(pcap_path, pacer)
     else:
-        for message in messages:
-            send_covert_message(destination_ip, destination_port, message, header_bit_fields, noise_type, noise_level, add_noise, verbose, delay)
+        # One sender is shared by every message in this session and closed on shutdown
+        sender = packet_sender.acquire_sender()
+    pacers = {(destination_ip, destination_port): pacer}
+    settings = dict(noise_type=noise_type, noise_level=noise_level, add_noise=add_noise, verbose=verbose, burst_mode=burst_mode, pacers=pacers, sender=sender)
+
+    try:
+        # Message input loop
+        if messages is None:
+            while True:
+                message = input("Enter covert message (or 'exit' to quit): ")
+                if message.lower() == 'exit':
+                    print("Exiting.")
+                    break
+                config = reload_config(config)
+                asyncio.run(send_many([(config.destination_ip, config.destination_port, message, config.header_bit_fields)], **settings, **framing(config)))
+                print("Message sent successfully.\n")
+        else:
+            asyncio.run(send_many([(destination_ip, destination_port, message, config.header_bit_fields) for message in messages], **settings, **framing(config)))
+    finally:
+        if transport is not None:
+            pass
+        elif pcap_path is not None:
+            sender.close()
+        else:
+            packet_sender.release_sender()
+
+def start_encoder_stream(source, use_noise=False, verbose=False, delay=1, rate=None, bitrate=None, burst=1, jitter=None, burst_mode=False, block_size=4096, metrics_port=None, pcap_path=None, transport=None):
+    """Stream a file, stdin ('-') or iterable of bytes using the saved configuration.
+
+    With pcap_path the packets go to that capture file instead of the network,
+    and with transport (which the caller closes) through that transport.
+    """
+    if metrics_port is not None:
+        metrics.start_http_server(metrics_port)
+    config = stego_config.load_config()
+    header_bit_fields = config.header_bit_fields
+    print(f"Configuration version {config.version} loaded in encoder.")
+
+    if use_noise:
+        noise_type, noise_level, add_noise = 'random_padding', 5, True
+    else:
+        noise_type, noise_level, add_noise = 'none', 0, False
+
+    pacer = build_pacer(header_bit_fields, delay, rate, bitrate, burst, jitter, noise_type, noise_level, add_noise)
+    sender = transport
+    if transport is None and pcap_path is not None:
+        sender, pacer = pcap_output(pcap_path, pacer)
+    try:
+        send_covert_stream(config.destination_ip, config.destination_port, source, header_bit_fields, noise_type, noise_level, add_noise, verbose, delay, sender=sender, pacer=pacer, burst_mode=burst_mode, block_size=block_size, **framing(config))
+    finally:
+        if transport is None and sender is not None:
+            sender.close()
 
 if __name__ == "__main__":
-    delay = float(input("Enter the delay between messages in seconds (e.g., 1 for 1 second, 5 for 5 seconds): "))
-    start_encoder(delay=delay)
+    parser = argparse.ArgumentParser(description="Covert channel encoder")
+    parser.add_argument("--file", help="Stream this file as the payload ('-' for stdin) using the saved configuration")
+    parser.add_argument("--delay", type=float, help="Delay between packets in seconds")
+    parser.add_argument("--block_size", type=int, default=4096, help="Read size in bytes when streaming a file")
+    parser.add_argument("--noise", action="store_true", help="Add random padding noise when streaming a file")
+    parser.add_argument("--verbose", action="store_true", help="Print every embedded chunk")
+    parser.add_argument("--plan_budget", type=int, help="Let the capacity planner pick the header fields for this stealth budget")
+    parser.add_argument("--pcap", help="Write packets to this .pcap/.pcapng file instead of sending them")
+    parser.add_argument("--metrics_port", type=int, help="Serve Prometheus metrics on this localhost port")
+    args = parser.parse_args()
+
+    if args.file:
+        start_encoder_stream(args.file, use_noise=args.noise, verbose=args.verbose, delay=args.delay if args.delay is not None else 1, block_size=args.block_size, metrics_port=args.metrics_port, pcap_path=args.pcap)
+    else:
+        delay = args.delay
+        if delay is None:
+            delay = float(input("Enter the delay between messages in seconds (e.g., 1 for 1 second, 5 for 5 seconds): "))
+        start_encoder(delay=delay, metrics_port=args.metrics_port, plan_budget=args.plan_budget, pcap_path=args.pcap)
@@ -0,0 +1,154 @@
+import math
+from encoder.bitpack import split_packed
+
+# GF(256) arithmetic with the AES/Reed-Solomon polynomial x^8 + x^4 + x^3 + x^2 + 1
+GF_EXP = [0] * 512
+GF_LOG = [0] * 256
+_x = 1
+for _i in range(255):
+    GF_EXP[_i] = _x
+    GF_LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11D
+for _i in range(255, 512):
+    GF_EXP[_i] = GF_EXP[_i - 255]
+
+def gf_mul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return GF_EXP[GF_LOG[a] + GF_LOG[b]]
+
+def gf_inv(a):
+    if a == 0:
+        raise ZeroDivisionError("0 has no inverse in GF(256)")
+    return GF_EXP[255 - GF_LOG[a]]
+
+# MUL_TABLES[c] maps every byte b to c*b, so bytes.translate multiplies a whole shard at once
+MUL_TABLES = [bytes(gf_mul(c, b) for b in range(256)) for c in range(256)]
+
+def combine(coefficients, shards, length):
+    """Return sum(c * shard) over GF(256) for equal-length byte shards."""
+    acc = 0
+    for c, shard in zip(coefficients, shards):
+        if c == 1:
+            acc ^= int.from_bytes(shard, 'big')
+        elif c:
+            acc ^= int.from_bytes(shard.translate(MUL_TABLES[c]), 'big')
+    return acc.to_bytes(length, 'big')
+
+def invert_matrix(matrix):
+    """Invert a square matrix over GF(256) by Gauss-Jordan elimination."""
+    n = len(matrix)
+    rows = [list(row) + [int(i == j) for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = next((r for r in range(col, n) if rows[r][col]), None)
+        if pivot is None:
+            raise ValueError("matrix is singular")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        inv = gf_inv(rows[col][col])
+        rows[col] = [gf_mul(inv, v) for v in rows[col]]
+        for r in range(n):
+            factor = rows[r][col]
+            if r != col and factor:
+                rows[r] = [v ^ gf_mul(factor, p) for v, p in zip(rows[r], rows[col])]
+    return [row[n:] for row in rows]
+
+class ReedSolomon:
+    """Systematic Reed-Solomon erasure code over GF(256) on equal-length byte shards.
+
+    The k data shards are sent as-is, followed by m parity shards built from
+    a Cauchy matrix. Any k of the k + m shards rebuild the data, because every
+    square submatrix of a Cauchy matrix is invertible.
+    """
+
+    def __init__(self, data_shards, parity_shards):
+        if data_shards < 1 or parity_shards < 0 or data_shards + parity_shards > 256:
+            raise ValueError("need 1 <= data_shards and data_shards + parity_shards <= 256")
+        self.data_shards = data_shards
+        self.parity_shards = parity_shards
+        self.total_shards = data_shards + parity_shards
+        # Cauchy rows 1 / (x_r + y_i) with x_r = k + r and y_i = i all distinct
+        self.parity_matrix = [[gf_inv((data_shards + r) ^ i) for i in range(data_shards)] for r in range(parity_shards)]
+        self._inverse_cache = {}
+
+    def encode(self, shards):
+        """Return the parity shards for a list of k equal-length data shards."""
+        length = len(shards[0])
+        return [combine(row, shards, length) for row in self.parity_matrix]
+
+    def _row(self, index):
+        if index < self.data_shards:
+            return [int(i == index) for i in range(self.data_shards)]
+        return self.parity_matrix[index - self.data_shards]
+
+    def decode(self, received):
+        """Rebuild the k data shards from a dict of at least k {shard index: bytes}."""
+        k = self.data_shards
+        if all(i in received for i in range(k)):
+            return [received[i] for i in range(k)]
+        if len(received) < k:
+            raise ValueError(f"need {k} shards to decode, got {len(received)}")
+        # Prefer data shards: they contribute identity rows and need no arithmetic
+        indices = tuple(sorted(received)[:k])
+        inverse = self._inverse_cache.get(indices)
+        if inverse is None:
+            inverse = invert_matrix([self._row(i) for i in indices])
+            self._inverse_cache[indices] = inverse
+        length = len(received[indices[0]])
+        shards = [received[i] for i in indices]
+        return [received[i] if i in received else combine(inverse[i], shards, length) for i in range(k)]
+
+def parity_for(data_shards, redundancy):
+    """Number of parity shards for a block of data_shards at the given redundancy ratio."""
+    return math.ceil(data_shards * redundancy)
+
+def iter_fec_shards(blocks, shard_bytes, data_shards, parity_shards):
+    """Lazily cut byte blocks into shard_bytes shards and append parity after every k of them.
+
+    The last block is padded with zero bytes and zero shards; the decoder
+    drops NUL bytes, so padding never shows up in the message.
+    """
+    codec = ReedSolomon(data_shards, parity_shards)
+    buffer = bytearray()
+    group = []
+    for block in blocks:
+        buffer += block
+        start = 0
+        while len(buffer) - start >= shard_bytes:
+            shard = bytes(buffer[start:start + shard_bytes])
+            start += shard_bytes
+            group.append(shard)
+            yield shard
+            if len(group) == data_shards:
+                yield from codec.encode(group)
+                group = []
+        del buffer[:start]
+    if buffer:
+        shard = bytes(buffer).ljust(shard_bytes, b'\x00')
+        group.append(shard)
+        yield shard
+    if group:
+        while len(group) < data_shards:
+            group.append(bytes(shard_bytes))
+            yield group[-1]
+        yield from codec.encode(group)
+
+def iter_fec_values(blocks, header_bit_fields, seq_bits, sequence, data_shards, parity_shards):
+    """Per-packet field values for an FEC-protected stream: sequence index then one shard.
+
+    Each packet carries one shard of (data bits // 8) bytes after its
+    seq_bits index; any leftover bits are sent as zero. The decoder finds a
+    shard's block and position from its index, so sequence must start on a
+    block boundary.
+    """
+    data_bits = sum(bits for header, bits in header_bit_fields) - seq_bits
+    shard_bytes = data_bits // 8
+    if shard_bytes < 1:
+        raise ValueError("FEC needs at least 8 data bits per packet after the sequence number")
+    spare_bits = data_bits - shard_bytes * 8
+    seq_mask = (1 << seq_bits) - 1
+    shards = iter_fec_shards(blocks, shard_bytes, data_shards, parity_shards)
+    for shard, index in zip(shards, sequence):
+        packed = ((index & seq_mask) << data_bits) | (int.from_bytes(shard, 'big') << spare_bits)
+        yield split_packed(packed, header_bit_fields)
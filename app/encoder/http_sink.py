@@ -0,0 +1,208 @@
+import asyncio
+import threading
+import encoder.metrics as metrics
+
+MAX_HEADER_BYTES = 65536
+DEFAULT_BODY = b"<html><body><h1>OK</h1></body></html>"
+
+def build_response(body, status=b'200 OK', close=False, keep_alive=False):
+    """Serialize a complete HTTP/1.1 response with a fixed body.
+
+    keep_alive adds the Connection: keep-alive that HTTP/1.0 clients need to reuse the connection.
+    """
+    headers = [b'HTTP/1.1 ' + status, b'Content-Type: text/html', b'Content-Length: ' + str(len(body)).encode()]
+    if close:
+        headers.append(b'Connection: close')
+    elif keep_alive:
+        headers.append(b'Connection: keep-alive')
+    return b'\r\n'.join(headers) + b'\r\n\r\n' + body
+
+class SinkStats:
+    """Request, connection and byte counters shared by every connection of one sink."""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+    def snapshot(self):
+        return dict(connections=self.connections, requests=self.requests, bytes_received=self.bytes_received, bytes_sent=self.bytes_sent)
+
+class SinkProtocol(asyncio.Protocol):
+    """One client connection: parse pipelined requests from the buffer and answer them in order.
+
+    Every complete request in a read is answered with a single write, and
+    reading pauses while the client is not draining responses. Connections
+    stay open (HTTP/1.1 keep-alive) unless the client asks to close or
+    speaks HTTP/1.0 without keep-alive. Bodies are skipped by Content-Length;
+    chunked request bodies are refused.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.stats = sink.stats
+        self.buffer = bytearray()
+        self.skip = 0  # Body bytes of the current request still to discard
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.sink.transports.add(transport)
+        self.stats.connections += 1
+        metrics.SINK_CONNECTIONS.inc()
+
+    def connection_lost(self, exc):
+        self.sink.transports.discard(self.transport)
+
+    def data_received(self, data):
+        self.stats.bytes_received += len(data)
+        metrics.SINK_BYTES_RECEIVED.inc(len(data))
+        if self.skip:
+            if len(data) <= self.skip:
+                self.skip -= len(data)
+                return
+            data = data[self.skip:]
+            self.skip = 0
+        self.buffer += data
+        responses = []
+        close = False
+        while self.buffer and not close:
+            end = self.buffer.find(b'\r\n\r\n')
+            if end < 0:
+                if len(self.buffer) > MAX_HEADER_BYTES:
+                    responses.append(self.sink.error(b'431 Request Header Fields Too Large'))
+                    close = True
+                break
+            response, length, close = self.sink.respond(bytes(self.buffer[:end]))
+            responses.append(response)
+            body_end = end + 4 + length
+            if body_end > len(self.buffer):
+                self.skip = body_end - len(self.buffer)
+                body_end = len(self.buffer)
+            del self.buffer[:body_end]
+        if responses:
+            self.stats.requests += len(responses)
+            metrics.SINK_REQUESTS.inc(len(responses))
+            sent = sum(len(response) for response in responses)
+            self.stats.bytes_sent += sent
+            metrics.SINK_BYTES_SENT.inc(sent)
+            self.transport.writelines(responses)
+        if close:
+            self.transport.close()
+
+    def pause_writing(self):
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+class HttpSink:
+    """Concurrent HTTP/1.1 sink: the receiving end for cover and covert traffic.
+
+    Runs one asyncio event loop, either in the caller (serve_forever) or on
+    a background thread (start/stop). Responses are prebuilt, response_size
+    bytes of body each (HEAD gets the headers only), and nothing is printed
+    per request; stats counts connections, requests and bytes.
+    """
+
+    def __init__(self, host='0.0.0.0', port=8080, response_size=None, backlog=1024):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        body = DEFAULT_BODY if response_size is None else b'x' * response_size
+        self.response = build_response(body)
+        self.head_response = self.response[:len(self.response) - len(body)]
+        self.close_response = build_response(body, close=True)
+        self.close_head_response = self.close_response[:len(self.close_response) - len(body)]
+        self.keep_alive_response = build_response(body, keep_alive=True)
+        self.keep_alive_head_response = self.keep_alive_response[:len(self.keep_alive_response) - len(body)]
+        self.stats = SinkStats()
+        self.transports = set()
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.failure = None
+
+    def respond(self, head):
+        """Return (response, body length to skip, close) for one request head."""
+        request_line, _, header_block = head.partition(b'\r\n')
+        parts = request_line.split()
+        if len(parts) != 3 or not parts[2].startswith(b'HTTP/'):
+            return self.error(b'400 Bad Request'), 0, True
+        method, version = parts[0], parts[2]
+        length = 0
+        close = version == b'HTTP/1.0'
+        for line in header_block.split(b'\r\n'):
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            if name == b'content-length':
+                # Only 1*DIGIT (RFC 9110); int() would also take signs, underscores and spaces inside
+                value = value.strip(b' \t')
+                if not value.isdigit():
+                    return self.error(b'400 Bad Request'), 0, True
+                length = int(value)
+            elif name == b'connection':
+                value = value.strip().lower()
+                close = value == b'close' or (close and value != b'keep-alive')
+            elif name == b'transfer-encoding' and value.strip().lower() != b'identity':
+                return self.error(b'411 Length Required'), 0, True
+        head_only = method == b'HEAD'
+        if close:
+            response = self.close_head_response if head_only else self.close_response
+        elif version == b'HTTP/1.0':
+            # Keep-alive is opt-in for HTTP/1.0, so say it was granted
+            response = self.keep_alive_head_response if head_only else self.keep_alive_response
+        else:
+            response = self.head_response if head_only else self.response
+        return response, length, close
+
+    def error(self, status):
+        return build_response(b'', status, close=True)
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await self.loop.create_server(lambda: SinkProtocol(self), self.host, self.port, backlog=self.backlog, reuse_address=True)
+        if not self.port:
+            self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def serve_forever(self):
+        """Serve in the calling thread until stop() (from another thread) or Ctrl+C."""
+        print(f"HTTP sink running on {self.host}:{self.port}")
+        asyncio.run(self._serve())
+
+    def start(self):
+        """Serve on a daemon thread; returns once the socket is listening."""
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.failure is not None:
+            raise self.failure
+        return self
+
+    def _run(self):
+        try:
+            asyncio.run(self._serve())
+        except OSError as e:
+            # Binding failed: let start() raise it instead of waiting forever
+            self.failure = e
+            self.ready.set()
+
+    def _shutdown(self):
+        self.server.close()
+        # Keep-alive clients would otherwise hold the server open
+        for transport in list(self.transports):
+            transport.close()
+
+    def stop(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self._shutdown)
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,178 @@
+import bisect
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Metrics are off by default; every update checks this flag first so the
+# disabled cost is one global lookup. Timing call sites should also guard
+# their perf_counter() calls with `if metrics.enabled`.
+enabled = False
+
+registry = []
+
+class Counter:
+    """Monotonic counter, optionally split by the values of one label."""
+
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.values = {}
+        self.lock = threading.Lock()  # The sink, noise engine and capture threads all count
+        registry.append(self)
+
+    def inc(self, amount=1, label=None):
+        if not enabled:
+            return
+        with self.lock:
+            self.values[label] = self.values.get(label, 0) + amount
+
+    def drain(self):
+        with self.lock:
+            values, self.values = self.values, {}
+        return values
+
+    def merge(self, values):
+        with self.lock:
+            for label, amount in values.items():
+                self.values[label] = self.values.get(label, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            values = dict(self.values)
+        if not values:
+            lines.append(f"{self.name} 0")
+        for label, value in sorted(values.items(), key=lambda item: str(item[0])):
+            if self.label is not None and label is not None:
+                lines.append(f'{self.name}{{{self.label}="{label}"}} {value}')
+            else:
+                lines.append(f"{self.name} {value}")
+        return lines
+
+class Histogram:
+    """Histogram of durations in seconds with fixed cumulative buckets."""
+
+    DEFAULT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0)
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value):
+        if not enabled:
+            return
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def drain(self):
+        with self.lock:
+            state = (self.counts, self.sum, self.count)
+            self.counts, self.sum, self.count = [0] * len(self.counts), 0.0, 0
+        return state
+
+    def merge(self, state):
+        counts, total, count = state
+        with self.lock:
+            self.counts = [a + b for a, b in zip(self.counts, counts)]
+            self.sum += total
+            self.count += count
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, bucket in zip(self.buckets, counts):
+            cumulative += bucket
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+# Encoder
+PACKETS_BUILT = Counter('stego_packets_built_total', 'Covert packets built by the encoder')
+BITS_EMBEDDED = Counter('stego_bits_embedded_total', 'Covert bits embedded into packets')
+EMBED_SECONDS = Histogram('stego_embed_seconds', 'Time to build and embed one covert packet')
+# Sender (covert and cover traffic)
+PACKETS_SENT = Counter('stego_packets_sent_total', 'Packets written to the wire by the shared sender')
+SEND_SECONDS = Histogram('stego_send_seconds', 'Time to send one packet')
+# Noise generator
+COVER_PACKETS_SENT = Counter('stego_cover_packets_sent_total', 'Cover traffic packets sent by the noise generator')
+SINK_CONNECTIONS = Counter('stego_sink_connections_total', 'Connections accepted by the HTTP sink')
+SINK_REQUESTS = Counter('stego_sink_requests_total', 'Requests answered by the HTTP sink')
+SINK_BYTES_RECEIVED = Counter('stego_sink_bytes_received_total', 'Bytes received by the HTTP sink')
+SINK_BYTES_SENT = Counter('stego_sink_bytes_sent_total', 'Response bytes written by the HTTP sink')
+# Decoder
+COVERT_PACKETS_SEEN = Counter('stego_covert_packets_seen_total', 'Covert packets decoded')
+COVER_PACKETS_SEEN = Counter('stego_cover_packets_seen_total', 'Captured packets that were not covert')
+FIELD_FAILURES = Counter('stego_field_extraction_failures_total', 'Covert packets missing a configured field', label='field')
+BYTES_DECODED = Counter('stego_bytes_decoded_total', 'Message bytes recovered by the decoder')
+PARSE_SECONDS = Histogram('stego_parse_seconds', 'Time to extract the covert fields from one packet')
+DECODE_SECONDS = Histogram('stego_decode_latency_seconds', 'Time from packet receipt to decoded output')
+SEQUENCE_LOST = Counter('stego_sequence_packets_lost_total', 'Sequenced packets given up on and zero-filled')
+SEQUENCE_REORDERED = Counter('stego_sequence_packets_reordered_total', 'Sequenced packets that arrived ahead of a missing one')
+SEQUENCE_DUPLICATES = Counter('stego_sequence_duplicates_total', 'Sequenced packets dropped as duplicates or too late')
+FEC_BLOCKS_RECOVERED = Counter('stego_fec_blocks_recovered_total', 'FEC blocks with lost packets that were rebuilt from parity')
+SESSIONS_STARTED = Counter('stego_sessions_started_total', 'Decoder sessions opened')
+SESSIONS_EVICTED = Counter('stego_sessions_evicted_total', 'Decoder sessions closed', label='reason')
+FEC_BLOCKS_LOST = Counter('stego_fec_blocks_lost_total', 'FEC blocks that could not be rebuilt')
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def drain():
+    """Return and reset every metric's updates since the last drain, e.g. in a worker process."""
+    return [metric.drain() for metric in registry]
+
+def merge(states):
+    """Add the result of drain() in another process (with the same registry) to this process's metrics."""
+    for metric, state in zip(registry, states):
+        metric.merge(state)
+
+def render():
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serve /metrics in the Prometheus text format."""
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port=9100, address='127.0.0.1'):
+    """Enable metrics and serve them on a localhost endpoint in a daemon thread."""
+    enable()
+    httpd = ThreadingHTTPServer((address, port), MetricsHandler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    print(f"Metrics available at http://{address}:{port}/metrics")
+    return httpd
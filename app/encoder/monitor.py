@@ -0,0 +1,175 @@
+import multiprocessing
+import queue
+import select
+import socket
+import struct
+import threading
+import time
+
+# Linux packet socket statistics (see packet(7))
+ETH_P_ALL = 0x0003
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+
+class PacketRateCounter:
+    """Packets per second over the last `seconds` seconds, in a fixed ring buffer.
+
+    add() is O(1) and memory never grows with monitoring time. Bins of
+    seconds that passed without packets are zeroed when time moves past
+    them, so a long quiet spell costs at most one pass over the ring.
+    """
+
+    def __init__(self, seconds=300, clock=time.time):
+        self.size = seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.counts = [0] * seconds
+        self.current = None  # Absolute second of the newest bin
+        self.total = 0
+
+    def _advance(self, second):
+        if self.current is None:
+            self.current = second
+            return
+        steps = min(second - self.current, self.size)
+        for i in range(1, steps + 1):
+            self.counts[(self.current + i) % self.size] = 0
+        if second > self.current:
+            self.current = second
+
+    def add(self, count=1, now=None):
+        """Count packets seen at now (default: the clock); ones older than the window are ignored."""
+        second = int(self.clock() if now is None else now)
+        with self.lock:
+            self._advance(second)
+            if second > self.current - self.size:
+                self.counts[second % self.size] += count
+                self.total += count
+
+    def series(self, now=None):
+        """Return the per-second counts of the window, oldest first, ending with the current second."""
+        second = int(self.clock() if now is None else now)
+        with self.lock:
+            self._advance(second)
+            start = (self.current + 1) % self.size
+            return self.counts[start:] + self.counts[:start]
+
+    def clear(self):
+        with self.lock:
+            self.counts = [0] * self.size
+            self.current = None
+            self.total = 0
+
+def build_monitor_filter(destination_ip, destination_port):
+    """BPF filter for the TCP traffic to the configured destination."""
+    return f"tcp and dst host {destination_ip} and dst port {destination_port}"
+
+def open_counting_socket(sniff_filter=None, iface=None):
+    """Open a packet socket that the kernel filters and counts on but that is never read.
+
+    The receive buffer is kept at the minimum: once it is full, matching
+    packets are dropped in the kernel, and dropped packets are still counted.
+    """
+    from scapy.arch.linux import attach_filter
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 0)
+    if iface:
+        sock.bind((iface, ETH_P_ALL))
+    if sniff_filter:
+        attach_filter(sock, sniff_filter, iface)
+    read_packet_count(sock)  # Reset: forget what arrived before the filter was attached
+    return sock
+
+def read_packet_count(sock):
+    """Packets that matched since the last call; reading the statistics resets them."""
+    packets, drops = struct.unpack('II', sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 8))
+    return packets  # The kernel already adds the drops into tp_packets
+
+def count_in_kernel(sniff_filter, iface, interval, outbox, stop_event):
+    sock = open_counting_socket(sniff_filter, iface)
+    try:
+        while not stop_event.wait(interval):
+            # Attribute the interval's packets to its middle
+            outbox.put(('count', time.time() - interval / 2, read_packet_count(sock)))
+    finally:
+        sock.close()
+
+def count_captured(sniff_filter, iface, interval, outbox, stop_event):
+    """Fallback without packet sockets: receive raw frames in this process and count them undissected."""
+    from scapy.all import conf
+    sock = conf.L2listen(iface=iface, filter=sniff_filter)
+    count = 0
+    deadline = time.monotonic() + interval
+    try:
+        while not stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                outbox.put(('count', time.time() - interval / 2, count))
+                count = 0
+                deadline += interval
+                continue
+            ready, _, _ = select.select([sock], [], [], remaining)
+            if ready:
+                sock.recv_raw()
+                count += 1
+    finally:
+        sock.close()
+
+def monitor_main(sniff_filter, iface, interval, outbox, stop_event, mode='auto'):
+    """Count packets matching sniff_filter and put ('count', time, packets) on outbox every interval.
+
+    mode 'kernel' reads packet socket statistics (Linux), 'capture' counts
+    received frames, and 'auto' picks 'kernel' where packet sockets exist.
+    Failures are reported as ('error', message).
+    """
+    try:
+        if mode == 'kernel' or (mode == 'auto' and hasattr(socket, 'AF_PACKET')):
+            count_in_kernel(sniff_filter, iface, interval, outbox, stop_event)
+        else:
+            count_captured(sniff_filter, iface, interval, outbox, stop_event)
+    except Exception as e:
+        outbox.put(('error', str(e)))
+
+class PacketMonitor:
+    """Count packets in a separate process and feed the per-interval totals into a PacketRateCounter.
+
+    Packets never reach Python in the calling process; the capture process
+    only sends one aggregate every interval seconds. poll() applies them
+    without blocking, e.g. from a GUI timer.
+    """
+
+    def __init__(self, counter, sniff_filter, iface=None, interval=0.5, mode='auto'):
+        self.counter = counter
+        self.sniff_filter = sniff_filter
+        self.iface = iface
+        self.interval = interval
+        self.mode = mode
+        self.outbox = multiprocessing.Queue()
+        self.stop_event = multiprocessing.Event()
+        self.process = None
+
+    def start(self):
+        self.process = multiprocessing.Process(target=monitor_main, args=(self.sniff_filter, self.iface, self.interval, self.outbox, self.stop_event, self.mode), daemon=True)
+        self.process.start()
+        return self
+
+    def poll(self):
+        """Add every aggregate received so far to the counter; return an error message if the capture failed."""
+        while True:
+            try:
+                item = self.outbox.get_nowait()
+            except queue.Empty:
+                return None
+            if item[0] == 'error':
+                return item[1]
+            _, timestamp, packets = item
+            if packets:
+                self.counter.add(packets, timestamp)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.process is not None:
+            self.process.join(self.interval + 2)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
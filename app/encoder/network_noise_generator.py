@@ -1,73 +1,241 @@
 from scapy.all import *
 import random
+import socket
+import struct
 import time
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
 import argparse
+import encoder.sender as packet_sender
+import encoder.metrics as metrics
+import encoder.pacing as pacing
+import encoder.http_sink as http_sink
+from encoder.packet_template import update_checksum, IP_ID_OFFSET, IP_CHKSUM_OFFSET, TCP_CHKSUM_OFFSET
+from encoder.transport import iter_pcap_records
+from decoder.fast_parser import ip_offset
 
-class SimpleHTTPRequestHandler(BaseHTTPRequestHandler):
-    """Custom HTTP server handler to respond to incoming requests."""
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(b"<html><body><h1>GET request received</h1></body></html>")
-
-    def do_POST(self):
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
-        print(f"Received POST data: {post_data.decode()}")
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(b"<html><body><h1>POST request received</h1></body></html>")
-
-def start_http_server(server_address=('0.0.0.0', 8080)):
-    """Start a simple HTTP server."""
-    httpd = HTTPServer(server_address, SimpleHTTPRequestHandler)
-    print(f"HTTP server running on {server_address[0]}:{server_address[1]}")
-    httpd.serve_forever()
-
-stop_event = threading.Event()
-threads = []
-
-def generate_random_http_traffic(destination_ip, destination_port):
-    """Generate random HTTP GET requests to simulate traffic."""
-    http_methods = ['GET', 'POST', 'HEAD']
-    user_agents = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)',
-        'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:92.0)',
-        'Mozilla/5.0 (iPhone; CPU iPhone OS 14_2 like Mac OS X)'
-    ]
-
-    while not stop_event.is_set():
-        ip = IP(dst=destination_ip)
-        tcp = TCP(sport=random.randint(1024, 65535), dport=destination_port, flags='PA')
-        http_payload = f"{random.choice(http_methods)} / HTTP/1.1\r\nHost: {destination_ip}\r\nUser-Agent: {random.choice(user_agents)}\r\n\r\n"
-        pkt = ip / tcp / Raw(load=http_payload)
-        
-        send(pkt, verbose=0)
-        time.sleep(random.uniform(0.1, 1.5))  # Add realistic delays between packets
-
-def simulate_background_noise(destination_ip, destination_port):
-    """Start multiple threads to generate background network noise."""
-    global threads
-    num_threads = 5  # Number of traffic generation threads
-
-    stop_event.clear()  # Ensure the event is cleared to allow the threads to run
-
-    for _ in range(num_threads):
-        t = threading.Thread(target=generate_random_http_traffic, args=(destination_ip, destination_port))
-        t.daemon = True
-        threads.append(t)
-
-    for t in threads:
-        t.start()
-
-    print("Background noise generation started.")
-
-def start_noise(destination_ip, destination_port, server=False):
+def start_http_server(server_address=('0.0.0.0', 8080), response_size=None):
+    """Run the concurrent keep-alive HTTP sink (see encoder.http_sink) until interrupted."""
+    http_sink.HttpSink(server_address[0], server_address[1], response_size).serve_forever()
+
+HTTP_METHODS = ['GET', 'POST', 'HEAD']
+HTTP_PATHS = ['/', '/index.html', '/api/status', '/static/app.js', '/static/style.css', '/images/logo.png', '/search?q=weather', '/login']
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)',
+    'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:92.0)',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 14_2 like Mac OS X)',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Mobile Safari/537.36',
+    'curl/8.4.0',
+]
+
+DEFAULT_RATE = 200  # Cover packets per second
+IP_DST_OFFSET = 16
+TCP_SPORT_OFFSET = 0
+DPORT_OFFSET = 2  # Same place in TCP and UDP
+L4_CHKSUM_OFFSETS = {6: TCP_CHKSUM_OFFSET, 17: 6}  # TCP, UDP
+
+def patch_word(buf, offset, value, checksum_offsets):
+    """Overwrite the 16-bit word at offset and update each checksum that covers it (RFC 1624)."""
+    old = struct.unpack_from('!H', buf, offset)[0]
+    struct.pack_into('!H', buf, offset, value)
+    for chksum_offset in checksum_offsets:
+        checksum = struct.unpack_from('!H', buf, chksum_offset)[0]
+        struct.pack_into('!H', buf, chksum_offset, update_checksum(checksum, old, value))
+
+def build_http_noise_packet(destination_ip, destination_port):
+    """Serialize one random HTTP request packet to the destination."""
+    ip = IP(dst=destination_ip)
+    tcp = TCP(sport=random.randint(1024, 65535), dport=destination_port, flags='PA')
+    http_payload = f"{random.choice(HTTP_METHODS)} {random.choice(HTTP_PATHS)} HTTP/1.1\r\nHost: {destination_ip}\r\nUser-Agent: {random.choice(USER_AGENTS)}\r\n\r\n"
+    return bytes(ip / tcp / Raw(load=http_payload))
+
+class NoisePool:
+    """Precomputed cover packets that are cheap to vary per send.
+
+    size random HTTP requests are serialized through scapy once; next()
+    copies one and gives it a fresh source port and IP id, fixing both
+    checksums incrementally, so no scapy work happens while sending.
+    """
+
+    def __init__(self, destination_ip, destination_port, size=256):
+        self.packets = [build_http_noise_packet(destination_ip, destination_port) for _ in range(size)]
+
+    def next(self):
+        buf = bytearray(random.choice(self.packets))
+        tcp = (buf[0] & 0x0F) * 4
+        patch_word(buf, IP_ID_OFFSET, random.getrandbits(16), [IP_CHKSUM_OFFSET])
+        patch_word(buf, tcp + TCP_SPORT_OFFSET, random.randint(1024, 65535), [tcp + L4_CHKSUM_OFFSETS[6]])
+        return bytes(buf)
+
+def retarget_packet(frame, offset, destination, destination_port):
+    """Return the IPv4 packet at frame[offset:] readdressed to destination (4 address bytes).
+
+    TCP and UDP packets also get destination_port. The IP checksum and the
+    TCP/UDP checksum (whose pseudo-header covers the address) are updated
+    incrementally, so truncated captures keep consistent checksums too.
+    Returns None if the packet is too short to rewrite.
+    """
+    buf = bytearray(frame[offset:])
+    if len(buf) < 20:
+        return None
+    l4 = (buf[0] & 0x0F) * 4
+    checksums = [IP_CHKSUM_OFFSET]
+    l4_checksum = L4_CHKSUM_OFFSETS.get(buf[9])
+    # Only the first fragment carries the TCP/UDP header
+    first_fragment = struct.unpack_from('!H', buf, 6)[0] & 0x1FFF == 0
+    if l4_checksum is None or not first_fragment or len(buf) < l4 + l4_checksum + 2:
+        l4 = None
+    elif buf[9] == 17 and struct.unpack_from('!H', buf, l4 + l4_checksum)[0] == 0:
+        pass  # UDP without a checksum
+    else:
+        checksums.append(l4 + l4_checksum)
+    for i in (0, 2):
+        patch_word(buf, IP_DST_OFFSET + i, (destination[i] << 8) | destination[i + 1], checksums)
+    if l4 is not None:
+        patch_word(buf, l4 + DPORT_OFFSET, destination_port, checksums[1:])
+    return bytes(buf)
+
+class CoverTraffic:
+    """Base for the cover traffic engines: one daemon thread running _run() until stop()."""
+
+    def __init__(self, destination_ip, sender, max_lag=1.0):
+        self.destination_ip = destination_ip
+        self.sender = sender
+        self.max_lag = max_lag
+        self.stop_event = threading.Event()
+        self.sent = 0
+        self.started = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.monotonic()
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def achieved_rate(self):
+        """Average packets per second sent so far."""
+        elapsed = time.monotonic() - self.started if self.started else 0
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+    def send(self, data):
+        self.sender.send(data, self.destination_ip)
+        self.sent += 1
+        metrics.COVER_PACKETS_SENT.inc()
+
+class NoiseEngine(CoverTraffic):
+    """Send cover traffic from one thread through one sender at a target rate.
+
+    Send times come from an arrival process (see pacing.make_arrivals) on an
+    absolute monotonic schedule, so the long-run rate does not drift with
+    per-packet overhead. If sending falls more than max_lag seconds behind,
+    the schedule restarts from now instead of bursting to catch up.
+    """
+
+    def __init__(self, destination_ip, sender, pool, rate=DEFAULT_RATE, distribution='poisson', max_lag=1.0, **arrival_options):
+        super().__init__(destination_ip, sender, max_lag)
+        self.pool = pool
+        self.rate = rate
+        self.distribution = distribution
+        self.arrivals = pacing.make_arrivals(distribution, rate, **arrival_options)
+
+    def _run(self):
+        next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            next_time += self.arrivals()
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                if self.stop_event.wait(delay):
+                    break
+            elif delay < -self.max_lag:
+                next_time = time.monotonic()
+            self.send(self.pool.next())
+
+class TraceReplayEngine(CoverTraffic):
+    """Replay a recorded pcap/pcapng as cover traffic to the destination.
+
+    The trace is streamed one record at a time, so it can be any length and
+    replay for hours in constant memory. Every IPv4 packet is readdressed
+    with retarget_packet and sent at its original offset from the start of
+    the trace divided by speed, on an absolute monotonic schedule. Non-IPv4
+    records are skipped. With loop the trace starts over after its last
+    packet until stop().
+    """
+
+    def __init__(self, path, destination_ip, destination_port, sender, speed=1.0, loop=True, max_lag=1.0):
+        if speed <= 0:
+            raise ValueError("Replay speed must be positive")
+        super().__init__(destination_ip, sender, max_lag)
+        self.path = path
+        self.destination = socket.inet_aton(destination_ip)
+        self.destination_port = destination_port
+        self.speed = speed
+        self.loop = loop
+        self.passes = 0
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            start = None
+            for frame, linktype, timestamp in iter_pcap_records(self.path):
+                try:
+                    offset = ip_offset(frame, linktype)
+                    data = retarget_packet(frame, offset, self.destination, self.destination_port) if offset is not None else None
+                except (IndexError, struct.error):
+                    data = None
+                if data is None:
+                    continue
+                if start is None:
+                    start, first = time.monotonic(), timestamp
+                deadline = start + (timestamp - first) / self.speed
+                lag = time.monotonic() - deadline
+                if lag > self.max_lag:
+                    start += lag  # Shift the rest of the trace instead of bursting to catch up
+                elif not pacing.sleep_until(deadline, self.stop_event):
+                    return
+                self.send(data)
+            self.passes += 1
+            if not self.loop or start is None:
+                return
+
+engine = None
+noise_sender = None
+noise_shared = False  # Whether noise_sender came from acquire_sender() and must be released
+
+def simulate_background_noise(destination_ip, destination_port, transport=None, rate=DEFAULT_RATE, distribution='poisson', pool_size=256, replay=None, speed=1.0, loop=True, **arrival_options):
+    """Start generating background network noise at rate packets per second.
+
+    Packets go through transport when given, else the shared raw socket.
+    distribution picks the inter-arrival process: 'constant', 'poisson',
+    'pareto' or 'onoff'. With replay, the packets and timing come from that
+    pcap/pcapng trace instead (see TraceReplayEngine).
+    """
+    global engine, noise_sender, noise_shared
+    if engine is not None:
+        return engine
+
+    # The engine sends on one long-lived socket, released in stop_noise()
+    if transport is not None:
+        noise_sender = transport
+        noise_shared = False
+    elif noise_sender is None:
+        noise_sender = packet_sender.acquire_sender()
+        noise_shared = True
+
+    if replay is not None:
+        engine = TraceReplayEngine(replay, destination_ip, destination_port, noise_sender, speed, loop).start()
+        print(f"Background noise replaying {replay} at {speed}x speed.")
+        return engine
+    pool = NoisePool(destination_ip, destination_port, pool_size)
+    engine = NoiseEngine(destination_ip, noise_sender, pool, rate, distribution, **arrival_options).start()
+    print(f"Background noise generation started ({rate} packets/s, {distribution} arrivals).")
+    return engine
+
+def start_noise(destination_ip, destination_port, server=False, transport=None, rate=DEFAULT_RATE, distribution='poisson', pool_size=256, replay=None, speed=1.0, loop=True):
     """Start network noise generation, optionally with an HTTP server."""
     if server:
         server_thread = threading.Thread(target=start_http_server, args=(('0.0.0.0', destination_port),))
@@ -75,21 +243,25 @@ def start_noise(destination_ip, destination_port, server=False):
         server_thread.start()
         print("HTTP server started for noise generation.")
 
-    simulate_background_noise(destination_ip, destination_port)
+    return simulate_background_noise(destination_ip, destination_port, transport, rate, distribution, pool_size, replay, speed, loop)
 
 def stop_noise():
     """Stop all background noise generation."""
-    stop_event.set()
-    for t in threads:
-        t.join()  # Ensure all threads are stopped
-    threads.clear()  # Clear the list to allow restarting
+    global engine, noise_sender
+    if engine is not None:
+        engine.stop()
+        print(f"Sent {engine.sent} cover packets ({engine.achieved_rate():.0f} packets/s).")
+        engine = None
+    if noise_sender is not None and noise_shared:
+        packet_sender.release_sender()
+    noise_sender = None
     print("Noise generation stopped.")
 
-def toggle_noise(destination_ip, destination_port):
+def toggle_noise(destination_ip, destination_port, **options):
     """Toggle noise generation on or off."""
-    if stop_event.is_set():
+    if engine is None:
         print("Resuming noise generation...")
-        start_noise(destination_ip, destination_port)
+        start_noise(destination_ip, destination_port, **options)
     else:
         print("Pausing noise generation...")
         stop_noise()
@@ -99,22 +271,34 @@ if __name__ == "__main__":
     parser.add_argument("destination_ip", help="Destination IP address")
     parser.add_argument("destination_port", type=int, help="Destination port number")
     parser.add_argument("--server", action="store_true", help="Start an HTTP server to handle incoming traffic")
+    parser.add_argument("--response_size", type=int, help="Body bytes in each HTTP server response")
+    parser.add_argument("--metrics_port", type=int, help="Serve Prometheus metrics on this localhost port")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Average cover packets per second")
+    parser.add_argument("--distribution", default='poisson', choices=pacing.ARRIVALS, help="Inter-arrival time distribution")
+    parser.add_argument("--pool_size", type=int, default=256, help="Number of precomputed cover packets")
+    parser.add_argument("--replay", help="Replay this pcap/pcapng trace as cover traffic instead")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+    parser.add_argument("--once", action="store_true", help="Replay the trace once instead of looping")
     args = parser.parse_args()
+    options = dict(rate=args.rate, distribution=args.distribution, pool_size=args.pool_size, replay=args.replay, speed=args.speed, loop=not args.once)
+
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
 
     if args.server:
-        server_thread = threading.Thread(target=start_http_server, args=(('0.0.0.0', args.destination_port),))
+        server_thread = threading.Thread(target=start_http_server, args=(('0.0.0.0', args.destination_port), args.response_size))
         server_thread.daemon = True
         server_thread.start()
         print("HTTP server started for noise generation.")
 
     print(f"Starting background noise generation for {args.destination_ip}:{args.destination_port}")
-    start_noise(args.destination_ip, args.destination_port)
+    start_noise(args.destination_ip, args.destination_port, **options)
 
     try:
         while True:
             command = input("Enter 'toggle' to start/stop noise or 'exit' to quit: ").strip().lower()
             if command == 'toggle':
-                toggle_noise(args.destination_ip, args.destination_port)
+                toggle_noise(args.destination_ip, args.destination_port, **options)
             elif command == 'exit':
                 stop_noise()
                 break
@@ -0,0 +1,140 @@
+import random
+import time
+
+def make_jitter(distribution, scale):
+    """Return a callable producing extra per-packet delay in seconds, or None.
+
+    distribution is one of 'uniform' (0..scale), 'exponential' (mean scale)
+    or 'normal' (|N(0, scale)|).
+    """
+    if not distribution or distribution == 'none' or scale <= 0:
+        return None
+    if distribution == 'uniform':
+        return lambda: random.uniform(0, scale)
+    if distribution == 'exponential':
+        return lambda: random.expovariate(1 / scale)
+    if distribution == 'normal':
+        return lambda: abs(random.gauss(0, scale))
+    raise ValueError(f"Unknown jitter distribution: {distribution}")
+
+def noise_jitter(noise_level):
+    """Jitter equivalent to the per-packet 'delay' noise type."""
+    return lambda: random.uniform(0.05, 0.2) * noise_level
+
+class TokenBucket:
+    """Monotonic-clock token bucket that paces packet transmission.
+
+    rate is in packets per second (None or 0 means unlimited) and burst is the
+    bucket capacity, i.e. how many packets may go out back-to-back. Jitter is
+    added to individual waits only, so it never shifts the long-run schedule.
+    """
+
+    def __init__(self, rate=None, burst=1, jitter=None):
+        self.rate = rate if rate and rate > 0 else None
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.jitter = jitter
+        self.last = time.monotonic()
+
+    @classmethod
+    def from_bitrate(cls, bits_per_second, bits_per_packet, burst=1, jitter=None):
+        """Build a bucket from a target covert bit rate."""
+        return cls(bits_per_second / bits_per_packet, burst, jitter)
+
+    @classmethod
+    def from_delay(cls, delay, burst=1, jitter=None):
+        """Build a bucket equivalent to sleeping delay seconds after every packet."""
+        return cls(1 / delay if delay and delay > 0 else None, burst, jitter)
+
+    def reserve(self, count=1):
+        """Take count tokens and return how long to wait before sending them."""
+        wait = 0.0
+        if self.rate is not None:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= count
+            if self.tokens < 0:
+                wait = -self.tokens / self.rate
+        if self.jitter is not None:
+            wait += self.jitter()
+        return wait
+
+    def wait(self, count=1):
+        """Block until count packets may be sent."""
+        delay = self.reserve(count)
+        if delay > 0:
+            time.sleep(delay)
+
+    def send_burst(self, sender, packets, destination_ip):
+        """Wait for enough tokens, then push a pre-built batch back-to-back."""
+        self.wait(len(packets))
+        for data in packets:
+            sender.send(data, destination_ip)
+
+def pareto_period(mean, alpha=1.5):
+    """Heavy-tailed duration with the given mean (Pareto shape alpha > 1)."""
+    return mean * (alpha - 1) / alpha * random.paretovariate(alpha)
+
+class OnOffArrivals:
+    """Bursty arrivals: Poisson at a peak rate during ON periods, silence during OFF periods.
+
+    ON and OFF lengths are Pareto distributed with the given means, which
+    gives the self-similar burstiness of measured LAN traffic. The peak rate
+    is set so the long-run average is still rate packets per second.
+    """
+
+    def __init__(self, rate, on_mean=0.5, off_mean=0.5, alpha=1.5):
+        self.peak = rate * (on_mean + off_mean) / on_mean
+        self.on_mean = on_mean
+        self.off_mean = off_mean
+        self.alpha = alpha
+        self.on_left = pareto_period(on_mean, alpha)
+
+    def __call__(self):
+        wait = 0.0
+        gap = random.expovariate(self.peak)
+        # Exponential gaps are memoryless, so a gap cut by the end of an ON period resumes in the next one
+        while gap > self.on_left:
+            gap -= self.on_left
+            wait += self.on_left + pareto_period(self.off_mean, self.alpha)
+            self.on_left = pareto_period(self.on_mean, self.alpha)
+        self.on_left -= gap
+        return wait + gap
+
+ARRIVALS = ('constant', 'poisson', 'pareto', 'onoff')
+
+def make_arrivals(distribution, rate, alpha=1.5, on_mean=0.5, off_mean=0.5):
+    """Return a callable producing the gap in seconds before the next packet, averaging rate packets per second.
+
+    distribution is one of 'constant', 'poisson' (exponential gaps),
+    'pareto' (heavy-tailed gaps with shape alpha) or 'onoff' (see OnOffArrivals).
+    """
+    if rate <= 0:
+        raise ValueError("Arrival rate must be positive")
+    if distribution == 'constant':
+        return lambda: 1 / rate
+    if distribution == 'poisson':
+        return lambda: random.expovariate(rate)
+    if distribution == 'pareto':
+        return lambda: pareto_period(1 / rate, alpha)
+    if distribution == 'onoff':
+        return OnOffArrivals(rate, on_mean, off_mean, alpha)
+    raise ValueError(f"Unknown arrival distribution: {distribution}")
+
+def sleep_until(deadline, stop_event=None, spin=0.0005):
+    """Sleep until the monotonic deadline; return False if stop_event was set first.
+
+    The last spin seconds are busy-waited, since a plain sleep can overshoot
+    by a scheduler tick.
+    """
+    delay = deadline - time.monotonic() - spin
+    if delay > 0:
+        if stop_event is not None:
+            if stop_event.wait(delay):
+                return False
+        else:
+            time.sleep(delay)
+    while time.monotonic() < deadline:
+        pass
+    return stop_event is None or not stop_event.is_set()
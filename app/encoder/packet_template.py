@@ -0,0 +1,189 @@
+import random
+import struct
+from scapy.all import IP, TCP
+import encoder.stego_utils as stego_utils
+
+# Offsets inside the serialized packet (relative to the start of each header)
+IP_ID_OFFSET = 4
+IP_TTL_OFFSET = 8
+IP_LEN_OFFSET = 2
+IP_CHKSUM_OFFSET = 10
+TCP_RESERVED_OFFSET = 12
+TCP_WINDOW_OFFSET = 14
+TCP_CHKSUM_OFFSET = 16
+OPTION_DATA_OFFSET = 2  # Skip the kind/type and length bytes
+
+def _ones_sum(data):
+    """One's complement sum of data as big-endian 16-bit words."""
+    if len(data) & 1:
+        data = bytes(data) + b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return total
+
+def update_checksum(checksum, old_sum, new_sum):
+    """Incrementally update a checksum per RFC 1624 eqn. 3: HC' = ~(~HC + ~m + m')."""
+    total = (~checksum & 0xFFFF) + (~old_sum & 0xFFFF) + new_sum
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+class PacketTemplate:
+    """Serialized covert packet that is patched in place for each chunk.
+
+    The base SYN+HTTP packet is built once through scapy with every configured
+    field zeroed, so its layout (option lengths, header lengths) already matches
+    what the scapy path produces for any chunk. build() then writes the field
+    values into a copy of those bytes and fixes both checksums incrementally.
+    """
+
+    def __init__(self, destination_ip, destination_port, header_bit_fields):
+        self.destination_ip = destination_ip
+        self.destination_port = destination_port
+        self.header_bit_fields = list(header_bit_fields)
+        original = stego_utils.build_covert_packet(destination_ip, destination_port, 0)
+        self.original_ipid = original[IP].id
+        self.original_ttl = original[IP].ttl
+        self.original_window = original[TCP].window
+        self.original_reserved = original[TCP].reserved
+
+        zeroed = stego_utils.embed_data_into_packet(
+            original, [0] * len(self.header_bit_fields), self.header_bit_fields, False)
+        self.base = bytes(zeroed)
+        self.ip_header_len = (self.base[0] & 0x0F) * 4
+        self.tcp_offset = self.ip_header_len
+        self.payload_offset = self.tcp_offset + (self.base[self.tcp_offset + TCP_RESERVED_OFFSET] >> 4) * 4
+
+        payload = self.base[self.payload_offset:]
+        marker_index = payload.find(stego_utils.COVERT_MARKER.encode())
+        # The User-Agent field rewrites the character that follows the marker
+        self.user_agent_offset = self.payload_offset + marker_index + len(stego_utils.COVERT_MARKER)
+        self.original_user_agent_char = self.base[self.user_agent_offset]
+
+        self.patchers = []
+        for header, num_bits in self.header_bit_fields:
+            patcher = getattr(self, f'_patch_{header}', None)
+            if patcher is None:
+                print(f"Unknown header: {header}")
+                self.patchers.append((self._patch_unknown, num_bits))
+            else:
+                self.patchers.append((patcher, num_bits))
+
+    def _patch_ip(self, buf, offset, new_bytes):
+        start = offset & ~1
+        end = (offset + len(new_bytes) + 1) & ~1
+        old_sum = _ones_sum(buf[start:end])
+        buf[offset:offset + len(new_bytes)] = new_bytes
+        checksum = struct.unpack_from('!H', buf, IP_CHKSUM_OFFSET)[0]
+        struct.pack_into('!H', buf, IP_CHKSUM_OFFSET, update_checksum(checksum, old_sum, _ones_sum(buf[start:end])))
+
+    def _patch_tcp(self, buf, offset, new_bytes):
+        start = offset & ~1
+        end = min((offset + len(new_bytes) + 1) & ~1, len(buf))
+        old_sum = _ones_sum(buf[start:end])
+        buf[offset:offset + len(new_bytes)] = new_bytes
+        chksum_offset = self.tcp_offset + TCP_CHKSUM_OFFSET
+        checksum = struct.unpack_from('!H', buf, chksum_offset)[0]
+        struct.pack_into('!H', buf, chksum_offset, update_checksum(checksum, old_sum, _ones_sum(buf[start:end])))
+
+    def _patch_ipid(self, buf, value, num_bits):
+        mask = (1 << (16 - num_bits)) - 1  # Mask to keep upper bits
+        new_ipid = (self.original_ipid & (mask << num_bits)) | value
+        self._patch_ip(buf, IP_ID_OFFSET, struct.pack('!H', new_ipid))
+        return True
+
+    def _patch_ttl(self, buf, value, num_bits):
+        mask = (1 << (8 - num_bits)) - 1  # Mask to keep upper bits
+        new_ttl = (self.original_ttl & (mask << num_bits)) | value
+        self._patch_ip(buf, IP_TTL_OFFSET, bytes([new_ttl]))
+        return True
+
+    def _patch_window(self, buf, value, num_bits):
+        mask = (1 << (16 - num_bits)) - 1  # Mask to keep upper bits
+        new_window = (self.original_window & (mask << num_bits)) | value
+        self._patch_tcp(buf, self.tcp_offset + TCP_WINDOW_OFFSET, struct.pack('!H', new_window))
+        return True
+
+    def _patch_tcp_reserved(self, buf, value, num_bits):
+        mask = (1 << (4 - num_bits)) - 1  # Mask to keep upper bits
+        new_reserved = (self.original_reserved & (mask << num_bits)) | value
+        # scapy's reserved field is 3 bits wide and sits between dataofs and the NS flag
+        offset = self.tcp_offset + TCP_RESERVED_OFFSET
+        new_byte = (buf[offset] & 0xF1) | ((new_reserved & 0x07) << 1)
+        self._patch_tcp(buf, offset, bytes([new_byte]))
+        return True
+
+    def _patch_tcp_options(self, buf, value, num_bits):
+        num_bytes = (num_bits + 7) // 8
+        offset = self.tcp_offset + 20 + OPTION_DATA_OFFSET
+        self._patch_tcp(buf, offset, value.to_bytes(num_bytes, byteorder='big'))
+        return True
+
+    def _patch_ip_options(self, buf, value, num_bits):
+        num_bytes = (num_bits + 7) // 8
+        self._patch_ip(buf, 20 + OPTION_DATA_OFFSET, value.to_bytes(num_bytes, byteorder='big'))
+        return True
+
+    def _patch_user_agent(self, buf, value, num_bits):
+        mask = (1 << num_bits) - 1
+        new_char = (self.original_user_agent_char & ~mask) | value
+        if new_char >= 0x80:
+            # A non-ASCII character is UTF-8 encoded as two bytes, changing the layout
+            return False
+        self._patch_tcp(buf, self.user_agent_offset, bytes([new_char]))
+        return True
+
+    def _patch_unknown(self, buf, value, num_bits):
+        return True
+
+    def _append_payload(self, buf, extra):
+        """Append bytes to the payload, fixing IP total length and both checksums."""
+        old_len = len(buf)
+        new_total = old_len + len(extra)
+        self._patch_ip(buf, IP_LEN_OFFSET, struct.pack('!H', new_total))
+        # The TCP pseudo-header carries the segment length
+        chksum_offset = self.tcp_offset + TCP_CHKSUM_OFFSET
+        checksum = struct.unpack_from('!H', buf, chksum_offset)[0]
+        checksum = update_checksum(checksum, old_len - self.tcp_offset, new_total - self.tcp_offset)
+        start = old_len & ~1
+        old_sum = _ones_sum(buf[start:old_len])
+        buf += extra
+        struct.pack_into('!H', buf, chksum_offset, update_checksum(checksum, old_sum, _ones_sum(buf[start:])))
+
+    def build(self, field_values, sport, padding=b''):
+        """Return packet bytes for one chunk, or None if it cannot be patched in place."""
+        buf = bytearray(self.base)
+        self._patch_tcp(buf, self.tcp_offset, struct.pack('!H', sport))
+        for (patcher, num_bits), value in zip(self.patchers, field_values):
+            if not patcher(buf, value, num_bits):
+                return None
+        if padding:
+            self._append_payload(buf, padding)
+        return bytes(buf)
+
+    def build_with_noise(self, field_values, sport, noise_type, noise_level, add_noise):
+        """Build a packet applying random_padding noise the same way embed_with_noise does."""
+        padding = b''
+        if add_noise and noise_type == 'random_padding':
+            padding = ''.join(random.choices(['A', 'B', 'C', 'D'], k=random.randint(0, noise_level))).encode()
+        data = self.build(field_values, sport, padding)
+        if data is None:
+            # Fall back to scapy for chunks that change the packet layout
+            pkt = stego_utils.build_covert_packet(self.destination_ip, self.destination_port, sport)
+            pkt = stego_utils.embed_data_into_packet(pkt, field_values, self.header_bit_fields, False)
+            if padding:
+                pkt[stego_utils.Raw].load += padding
+            data = bytes(pkt)
+        return data
+
+_templates = {}
+
+def get_template(destination_ip, destination_port, header_bit_fields):
+    """Return the cached template for this destination and field configuration."""
+    key = (destination_ip, destination_port, tuple(header_bit_fields))
+    template = _templates.get(key)
+    if template is None:
+        template = PacketTemplate(destination_ip, destination_port, header_bit_fields)
+        _templates[key] = template
+    return template
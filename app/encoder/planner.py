@@ -0,0 +1,86 @@
+# Usable covert bits per field. tcp_reserved is 3 bits because scapy (and so the
+# decoder) only sees the 3 reserved bits below the NS flag; each option carries at
+# most 38 data bytes (40 bytes of option space minus kind and length); and above
+# 7 bits the User-Agent character stops being ASCII and changes the packet length.
+FIELD_CAPACITY = {
+    'ipid': 16,
+    'ttl': 8,
+    'window': 16,
+    'tcp_reserved': 3,
+    'tcp_options': 304,
+    'ip_options': 304,
+    'user_agent': 7,
+}
+
+# Option fields are sent in whole bytes, so any other width wastes the rest of the byte
+BYTE_FIELDS = {'tcp_options', 'ip_options'}
+
+# Stealth cost of a field as (cost of touching it at all, cost of each extra bit,
+# low-order bits first). Low IPID/window bits look like normal variation; high
+# TTL bits, reserved bits, control characters in the User-Agent and experimental
+# options are increasingly easy to spot.
+STEALTH_COST = {
+    'ipid': (0, [1] * 16),
+    'ttl': (2, [2] * 3 + [8] * 5),
+    'window': (1, [1] * 8 + [3] * 8),
+    'tcp_reserved': (20, [5] * 3),
+    'tcp_options': (30, [1] * 304),
+    'ip_options': (40, [1] * 304),
+    'user_agent': (1, [2] * 5 + [10] * 2),
+}
+
+def field_cost(header, bits):
+    """Stealth cost of carrying bits in header."""
+    if bits <= 0:
+        return 0
+    base, per_bit = STEALTH_COST[header]
+    return base + sum(per_bit[:bits])
+
+def allowed_widths(header, max_bits):
+    """Bit widths worth considering for a field: 0..max, whole bytes for option fields."""
+    max_bits = min(max_bits, FIELD_CAPACITY[header])
+    if header in BYTE_FIELDS:
+        return range(0, max_bits + 1, 8)
+    return range(0, max_bits + 1)
+
+def plan_allocation(fields=None, budget=None):
+    """Return the [(header, bits)] allocation with the most bits per packet within budget.
+
+    fields maps header name to the most bits the caller allows there
+    (default FIELD_CAPACITY). budget caps the summed field_cost; None means
+    unlimited. This is a multiple-choice knapsack solved exactly by dynamic
+    programming over the integer costs; ties go to the cheaper allocation.
+    """
+    if fields is None:
+        fields = FIELD_CAPACITY
+    fields = {header: max_bits for header, max_bits in fields.items() if header in FIELD_CAPACITY}
+    if budget is None:
+        budget = sum(field_cost(header, FIELD_CAPACITY[header]) for header in fields)
+
+    # best[cost] = (bits, allocation) for the cheapest way found to reach that many bits at that cost
+    best = {0: (0, ())}
+    for header, max_bits in fields.items():
+        options = [(bits, field_cost(header, bits)) for bits in allowed_widths(header, max_bits)]
+        next_best = {}
+        for cost, (total_bits, allocation) in best.items():
+            for bits, extra in options:
+                new_cost = cost + extra
+                if new_cost > budget:
+                    continue
+                candidate = (total_bits + bits, allocation + (((header, bits),) if bits else ()))
+                current = next_best.get(new_cost)
+                if current is None or candidate[0] > current[0]:
+                    next_best[new_cost] = candidate
+        best = next_best
+
+    total_bits, allocation = max(best.items(), key=lambda item: (item[1][0], -item[0]))[1]
+    # Keep the canonical header order so configs look the same however they were planned
+    order = list(FIELD_CAPACITY)
+    return sorted(allocation, key=lambda item: order.index(item[0]))
+
+def describe(allocation):
+    """One-line summary of an allocation's capacity and stealth cost."""
+    total_bits = sum(bits for header, bits in allocation)
+    cost = sum(field_cost(header, bits) for header, bits in allocation)
+    fields = ', '.join(f"{header}={bits}" for header, bits in allocation)
+    return f"{total_bits} bits/packet at stealth cost {cost}: {fields}"
@@ -0,0 +1,138 @@
+import atexit
+import socket
+import struct
+import threading
+import time
+from scapy.all import IP, conf
+import encoder.metrics as metrics
+
+class PacketSender:
+    """Long-lived sender for pre-built IPv4 packets.
+
+    Uses one IP_HDRINCL raw socket so every send is a single sendto() with no
+    per-packet socket setup or route lookup. Falls back to one scapy
+    conf.L3socket when raw sockets are unavailable.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.l3socket = None
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_HDRINCL, 1)
+        except (OSError, AttributeError):
+            self.sock = None
+            self.l3socket = conf.L3socket()
+
+    def send(self, data, destination_ip):
+        """Send the serialized IP packet data to destination_ip."""
+        if metrics.enabled:
+            start = time.perf_counter()
+            self._send(data, destination_ip)
+            metrics.SEND_SECONDS.observe(time.perf_counter() - start)
+            metrics.PACKETS_SENT.inc()
+        else:
+            self._send(data, destination_ip)
+
+    def _send(self, data, destination_ip):
+        if self.sock is not None:
+            self.sock.sendto(data, (destination_ip, 0))
+        else:
+            with self.lock:
+                self.l3socket.send(IP(data))
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.l3socket is not None:
+            self.l3socket.close()
+            self.l3socket = None
+
+LINKTYPE_RAW = 101  # Packets start at the IPv4 header
+
+class PcapSender:
+    """Drop-in replacement for PacketSender that writes packets to a capture file.
+
+    Files ending in .pcapng get pcapng blocks, anything else classic pcap,
+    both with LINKTYPE_RAW so the decoder reads them back without a link
+    header. Timestamps are the wall clock, or start + n * interval when
+    interval is given so the output is deterministic.
+    """
+
+    def __init__(self, path, interval=None, start=0.0):
+        self.lock = threading.Lock()
+        self.path = path
+        self.pcapng = path.endswith('.pcapng')
+        self.interval = interval
+        self.start = start
+        self.count = 0
+        self.file = open(path, 'wb')
+        if self.pcapng:
+            # Section header, then one interface description for LINKTYPE_RAW
+            self._write_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1))
+            self._write_block(0x00000001, struct.pack('<HHI', LINKTYPE_RAW, 0, 0xFFFF))
+        else:
+            self.file.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 0xFFFF, LINKTYPE_RAW))
+
+    def _write_block(self, block_type, body):
+        body += bytes(-len(body) % 4)
+        length = len(body) + 12
+        self.file.write(struct.pack('<II', block_type, length) + body + struct.pack('<I', length))
+
+    def send(self, data, destination_ip):
+        """Append the serialized IP packet data to the file (destination_ip is already in data)."""
+        with self.lock:
+            if self.interval is None:
+                timestamp = time.time()
+            else:
+                timestamp = self.start + self.count * self.interval
+            self.count += 1
+            usec = int(round(timestamp * 1e6))
+            if self.pcapng:
+                # Enhanced packet block, default microsecond resolution
+                self._write_block(0x00000006, struct.pack('<IIIII', 0, usec >> 32, usec & 0xFFFFFFFF, len(data), len(data)) + data)
+            else:
+                self.file.write(struct.pack('<IIII', usec // 1000000, usec % 1000000, len(data), len(data)) + data)
+        if metrics.enabled:
+            metrics.PACKETS_SENT.inc()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+_shared_sender = None
+_shared_refcount = 0
+_shared_lock = threading.Lock()
+
+def acquire_sender():
+    """Return the process-wide sender, opening it on first use."""
+    global _shared_sender, _shared_refcount
+    with _shared_lock:
+        if _shared_sender is None:
+            _shared_sender = PacketSender()
+        _shared_refcount += 1
+        return _shared_sender
+
+def release_sender():
+    """Drop one reference to the shared sender and close it when unused."""
+    global _shared_sender, _shared_refcount
+    with _shared_lock:
+        if _shared_refcount == 0:
+            return
+        _shared_refcount -= 1
+        if _shared_refcount == 0 and _shared_sender is not None:
+            _shared_sender.close()
+            _shared_sender = None
+
+def close_sender():
+    """Close the shared sender regardless of outstanding references."""
+    global _shared_sender, _shared_refcount
+    with _shared_lock:
+        if _shared_sender is not None:
+            _shared_sender.close()
+            _shared_sender = None
+        _shared_refcount = 0
+
+atexit.register(close_sender)
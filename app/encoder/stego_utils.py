@@ -1,47 +1,60 @@
 from scapy.all import IP, TCP, IPOption, Raw
+import encoder.config as stego_config
 import random
 import time
 
+COVERT_MARKER = "AN21NY"
+
+def build_http_payload(destination_ip):
+    """Return the HTTP request carried by every covert packet."""
+    return f"GET / HTTP/1.1\r\nHost: {destination_ip}\r\nUser-Agent: Mozilla/5.0 {COVERT_MARKER} \r\n\r\n"
+
+def build_covert_packet(destination_ip, destination_port, sport):
+    """Build the base SYN+HTTP packet that fields are embedded into."""
+    ip = IP(dst=destination_ip)
+    tcp = TCP(sport=sport, dport=destination_port, flags='S', window=1024)
+    return ip / tcp / Raw(load=build_http_payload(destination_ip))
+
 def encode_message(message):
     """Convert message to a binary string."""
     return format(message, '08b') 
 
-def embed_in_ipid(packet, bits, num_bits):
-    """Embed num_bits into the IPID field."""
+def embed_in_ipid(packet, value, num_bits):
+    """Embed the num_bits-wide integer value into the IPID field."""
     original_ipid = packet[IP].id
     mask = (1 << (16 - num_bits)) - 1  # Mask to keep upper bits
-    new_ipid = (original_ipid & (mask << num_bits)) | int(bits, 2)
+    new_ipid = (original_ipid & (mask << num_bits)) | value
     packet[IP].id = new_ipid
     return packet
 
-def embed_in_ttl(packet, bits, num_bits):
-    """Embed num_bits into the TTL field."""
+def embed_in_ttl(packet, value, num_bits):
+    """Embed the num_bits-wide integer value into the TTL field."""
     original_ttl = packet[IP].ttl
     mask = (1 << (8 - num_bits)) - 1  # Mask to keep upper bits
-    new_ttl = (original_ttl & (mask << num_bits)) | int(bits, 2)
+    new_ttl = (original_ttl & (mask << num_bits)) | value
     packet[IP].ttl = new_ttl
     return packet
 
-def embed_in_window(packet, bits, num_bits):
-    """Embed num_bits into the TCP Window Size."""
+def embed_in_window(packet, value, num_bits):
+    """Embed the num_bits-wide integer value into the TCP Window Size."""
     original_window = packet[TCP].window
     mask = (1 << (16 - num_bits)) - 1  # Mask to keep upper bits
-    new_window = (original_window & (mask << num_bits)) | int(bits, 2)
+    new_window = (original_window & (mask << num_bits)) | value
     packet[TCP].window = new_window
     return packet
 
-def embed_in_tcp_reserved(packet, bits, num_bits):
-    """Embed num_bits into the TCP Reserved field."""
+def embed_in_tcp_reserved(packet, value, num_bits):
+    """Embed the num_bits-wide integer value into the TCP Reserved field."""
     original_reserved = packet[TCP].reserved
     mask = (1 << (4 - num_bits)) - 1  # Mask to keep upper bits
-    new_reserved = (original_reserved & (mask << num_bits)) | int(bits, 2)
+    new_reserved = (original_reserved & (mask << num_bits)) | value
     packet[TCP].reserved = new_reserved
     return packet
 
-def embed_in_tcp_options(packet, bits, num_bits):
-    """Embed num_bits into TCP Options field."""
+def embed_in_tcp_options(packet, value, num_bits):
+    """Embed the num_bits-wide integer value into TCP Options field."""
     num_bytes = (num_bits + 7) // 8  # Convert bits to bytes
-    data_bytes = int(bits, 2).to_bytes(num_bytes, byteorder='big')
+    data_bytes = value.to_bytes(num_bytes, byteorder='big')
     option_kind = 254  # Experimental option kind
     option_data = data_bytes
     option = (option_kind, option_data)
@@ -51,10 +64,10 @@ def embed_in_tcp_options(packet, bits, num_bits):
         packet[TCP].options = [option]
     return packet
 
-def embed_in_ip_options(packet, bits, num_bits):
-    """Embed num_bits into IP Options field."""
+def embed_in_ip_options(packet, value, num_bits):
+    """Embed the num_bits-wide integer value into IP Options field."""
     num_bytes = (num_bits + 7) // 8  # Convert bits to bytes
-    data_bytes = int(bits, 2).to_bytes(num_bytes, byteorder='big')
+    data_bytes = value.to_bytes(num_bytes, byteorder='big')
     option_number = 30  # Experimental option number
     
     # Define length: 2 bytes for type + length fields, plus the length of data_bytes
@@ -71,29 +84,27 @@ def embed_in_ip_options(packet, bits, num_bits):
         
     return packet
 
-def embed_in_user_agent(packet, bits, num_bits):
-    """Embed num_bits into the HTTP User-Agent Header."""
+def embed_in_user_agent(packet, value, num_bits):
+    """Embed the num_bits-wide integer value into the HTTP User-Agent Header."""
     if Raw in packet:
         try:
             payload = packet[Raw].load.decode()
             if "User-Agent: " in payload:
                 parts = payload.split("User-Agent: ")
                 user_agent = parts[1].split("\r\n")[0]
-                # Modify the last character or extend the User-Agent string
-                user_agent_binary = ''.join(format(ord(c), '08b') for c in user_agent)
-                # Replace the last num_bits
-                user_agent_binary = user_agent_binary[:-num_bits] + bits
-                # Convert back to string
-                new_user_agent = ''.join(chr(int(user_agent_binary[i:i+8], 2)) for i in range(0, len(user_agent_binary), 8))
+                # Replace the last num_bits of the final User-Agent character
+                mask = (1 << num_bits) - 1
+                new_last_char = chr((ord(user_agent[-1]) & ~mask) | value)
+                new_user_agent = user_agent[:-1] + new_last_char
                 new_payload = parts[0] + "User-Agent: " + new_user_agent + "\r\n" + "\r\n".join(parts[1].split("\r\n")[1:])
                 packet[Raw].load = new_payload.encode()
         except Exception as e:
             print(f"Error embedding in User-Agent: {e}")
     return packet
 
-def embed_with_noise(packet, data_bits, header_bit_fields, noise_type, noise_level, add_noise, verbose):
+def embed_with_noise(packet, field_values, header_bit_fields, noise_type, noise_level, add_noise, verbose):
     """Embed data with customizable noise for better stealth."""
-    packet = embed_data_into_packet(packet, data_bits, header_bit_fields, verbose)
+    packet = embed_data_into_packet(packet, field_values, header_bit_fields, verbose)
     
     if add_noise:
         if noise_type == 'random_padding':
@@ -106,15 +117,11 @@ def embed_with_noise(packet, data_bits, header_bit_fields, noise_type, noise_lev
     
     return packet
 
-def embed_data_into_packet(packet, data_bits, header_bit_fields, verbose):
-    """Embed data bits into specified packet fields."""
-    bit_index = 0
-    for header, num_bits in header_bit_fields:
-        bits_to_embed = data_bits[bit_index:bit_index+num_bits]
+def embed_data_into_packet(packet, field_values, header_bit_fields, verbose):
+    """Embed pre-sliced integer field values into specified packet fields."""
+    for bits_to_embed, (header, num_bits) in zip(field_values, header_bit_fields):
         if verbose:
-            print(f"embedding >{bits_to_embed}< in {header}")
-        if len(bits_to_embed) < num_bits:
-            bits_to_embed = bits_to_embed.ljust(num_bits, '0')
+            print(f"embedding >{bits_to_embed:0{num_bits}b}< in {header}")
         if header == 'ipid':
             packet = embed_in_ipid(packet, bits_to_embed, num_bits)
         elif header == 'ttl':
@@ -131,39 +138,28 @@ def embed_data_into_packet(packet, data_bits, header_bit_fields, verbose):
             packet = embed_in_user_agent(packet, bits_to_embed, num_bits)
         else:
             print(f"Unknown header: {header}")
-        bit_index += num_bits
     return packet
 
 def read_config():
-    """Read the config.txt file and return header configurations and port."""
-    config = {}
-    port = None
-    with open('../config.txt', 'r') as f:
-        lines = f.readlines()
-        for line in lines:
-            if line.startswith('Header:'):
-                parts = line.strip().split(',')
-                header = parts[0].split(':')[1].strip()
-                bits = int(parts[1].split(':')[1].strip())
-                config[header] = bits
-            elif line.startswith('Port:'):
-                port = int(line.strip().split(':')[1].strip())
-            elif line.startswith('Destination IP:'):
-                destination_ip = line.strip().split(':')[1].strip()
-    return config, port, destination_ip
-
-def save_to_config(destination_ip, destination_port, header_bit_fields):
+    """Return the saved header configuration as ({header: bits}, port, destination IP)."""
+    config = stego_config.load_config()
+    return dict(config.header_bit_fields), config.destination_port, config.destination_ip
+
+def save_to_config(destination_ip, destination_port, header_bit_fields, seq_bits=0, fec_redundancy=0.0, fec_block=32, compression=None, session_bits=0, session_id=0, version_bits=None):
+    """Validate and save a new configuration version and return it.
+
+    version_bits defaults to 2 when that still leaves a byte of data per
+    packet, so running decoders can tell the old and new layouts apart.
+    """
     total_bits_per_packet = sum(bits for header, bits in header_bit_fields)
+    if version_bits is None:
+        version_bits = 2 if total_bits_per_packet - session_bits - seq_bits - 2 >= 8 else 0
+    config = stego_config.StegoConfig(destination_ip, destination_port, header_bit_fields, seq_bits, fec_block, fec_redundancy,
+                                      compression, session_bits, session_id, stego_config.next_version(), version_bits)
+    config.validate()
     # Output configuration
     print("\nConfiguration saved:")
-    for header, bits in header_bit_fields:
-        print(f"Header: {header}, Bits: {bits}")
-    print(f"Total bits per packet: {total_bits_per_packet}\n")
-    # Save configuration to a file
-    with open('../config.txt', 'w') as f:
-        f.write("Configuration:\n")
-        for header, bits in header_bit_fields:
-            f.write(f"Header: {header}, Bits: {bits}\n")
-        f.write(f"Total bits per packet: {total_bits_per_packet}\n")
-        f.write(f"Port: {destination_port}\n")
-        f.write(f"Destination IP: {destination_ip}\n")
\ No newline at end of file
+    print(config.describe())
+    print()
+    config.save()
+    return config
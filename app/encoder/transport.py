@@ -0,0 +1,155 @@
+import queue
+import select
+import time
+from scapy.all import RawPcapReader, conf
+import encoder.metrics as metrics
+import encoder.sender as packet_sender
+from encoder.sender import PcapSender
+from decoder.fast_parser import linktype_for_layer, LINKTYPE_RAW
+
+# A transport moves serialized IPv4 packets from the encoder to the decoder.
+# Every transport has the sender interface used by the encoder and noise
+# generator, send(data, destination_ip), plus
+# receive(handler, timeout, on_idle, ...) which feeds handler(frame, linktype)
+# until the timeout passes or the transport is closed, and close().
+
+def capture_raw(sniff_filter, handler, timeout=None, iface=None, on_idle=None, idle_interval=1.0):
+    """Feed raw frames from one listening socket to handler(data, linktype) without dissecting them.
+
+    on_idle, if given, is called whenever no packet arrives for idle_interval seconds.
+    """
+    sock = conf.L2listen(iface=iface, filter=sniff_filter)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    try:
+        while True:
+            wait = idle_interval if on_idle is not None else None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait = remaining if wait is None else min(wait, remaining)
+            ready, _, _ = select.select([sock], [], [], wait)
+            if not ready:
+                if on_idle is not None:
+                    on_idle()
+                continue
+            cls, data, _ = sock.recv_raw()
+            if data:
+                handler(data, linktype_for_layer(cls))
+    finally:
+        sock.close()
+
+def iter_pcap_records(path):
+    """Yield (frame, linktype, timestamp in seconds) from a pcap or pcapng file one record at a time."""
+    reader = RawPcapReader(path)
+    try:
+        default_linktype = getattr(reader, 'linktype', LINKTYPE_RAW)
+        ticks = 1e9 if getattr(reader, 'nano', False) else 1e6
+        for data, meta in reader:
+            if hasattr(meta, 'tsresol'):
+                # pcapng records carry their interface's link type and resolution
+                yield data, meta.linktype, ((meta.tshigh << 32) | meta.tslow) / meta.tsresol
+            else:
+                yield data, default_linktype, meta.sec + meta.usec / ticks
+    finally:
+        reader.close()
+
+def iter_pcap_frames(path):
+    """Yield (frame, linktype) from a pcap or pcapng file one record at a time."""
+    for data, linktype, _ in iter_pcap_records(path):
+        yield data, linktype
+
+class LiveTransport:
+    """Send on the real network through the process-wide PacketSender and capture with a scapy L2listen socket (needs root).
+
+    The sender (one raw socket, or a scapy L3 socket where raw sockets are
+    unavailable) is shared with the encoder and released on close().
+    """
+
+    def __init__(self):
+        self.sender = packet_sender.acquire_sender()
+
+    def send(self, data, destination_ip):
+        self.sender.send(data, destination_ip)
+
+    def receive(self, handler, timeout=None, on_idle=None, idle_interval=1.0, sniff_filter=None, iface=None):
+        capture_raw(sniff_filter, handler, timeout, iface, on_idle, idle_interval)
+
+    def close(self):
+        if self.sender is not None:
+            packet_sender.release_sender()
+            self.sender = None
+
+class PcapTransport:
+    """Write packets to a pcap/pcapng file, or read one back as the receive side.
+
+    Opened with mode 'w' it sends through a PcapSender (timestamps interval
+    seconds apart, or the wall clock); with mode 'r' receive() streams the
+    file and returns at its end.
+    """
+
+    def __init__(self, path, mode='w', interval=None):
+        self.path = path
+        self.writer = PcapSender(path, interval) if mode == 'w' else None
+
+    def send(self, data, destination_ip):
+        self.writer.send(data, destination_ip)
+
+    def receive(self, handler, timeout=None, on_idle=None, idle_interval=1.0, sniff_filter=None, iface=None):
+        for data, linktype in iter_pcap_frames(self.path):
+            handler(data, linktype)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+class QueueTransport:
+    """In-process loopback: send() hands packet bytes straight to receive(), no sockets or privileges.
+
+    close() ends receive() once the packets already queued are handled.
+    maxsize bounds the queue so a fast sender blocks instead of buffering
+    without limit.
+    """
+
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize)
+
+    def send(self, data, destination_ip):
+        self.queue.put(data)
+        if metrics.enabled:
+            metrics.PACKETS_SENT.inc()
+
+    def receive(self, handler, timeout=None, on_idle=None, idle_interval=1.0, sniff_filter=None, iface=None):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            wait = idle_interval if on_idle is not None else None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait = remaining if wait is None else min(wait, remaining)
+            try:
+                data = self.queue.get(timeout=wait)
+            except queue.Empty:
+                if on_idle is not None:
+                    on_idle()
+                continue
+            if data is None:
+                break
+            handler(data, LINKTYPE_RAW)
+
+    def close(self):
+        self.queue.put(None)
+
+TRANSPORTS = {
+    'live': LiveTransport,
+    'pcap': PcapTransport,
+    'queue': QueueTransport,
+}
+
+def open_transport(name, *args, **kwargs):
+    """Create a transport by name: 'live', 'pcap' (path, mode) or 'queue'."""
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown transport: {name}")
+    return TRANSPORTS[name](*args, **kwargs)
@@ -0,0 +1,92 @@
+# bench_bpf_filter.py
+# Drop ratio and decoder CPU under noise-heavy load: legacy "tcp port" filter
+# vs. the config-derived BPF filter. Requires root and libpcap; uses loopback,
+# where every packet is captured twice (egress and ingress).
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from scapy.all import IP, TCP, Raw, sniff
+import decoder.decoder as decoder
+import encoder.sender as packet_sender
+from encoder.packet_template import PacketTemplate
+from encoder.pacing import TokenBucket
+
+header_bit_fields = [('ipid', 8), ('ttl', 4), ('window', 8), ('tcp_options', 8)]
+
+def build_traffic(destination_ip, destination_port, noise_count, covert_count):
+    """Noise packets shaped like network_noise_generator's, mixed with covert packets."""
+    user_agents = ['Mozilla/5.0 (Windows NT 10.0; Win64; x64)', 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:92.0)']
+    packets = []
+    for _ in range(noise_count):
+        payload = f"{random.choice(['GET', 'POST', 'HEAD'])} / HTTP/1.1\r\nHost: {destination_ip}\r\nUser-Agent: {random.choice(user_agents)}\r\n\r\n"
+        pkt = IP(dst=destination_ip) / TCP(sport=random.randint(1024, 65535), dport=destination_port, flags='PA') / Raw(load=payload)
+        packets.append(bytes(pkt))
+    template = PacketTemplate(destination_ip, destination_port, header_bit_fields)
+    for _ in range(covert_count):
+        field_values = [random.getrandbits(bits) for _, bits in header_bit_fields]
+        packets.append(template.build(field_values, random.randint(1024, 65535)))
+    random.shuffle(packets)
+    return packets
+
+def send_traffic(packets, destination_ip, rate):
+    time.sleep(0.5)  # Let the sniffer attach its filter
+    pacer = TokenBucket(rate, burst=10)
+    sender = packet_sender.acquire_sender()
+    for data in packets:
+        pacer.wait()
+        sender.send(data, destination_ip)
+    packet_sender.release_sender()
+
+def run(packets, destination_ip, sniff_filter, timeout, rate):
+    handled = 0
+    covert_decoder = decoder.Decoder(decoder.DecoderConfig(header_bit_fields))
+    devnull = io.StringIO()
+
+    def handler(pkt):
+        nonlocal handled
+        handled += 1
+        with contextlib.redirect_stdout(devnull):
+            covert_decoder.handle_packet(pkt)
+        devnull.seek(0)
+        devnull.truncate()
+
+    proc = multiprocessing.Process(target=send_traffic, args=(packets, destination_ip, rate))
+    cpu_start = time.process_time()
+    sniff(iface='lo', filter=sniff_filter, prn=handler, store=0, timeout=timeout, started_callback=proc.start)
+    cpu = time.process_time() - cpu_start
+    proc.join()
+    return handled, cpu
+
+def main(noise_count=20000, covert_count=500, destination_ip='127.0.0.1', destination_port=8080, timeout=10, rate=5000):
+    packets = build_traffic(destination_ip, destination_port, noise_count, covert_count)
+    total = len(packets)
+    legacy_filter = f"tcp port {destination_port}"
+    covert_filter = decoder.build_sniff_filter(header_bit_fields, destination_port, destination_ip)
+
+    legacy_handled, legacy_cpu = run(packets, destination_ip, legacy_filter, timeout, rate)
+    covert_handled, covert_cpu = run(packets, destination_ip, covert_filter, timeout, rate)
+
+    print(f"packets sent:          {total} ({noise_count} noise, {covert_count} covert)")
+    print(f"filter:                {covert_filter}")
+    print(f"legacy filter:         {legacy_handled:8d} delivered to Python, {legacy_cpu:6.2f} s CPU")
+    print(f"covert filter:         {covert_handled:8d} delivered to Python, {covert_cpu:6.2f} s CPU")
+    print(f"dropped in kernel:     {1 - covert_handled / total:8.1%}")
+    if legacy_cpu > 0:
+        print(f"CPU saved:             {1 - covert_cpu / legacy_cpu:8.1%}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="BPF covert filter benchmark")
+    parser.add_argument("--noise", type=int, default=20000, help="Number of cover traffic packets")
+    parser.add_argument("--covert", type=int, default=500, help="Number of covert packets")
+    parser.add_argument("--timeout", type=int, default=10, help="Capture duration per run in seconds")
+    parser.add_argument("--rate", type=float, default=5000, help="Send rate in packets/s")
+    args = parser.parse_args()
+    main(noise_count=args.noise, covert_count=args.covert, timeout=args.timeout, rate=args.rate)
@@ -0,0 +1,67 @@
+# bench_compression.py
+# Packets needed per message size with and without the compression stage.
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+import encoder.compression as compression
+
+# Held-out sentences, not part of the preset dictionary's training samples
+SENTENCES = [
+    "Please meet me near the station at half past eight.",
+    "The shipment will arrive on Thursday, keep the door open.",
+    "I have not heard back from them yet, will try again tomorrow.",
+    "Do you still have the key to the back office?",
+    "Everything is ready on our side, waiting for your signal.",
+    "Change of plans: the call is now at noon instead of nine.",
+    "Remember to delete the old messages from the server.",
+    "They asked for the latest numbers, can you send them over?",
+    "The weather is bad here, the trip might be delayed by a day.",
+    "Let me know when you are back in the city.",
+    "Confirmed. See you at the usual place.",
+    "The new password is written on the card in the envelope.",
+]
+
+def make_message(size, rng):
+    text = ''
+    while len(text.encode()) < size:
+        text += rng.choice(SENTENCES) + ' '
+    return text.encode()[:size]
+
+def packets_for(num_bytes, data_bits):
+    return math.ceil(num_bytes * 8 / data_bits)
+
+def main(data_bits=40, sizes=(16, 32, 64, 128, 256, 512, 1024, 4096, 16384), trials=20):
+    rng = random.Random(1)
+    codecs = list(compression.CODECS)
+    print(f"{data_bits} data bits per packet; packets per message, mean of {trials} messages")
+    print(f"{'bytes':>6} {'plain':>7} " + ' '.join(f"{name:>9}" for name in codecs) + f" {'auto':>7} {'saved':>7} {'auto ms':>8}")
+    for size in sizes:
+        plain = 0
+        per_codec = dict.fromkeys(codecs, 0)
+        auto = 0
+        elapsed = 0.0
+        for _ in range(trials):
+            data = make_message(size, rng)
+            plain += packets_for(len(data), data_bits)
+            for name in codecs:
+                per_codec[name] += packets_for(len(compression.compress_message(data, name)), data_bits)
+            start = time.perf_counter()
+            framed = compression.compress_message(data, 'auto')
+            elapsed += time.perf_counter() - start
+            auto += packets_for(len(framed), data_bits)
+        row = ' '.join(f"{per_codec[name] / trials:9.1f}" for name in codecs)
+        saved = 1 - auto / plain
+        print(f"{size:6d} {plain / trials:7.1f} {row} {auto / trials:7.1f} {saved:7.1%} {elapsed / trials * 1000:8.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compression stage packet savings")
+    parser.add_argument("--data_bits", type=int, default=40, help="Covert data bits per packet")
+    parser.add_argument("--trials", type=int, default=20, help="Random messages per size")
+    args = parser.parse_args()
+    main(data_bits=args.data_bits, trials=args.trials)
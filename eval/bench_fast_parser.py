@@ -0,0 +1,63 @@
+# bench_fast_parser.py
+# Decode throughput from a pcap: raw-bytes fast path vs. scapy dissection.
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from scapy.all import Ether, RawPcapReader, RawPcapWriter
+import decoder.decoder as decoder
+from decoder.fast_parser import LINKTYPE_ETHERNET
+from encoder.packet_template import PacketTemplate
+
+header_bit_fields = [('ipid', 16), ('ttl', 4), ('window', 16)]
+all_header_bit_fields = [('ipid', 8), ('ttl', 4), ('window', 8), ('tcp_reserved', 3), ('tcp_options', 16), ('ip_options', 16), ('user_agent', 5)]
+
+def write_pcap(path, count, destination_ip='192.168.1.100', destination_port=80):
+    template = PacketTemplate(destination_ip, destination_port, header_bit_fields)
+    ether = bytes(Ether(src='02:00:00:00:00:01', dst='02:00:00:00:00:02', type=0x0800))
+    writer = RawPcapWriter(path, linktype=LINKTYPE_ETHERNET)
+    for _ in range(count):
+        field_values = [random.getrandbits(bits) for _, bits in header_bit_fields]
+        writer.write(ether + template.build(field_values, random.randint(1024, 65535)))
+    writer.close()
+
+def main(count=100000, scapy_count=5000):
+    covert_decoder = decoder.Decoder(decoder.DecoderConfig(header_bit_fields))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'covert.pcap')
+        write_pcap(path, count)
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for data, _ in RawPcapReader(path):
+                covert_decoder.handle_raw(data, LINKTYPE_ETHERNET)
+            fast_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for i, (data, _) in enumerate(RawPcapReader(path)):
+                if i == scapy_count:
+                    break
+                covert_decoder.handle_packet(Ether(data))
+            scapy_time = time.perf_counter() - start
+
+    fast_rate = count / fast_time
+    scapy_rate = min(count, scapy_count) / scapy_time
+    print(f"packets:          {count}")
+    print(f"fast path:        {fast_rate:10.0f} packets/s (pcap read included)")
+    print(f"scapy dissection: {scapy_rate:10.0f} packets/s")
+    print(f"speedup:          {fast_rate / scapy_rate:10.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Decoder fast path benchmark")
+    parser.add_argument("--count", type=int, default=100000, help="Number of packets in the generated pcap")
+    parser.add_argument("--all_fields", action="store_true", help="Embed in every header field, including options and User-Agent")
+    args = parser.parse_args()
+    if args.all_fields:
+        header_bit_fields = all_header_bit_fields
+    main(count=args.count)
@@ -0,0 +1,114 @@
+# bench_fec.py
+# Goodput under simulated packet loss: Reed-Solomon FEC vs. resending the whole
+# message until one copy arrives intact, plus FEC encode/decode cost per KB.
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+import encoder.fec as fec
+from encoder.bitpack import iter_sequenced_values
+from decoder.reassembly import FecReassembler
+from decoder.stream import MessageStream
+
+header_bit_fields = [('ipid', 16), ('ttl', 8), ('window', 16)]
+seq_bits = 10
+
+def pack(values):
+    packed = 0
+    for value, (_, bits) in zip(values, header_bit_fields):
+        packed = (packed << bits) | value
+    return packed
+
+def fec_packets(data, data_shards, parity_shards):
+    values = fec.iter_fec_values([data], header_bit_fields, seq_bits, itertools.count(), data_shards, parity_shards)
+    return [pack(v) for v in values]
+
+def plain_packets(data):
+    return [pack(v) for v in iter_sequenced_values([data], header_bit_fields, seq_bits, itertools.count())]
+
+def deliver(packets, reassembler, loss):
+    """Push the packets that survive random loss and return the decoded bytes."""
+    total_bits = sum(bits for _, bits in header_bit_fields)
+    data_bits = total_bits - seq_bits
+    mask = (1 << data_bits) - 1
+    stream = MessageStream()
+    out = bytearray()
+    released = []
+    for packed in packets:
+        if random.random() >= loss:
+            released += reassembler.push(packed >> data_bits, packed & mask)
+    released += reassembler.flush()
+    for data in released:
+        if isinstance(data, bytes):
+            out += data
+        else:
+            stream.bits.write(data, data_bits)
+            out += stream.bits.take_bytes()
+    return bytes(out)
+
+def success_rate(make_reassembler, packets, data, loss, trials):
+    ok = 0
+    for _ in range(trials):
+        decoded = deliver(packets, make_reassembler(), loss)
+        ok += decoded.rstrip(b'\x00') == data
+    return ok / trials
+
+def main(size=1024, losses=(0.01, 0.02, 0.05, 0.1), ratios=(0.125, 0.25, 0.5), data_shards=16, trials=200):
+    random.seed(1)
+    data = bytes(random.getrandbits(8) for _ in range(size)).replace(b'\x00', b'\x01')
+    total_bits = sum(bits for _, bits in header_bit_fields)
+    data_bits = total_bits - seq_bits
+    message_bits = size * 8
+
+    plain = plain_packets(data)
+    print(f"message: {size} bytes, {total_bits} covert bits/packet ({seq_bits} sequence bits), FEC blocks of {data_shards} data packets")
+    print(f"{'loss':>6} {'scheme':>22} {'packets/try':>12} {'P(success)':>11} {'expected pkts':>14} {'goodput b/pkt':>14}")
+    for loss in losses:
+        # Resend-on-failure: every copy must arrive complete, so P = (1 - loss)^N
+        p_plain = (1 - loss) ** len(plain)
+        expected = len(plain) / p_plain
+        print(f"{loss:6.0%} {'resend on failure':>22} {len(plain):12d} {p_plain:11.4f} {expected:14.0f} {message_bits / expected:14.2f}")
+        for ratio in ratios:
+            parity_shards = fec.parity_for(data_shards, ratio)
+            packets = fec_packets(data, data_shards, parity_shards)
+            p_fec = success_rate(lambda: FecReassembler(seq_bits, data_bits, data_shards, parity_shards), packets, data, loss, trials)
+            # A failed FEC transfer is also resent whole
+            expected = len(packets) / p_fec if p_fec else float('inf')
+            label = f"FEC {data_shards}+{parity_shards} ({ratio:g})"
+            print(f"{loss:6.0%} {label:>22} {len(packets):12d} {p_fec:11.4f} {expected:14.0f} {message_bits / expected:14.2f}")
+
+    # Encode/decode cost
+    parity_shards = fec.parity_for(data_shards, 0.25)
+    kb = size / 1024
+    start = time.perf_counter()
+    for _ in range(20):
+        packets = fec_packets(data, data_shards, parity_shards)
+    encode_time = (time.perf_counter() - start) / 20
+    start = time.perf_counter()
+    for _ in range(20):
+        deliver(packets, FecReassembler(seq_bits, data_bits, data_shards, parity_shards), 0.0)
+    clean_time = (time.perf_counter() - start) / 20
+    # Drop exactly parity_shards data packets per block so every block needs a rebuild
+    block_packets = data_shards + parity_shards
+    lossy = [p for i, p in enumerate(packets) if i % block_packets >= parity_shards]
+    start = time.perf_counter()
+    for _ in range(20):
+        deliver(lossy, FecReassembler(seq_bits, data_bits, data_shards, parity_shards), 0.0)
+    rebuild_time = (time.perf_counter() - start) / 20
+    print()
+    print(f"FEC {data_shards}+{parity_shards} encode:              {encode_time / kb * 1000:8.2f} ms/KB")
+    print(f"FEC decode, no loss:            {clean_time / kb * 1000:8.2f} ms/KB")
+    print(f"FEC decode, every block rebuilt: {rebuild_time / kb * 1000:7.2f} ms/KB")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="FEC goodput and cost benchmark")
+    parser.add_argument("--size", type=int, default=1024, help="Message size in bytes")
+    parser.add_argument("--block", type=int, default=16, help="Data packets per FEC block")
+    parser.add_argument("--trials", type=int, default=200, help="Simulated transfers per loss rate and ratio")
+    args = parser.parse_args()
+    main(size=args.size, data_shards=args.block, trials=args.trials)
@@ -0,0 +1,55 @@
+# bench_http_sink.py
+# Request throughput of the HTTP sink on localhost: many keep-alive client
+# connections, each with a configurable number of pipelined requests in flight.
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from encoder.http_sink import HttpSink
+
+REQUEST = b"GET /index.html HTTP/1.1\r\nHost: 127.0.0.1\r\nUser-Agent: Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:92.0)\r\n\r\n"
+
+async def client(port, requests, depth, response_size):
+    """Send requests over one connection, keeping depth of them pipelined; return the count answered."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    answered = 0
+    sent = 0
+    while answered < requests:
+        batch = min(depth, requests - sent)
+        writer.write(REQUEST * batch)
+        sent += batch
+        for _ in range(batch):
+            await reader.readuntil(b'\r\n\r\n')
+            await reader.readexactly(response_size)
+            answered += 1
+    writer.close()
+    await writer.wait_closed()
+    return answered
+
+async def load(port, connections, requests, depth, response_size):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(port, requests, depth, response_size) for _ in range(connections)))
+    return sum(results), time.perf_counter() - start
+
+def main(connections=(1, 16, 64), depths=(1, 16), requests=2000, response_size=64):
+    sink = HttpSink('127.0.0.1', 0, response_size).start()
+    print(f"{'connections':>11} {'pipelined':>9} {'requests':>9} {'requests/s':>11}")
+    for count in connections:
+        for depth in depths:
+            answered, elapsed = asyncio.run(load(sink.port, count, max(1, requests // count), depth, response_size))
+            print(f"{count:11d} {depth:9d} {answered:9d} {answered / elapsed:11.0f}")
+    stats = sink.stats.snapshot()
+    sink.stop()
+    print(f"\nsink counted {stats['requests']} requests on {stats['connections']} connections, "
+          f"{stats['bytes_received']} bytes in, {stats['bytes_sent']} bytes out")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="HTTP sink throughput benchmark")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per run, split over the connections")
+    parser.add_argument("--response_size", type=int, default=64, help="Body bytes per response")
+    args = parser.parse_args()
+    main(requests=args.requests, response_size=args.response_size)
@@ -0,0 +1,55 @@
+# bench_loopback.py
+# Full-speed end-to-end throughput through the in-process queue transport:
+# encoder -> QueueTransport -> decoder on another thread, no sockets or root.
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+import encoder.encoder as encoder
+import decoder.decoder as decoder
+from encoder.pacing import TokenBucket
+from encoder.transport import QueueTransport
+
+CONFIGURATIONS = {
+    'ipid_ttl': [('ipid', 16), ('ttl', 4)],
+    'ipid_ttl_window': [('ipid', 16), ('ttl', 4), ('window', 16)],
+    'all_fields': [('ipid', 8), ('ttl', 4), ('window', 8), ('tcp_reserved', 3), ('tcp_options', 16), ('ip_options', 16), ('user_agent', 5)],
+}
+WORDS = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel']
+
+def run(message, header_bit_fields, destination_ip='192.168.1.100', destination_port=80, queue_size=1024):
+    transport = QueueTransport(queue_size)
+    covert_decoder = decoder.Decoder(decoder.DecoderConfig(header_bit_fields), echo=False)
+    receiver = threading.Thread(target=transport.receive, args=(covert_decoder.handle_raw,))
+    receiver.start()
+    start = time.perf_counter()
+    encoder.send_covert_message(destination_ip, destination_port, message, header_bit_fields, 'none', 0, False, False, sender=transport, pacer=TokenBucket())
+    transport.close()
+    receiver.join()
+    covert_decoder.flush()
+    elapsed = time.perf_counter() - start
+    packets = sum(session.packets for session in covert_decoder.sessions.values())
+    return elapsed, packets, covert_decoder.text()
+
+def main(size=65536):
+    random.seed(1)
+    message = ''
+    while len(message) < size:
+        message += random.choice(WORDS) + ' '
+    message = message[:size]
+    print(f"message: {size} bytes")
+    print(f"{'fields':>16} {'packets':>8} {'packets/s':>10} {'goodput kbit/s':>15} {'intact':>7}")
+    for name, header_bit_fields in CONFIGURATIONS.items():
+        elapsed, packets, text = run(message, header_bit_fields)
+        print(f"{name:>16} {packets:8d} {packets / elapsed:10.0f} {size * 8 / elapsed / 1000:15.1f} {str(text == message):>7}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="In-process loopback throughput benchmark")
+    parser.add_argument("--size", type=int, default=65536, help="Message size in bytes")
+    args = parser.parse_args()
+    main(size=args.size)
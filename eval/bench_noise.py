@@ -0,0 +1,68 @@
+# bench_noise.py
+# Cover traffic engine: achieved rate, burstiness and CPU cost per packet for
+# each inter-arrival distribution, sending into an in-memory sink. With
+# --replay, also how closely a trace replay keeps the recorded timing.
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from encoder.network_noise_generator import NoiseEngine, NoisePool, TraceReplayEngine
+from encoder.pacing import ARRIVALS
+from encoder.transport import iter_pcap_records
+from decoder.fast_parser import ip_offset
+
+class RecordingSender:
+    """Sender that only records when each packet was handed over."""
+
+    def __init__(self):
+        self.times = []
+
+    def send(self, data, destination_ip):
+        self.times.append(time.monotonic())
+
+def run(distribution, rate, duration, pool):
+    sender = RecordingSender()
+    engine = NoiseEngine('192.168.1.100', sender, pool, rate, distribution)
+    cpu_start = time.process_time()
+    engine.start()
+    time.sleep(duration)
+    engine.stop()
+    cpu = time.process_time() - cpu_start
+    gaps = [b - a for a, b in zip(sender.times, sender.times[1:])]
+    # Coefficient of variation of the gaps: 0 for constant, 1 for Poisson, larger for bursty traffic
+    cv = statistics.pstdev(gaps) / statistics.mean(gaps) if len(gaps) > 1 else 0.0
+    return engine.achieved_rate(), cv, cpu / max(1, engine.sent)
+
+def replay_accuracy(path, speed):
+    """Replay a trace once and return (packets, mean and worst send time error in seconds)."""
+    sender = RecordingSender()
+    engine = TraceReplayEngine(path, '192.168.1.100', 80, sender, speed, loop=False).start()
+    engine.thread.join()
+    # The schedule the engine should have kept, relative to the first packet
+    stamps = [timestamp for data, linktype, timestamp in iter_pcap_records(path) if ip_offset(data, linktype) is not None]
+    errors = [abs((sent - sender.times[0]) - (stamp - stamps[0]) / speed) for sent, stamp in zip(sender.times, stamps)]
+    return len(errors), statistics.mean(errors), max(errors)
+
+def main(rates=(200, 1000, 5000), duration=3.0, replay=None, speed=1.0):
+    pool = NoisePool('192.168.1.100', 80)
+    print(f"{'distribution':>12} {'target/s':>9} {'sent/s':>9} {'gap CV':>7} {'CPU us/packet':>14}")
+    for rate in rates:
+        for distribution in ARRIVALS:
+            achieved, cv, cpu = run(distribution, rate, duration, pool)
+            print(f"{distribution:>12} {rate:9d} {achieved:9.0f} {cv:7.2f} {cpu * 1e6:14.1f}")
+    if replay:
+        packets, mean_error, max_error = replay_accuracy(replay, speed)
+        print(f"\nreplay of {packets} packets at {speed}x: mean timing error {mean_error * 1e6:.0f} us, worst {max_error * 1e6:.0f} us")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cover traffic engine benchmark")
+    parser.add_argument("--rate", type=int, action="append", help="Target packets per second (repeatable)")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run")
+    parser.add_argument("--replay", help="Also measure replay timing accuracy on this pcap/pcapng")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+    args = parser.parse_args()
+    main(tuple(args.rate or (200, 1000, 5000)), args.duration, args.replay, args.speed)
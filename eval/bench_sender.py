@@ -0,0 +1,46 @@
+# bench_sender.py
+# Compare packets/s of scapy send() per packet against the persistent sender.
+# Requires root (raw sockets).
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from scapy.all import IP, send
+import encoder.sender as packet_sender
+from encoder.packet_template import PacketTemplate
+
+header_bit_fields = [('ipid', 8), ('ttl', 4), ('window', 12)]
+
+def main(count=500, destination_ip='127.0.0.1', destination_port=8080):
+    template = PacketTemplate(destination_ip, destination_port, header_bit_fields)
+    packets = [template.build([i & 0xFF, i & 0x0F, i & 0xFFF], 1024 + i % 60000) for i in range(count)]
+
+    start = time.perf_counter()
+    for data in packets:
+        send(IP(data), verbose=0)
+    scapy_time = time.perf_counter() - start
+
+    sender = packet_sender.acquire_sender()
+    try:
+        start = time.perf_counter()
+        for data in packets:
+            sender.send(data, destination_ip)
+        sender_time = time.perf_counter() - start
+        backend = 'raw socket' if sender.sock is not None else 'conf.L3socket'
+    finally:
+        packet_sender.release_sender()
+
+    print(f"packets:              {count} to {destination_ip}")
+    print(f"scapy send():         {count / scapy_time:10.0f} packets/s")
+    print(f"persistent sender:    {count / sender_time:10.0f} packets/s ({backend})")
+    print(f"speedup:              {scapy_time / sender_time:10.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Packet sender benchmark")
+    parser.add_argument("--count", type=int, default=500, help="Number of packets to send with each method")
+    parser.add_argument("--destination_ip", default='127.0.0.1', help="Destination IP address")
+    args = parser.parse_args()
+    main(count=args.count, destination_ip=args.destination_ip)
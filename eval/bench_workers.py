@@ -0,0 +1,102 @@
+# bench_workers.py
+# Decode throughput of a replayed pcap with many concurrent senders: one
+# in-process Decoder vs. the flow-sharded worker pool at 1..N workers.
+import argparse
+import contextlib
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from scapy.all import Ether, RawPcapReader, RawPcapWriter
+import decoder.decoder as decoder
+from decoder.fast_parser import LINKTYPE_ETHERNET
+from decoder.workers import ParallelDecoder
+from encoder.bitpack import iter_field_values, nul_terminated
+from encoder.packet_template import PacketTemplate
+
+header_bit_fields = [('ipid', 16), ('ttl', 4), ('window', 16)]
+WORDS = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel']
+
+def write_pcap(path, flows, message_bytes, destination_ip='192.168.1.100', destination_port=80):
+    """Write one message per sender, interleaved round-robin; return ({source ip: message}, packet count)."""
+    template = PacketTemplate(destination_ip, destination_port, header_bit_fields)
+    ether = bytes(Ether(src='02:00:00:00:00:01', dst='02:00:00:00:00:02', type=0x0800))
+    data_bits = sum(bits for _, bits in header_bit_fields)
+    messages = {}
+    senders = []
+    for i in range(flows):
+        source = f"10.{i // 250}.{i % 250}.1"
+        text = ''
+        while len(text) < message_bytes:
+            text += random.choice(WORDS) + ' '
+        messages[source] = text
+        values = iter_field_values(nul_terminated([text.encode()], data_bits), header_bit_fields)
+        senders.append((bytes(int(part) for part in source.split('.')), values))
+    writer = RawPcapWriter(path, linktype=LINKTYPE_ETHERNET)
+    count = 0
+    while senders:
+        for sender in list(senders):
+            source, values = sender
+            field_values = next(values, None)
+            if field_values is None:
+                senders.remove(sender)
+                continue
+            frame = bytearray(template.build(field_values, random.randint(1024, 65535)))
+            # Only the source address differs between senders; the decoder does not verify checksums
+            frame[12:16] = source
+            writer.write(ether + bytes(frame))
+            count += 1
+    writer.close()
+    return messages, count
+
+def replay(path, target):
+    """Feed every frame of the pcap to target and wait until it has decoded them all."""
+    start = time.perf_counter()
+    for data, _ in RawPcapReader(path):
+        target.handle_raw(data, LINKTYPE_ETHERNET)
+    target.flush()
+    return time.perf_counter() - start
+
+def check(target, messages):
+    return sum(target.text(source) == text for source, text in messages.items())
+
+def main(flows=256, message_bytes=200, max_workers=None):
+    max_workers = max_workers or multiprocessing.cpu_count()
+    random.seed(1)
+    config = decoder.DecoderConfig(header_bit_fields)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'flows.pcap')
+        messages, count = write_pcap(path, flows, message_bytes)
+        print(f"packets: {count} from {flows} senders, {os.cpu_count()} CPUs")
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            reader_start = time.perf_counter()
+            for data, _ in RawPcapReader(path):
+                pass
+            reader_time = time.perf_counter() - reader_start
+            single = decoder.Decoder(config, echo=False)
+            single_time = replay(path, single)
+        print(f"{'pcap read only':>18} {count / reader_time:12.0f} packets/s")
+        print(f"{'in-process':>18} {count / single_time:12.0f} packets/s  {check(single, messages)}/{flows} messages intact")
+
+        base_rate = None
+        for workers in sorted({min(1 << i, max_workers) for i in range(max_workers.bit_length() + 1)}):
+            pool = ParallelDecoder(config, workers=workers, echo=False, batch_size=512)
+            elapsed = replay(path, pool)
+            rate = count / elapsed
+            base_rate = base_rate or rate
+            label = f"{workers} worker{'s' if workers > 1 else ''}"
+            print(f"{label:>18} {rate:12.0f} packets/s  {rate / base_rate:5.2f}x  {check(pool, messages)}/{flows} messages intact")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Worker pool decode scaling benchmark")
+    parser.add_argument("--flows", type=int, default=256, help="Number of concurrent senders in the pcap")
+    parser.add_argument("--message_bytes", type=int, default=200, help="Message length per sender")
+    parser.add_argument("--workers", type=int, default=None, help="Largest worker count to try (default: CPU count)")
+    args = parser.parse_args()
+    main(flows=args.flows, message_bytes=args.message_bytes, max_workers=args.workers)
@@ -0,0 +1,257 @@
+# benchmark.py
+# Benchmark suite: encoder/decoder microbenchmarks, end-to-end encode -> pcap ->
+# decode goodput and peak memory. Results are written as JSON and compared
+# against a stored baseline so regressions beyond a threshold fail the run.
+#
+#   python eval/benchmark.py                       # run, compare with eval/baseline.json
+#   python eval/benchmark.py --output results.json
+#   python eval/benchmark.py --save_baseline       # record a new baseline
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+import encoder.encoder as encoder
+import encoder.stego_utils as stego_utils
+import decoder.decoder as decoder
+from encoder.packet_template import PacketTemplate
+from encoder.sender import PcapSender
+from encoder.transport import iter_pcap_frames
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DESTINATION_IP = '192.168.1.100'
+DESTINATION_PORT = 80
+
+# Per-field widths used by the embed microbenchmarks
+FIELD_BITS = [('ipid', 16), ('ttl', 4), ('window', 16), ('tcp_reserved', 3), ('tcp_options', 32), ('ip_options', 32), ('user_agent', 7)]
+
+# Field configurations for the end-to-end runs
+CONFIGURATIONS = {
+    'ipid_ttl': [('ipid', 16), ('ttl', 4)],
+    'ipid_ttl_window': [('ipid', 16), ('ttl', 4), ('window', 16)],
+    'all_fields': [('ipid', 8), ('ttl', 4), ('window', 8), ('tcp_reserved', 3), ('tcp_options', 16), ('ip_options', 16), ('user_agent', 5)],
+}
+MESSAGE_SIZES = [64, 1024, 16384]
+
+WORDS = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel', 'india', 'juliett']
+
+def make_message(size, rng):
+    text = ''
+    while len(text) < size:
+        text += rng.choice(WORDS) + ' '
+    return text[:size]
+
+def time_per_call(fn, number, repeat=5):
+    """Best-of-repeat seconds per call of fn()."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def add(results, name, value, unit, better, timed=True):
+    results[name] = {'value': value, 'unit': unit, 'better': better, 'timed': timed}
+
+def calibration_loop():
+    total = 0
+    for i in range(10000):
+        total += i * i % 7
+    return total
+
+def calibrate(results):
+    """Time a fixed pure-Python loop so timings can be compared across machine speed changes."""
+    seconds = time_per_call(calibration_loop, 50)
+    add(results, 'calibration.loop', seconds * 1e6, 'us', 'lower', timed=False)
+
+def micro_benchmarks(results, scale):
+    rng = random.Random(0)
+    message = make_message(1024, rng)
+    seconds = time_per_call(lambda: encoder.encode_message(message), 2000 * scale)
+    add(results, 'micro.encode_message.1024B', seconds * 1e6, 'us', 'lower')
+
+    fields = CONFIGURATIONS['ipid_ttl_window']
+    seconds = time_per_call(lambda: encoder.split_into_chunks(message.encode(), fields), 20 * scale)
+    add(results, 'micro.split_into_chunks.1024B', seconds * 1e6, 'us', 'lower')
+
+    # Embedding one field into a prebuilt scapy packet; every call gets a fresh copy
+    # because embedding options grows the packet
+    base = stego_utils.build_covert_packet(DESTINATION_IP, DESTINATION_PORT, 40000)
+    for header, bits in FIELD_BITS:
+        value = rng.getrandbits(bits)
+        best = float('inf')
+        for _ in range(5):
+            packets = [base.copy() for _ in range(200 * scale)]
+            start = time.perf_counter()
+            for pkt in packets:
+                stego_utils.embed_data_into_packet(pkt, [value], [(header, bits)], False)
+            best = min(best, (time.perf_counter() - start) / len(packets))
+        add(results, f'micro.embed.{header}', best * 1e6, 'us', 'lower')
+
+    # Building a whole packet: scapy path vs. precompiled template
+    fields = CONFIGURATIONS['all_fields']
+    values = [rng.getrandbits(bits) for _, bits in fields]
+    def build_scapy():
+        pkt = stego_utils.build_covert_packet(DESTINATION_IP, DESTINATION_PORT, 40000)
+        return bytes(stego_utils.embed_data_into_packet(pkt, values, fields, False))
+    seconds = time_per_call(build_scapy, 50 * scale)
+    add(results, 'micro.build_packet.scapy', seconds * 1e6, 'us', 'lower')
+    template = PacketTemplate(DESTINATION_IP, DESTINATION_PORT, fields)
+    seconds = time_per_call(lambda: template.build(values, 40000), 2000 * scale)
+    add(results, 'micro.build_packet.template', seconds * 1e6, 'us', 'lower')
+
+    # Decoding one packet: raw fast path vs. scapy dissection
+    frame = template.build(values, 40000)
+    config = decoder.DecoderConfig(fields)
+    covert_decoder = decoder.Decoder(config, echo=False)
+    seconds = time_per_call(lambda: covert_decoder.handle_raw(frame), 2000 * scale)
+    add(results, 'micro.decode_packet.fast_path', seconds * 1e6, 'us', 'lower')
+    from scapy.all import IP
+    seconds = time_per_call(lambda: covert_decoder.handle_packet(IP(frame)), 50 * scale)
+    add(results, 'micro.decode_packet.scapy', seconds * 1e6, 'us', 'lower')
+
+def encode_to_pcap(path, message, fields):
+    sender = PcapSender(path, interval=0.001)
+    try:
+        for pkt_bytes in encoder.iter_packets(DESTINATION_IP, DESTINATION_PORT, message, fields, 'none', 0, False, False):
+            sender.send(pkt_bytes, DESTINATION_IP)
+    finally:
+        sender.close()
+    return sender.count
+
+def decode_from_pcap(path, fields):
+    covert_decoder = decoder.Decoder(decoder.DecoderConfig(fields), echo=False, idle_timeout=None)
+    for data, linktype in iter_pcap_frames(path):
+        covert_decoder.handle_raw(data, linktype)
+    covert_decoder.flush()
+    return covert_decoder.text()
+
+def macro_benchmarks(results, tmp, sizes=MESSAGE_SIZES, repeat=5):
+    """Encode each message to a pcap and decode it back; best of repeat runs."""
+    rng = random.Random(1)
+    path = os.path.join(tmp, 'macro.pcap')
+    for name, fields in CONFIGURATIONS.items():
+        for size in sizes:
+            message = make_message(size, rng)
+            encoded = decoded = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                packets = encode_to_pcap(path, message, fields)
+                middle = time.perf_counter()
+                decoded_text = decode_from_pcap(path, fields)
+                encoded = min(encoded, middle - start)
+                decoded = min(decoded, time.perf_counter() - middle)
+                if decoded_text != message:
+                    raise RuntimeError(f"{name}/{size}B: decoded message does not match")
+            prefix = f'macro.{name}.{size}B'
+            add(results, f'{prefix}.goodput', size * 8 / (encoded + decoded) / 1000, 'kbit/s', 'higher')
+            add(results, f'{prefix}.encode_rate', packets / encoded, 'packets/s', 'higher')
+            add(results, f'{prefix}.decode_rate', packets / decoded, 'packets/s', 'higher')
+            add(results, f'{prefix}.bits_per_packet', size * 8 / packets, 'bits', 'higher', timed=False)
+
+def memory_benchmarks(results, tmp, size=MESSAGE_SIZES[-1]):
+    message = make_message(size, random.Random(2))
+    fields = CONFIGURATIONS['ipid_ttl_window']
+    path = os.path.join(tmp, 'memory.pcap')
+    for stage, run in (('encode', lambda: encode_to_pcap(path, message, fields)), ('decode', lambda: decode_from_pcap(path, fields))):
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        add(results, f'memory.{stage}.{size}B.peak', peak / 1024, 'KiB', 'lower', timed=False)
+
+def compare(results, baseline, threshold):
+    """Print each metric against the baseline and return the names that regressed.
+
+    Timed metrics are first scaled by how much slower the calibration loop
+    ran than in the baseline, so a slower or throttled machine alone does not
+    count as a regression.
+    """
+    regressions = []
+    speed = 1.0
+    if 'calibration.loop' in results and 'calibration.loop' in baseline:
+        speed = results['calibration.loop']['value'] / baseline['calibration.loop']['value']
+        print(f"machine speed vs. baseline: {1 / speed:.2f}x (timings normalized)\n")
+    print(f"{'metric':<48} {'value':>12} {'baseline':>12} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        value = result['value']
+        if name == 'calibration.loop':
+            continue
+        if base is None or not base['value']:
+            print(f"{name:<48} {value:12.2f} {'-':>12} {'new':>8}")
+            continue
+        if result.get('timed', True):
+            value = value / speed if result['better'] == 'lower' else value * speed
+        change = value / base['value'] - 1
+        worse = -change if result['better'] == 'higher' else change
+        flag = ''
+        if worse > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<48} {value:12.2f} {base['value']:12.2f} {change:+8.1%}{flag}")
+    return regressions
+
+def run_suite(scale=1, suites=('micro', 'macro', 'memory')):
+    results = {}
+    calibrate(results)
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        if 'micro' in suites:
+            micro_benchmarks(results, scale)
+        if 'macro' in suites:
+            macro_benchmarks(results, tmp)
+        if 'memory' in suites:
+            memory_benchmarks(results, tmp)
+    return results
+
+def main(output=None, baseline_path=DEFAULT_BASELINE, threshold=0.25, save_baseline=False, scale=1, suites=('micro', 'macro', 'memory')):
+    results = run_suite(scale, suites)
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'metrics': results,
+    }
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)['metrics']
+    regressions = compare(results, baseline, threshold)
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {threshold:.0%}")
+        return 1
+    print(f"\nNo regressions beyond {threshold:.0%}")
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Covert channel benchmark suite")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative slowdown that counts as a regression")
+    parser.add_argument("--save_baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply microbenchmark iteration counts")
+    parser.add_argument("--suite", action="append", choices=['micro', 'macro', 'memory'], help="Run only these suites (repeatable)")
+    args = parser.parse_args()
+    sys.exit(main(args.output, args.baseline, args.threshold, args.save_baseline, args.scale, tuple(args.suite or ('micro', 'macro', 'memory'))))
@@ -1,4 +1,5 @@
 # evaluate.py
+import argparse
 import threading
 import time
 import random
@@ -21,7 +22,7 @@ headers_info = {
     'user_agent': {'max_bits': 8},     # Modifiable within the constraints
 }
 
-def main(msg_len=20, msg_count=2, verbose=False, buffer_time_to_load=5):
+def main(msg_len=20, msg_count=2, verbose=False, buffer_time_to_load=5, pcap_path=None):
     # Define the destination IP and port
     destination_ip = '192.168.1.100'  # Use localhost for testing
     destination_port = 80      # Use a test port
@@ -48,6 +49,15 @@ def main(msg_len=20, msg_count=2, verbose=False, buffer_time_to_load=5):
         print(f"Message {i + 1}: {message}")
     print()
     
+    if pcap_path is not None:
+        # Offline: write the packets to a capture file, then decode it, with no sniffing or sleeps
+        encoder.start_encoder(load_config=True, use_noise=True, messages=messages, verbose=verbose, delay=0, pcap_path=pcap_path)
+        decoded = decoder.decode_pcap(pcap_path, verbose=verbose).text()
+        print(f"\nDecoded: {decoded}")
+        print(f"Match: {decoded == ''.join(messages)}")
+        print("\nEvaluation completed.")
+        return
+
     # Start the decoder in a separate thread
     # May need to adjust timeout if verbose is on
     decoder_thread = threading.Thread(target=lambda: decoder.start_decoder(timeout=buffer_time_to_load, verbose=verbose))
@@ -71,4 +81,7 @@ def main(msg_len=20, msg_count=2, verbose=False, buffer_time_to_load=5):
     print("\nEvaluation completed.")
 
 if __name__ == '__main__':
-    main(msg_len=8, msg_count=1,verbose=True,buffer_time_to_load=5)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="End-to-end encoder/decoder evaluation")
+    parser.add_argument("--pcap", help="Run offline through this capture file instead of live sniffing")
+    args = parser.parse_args()
+    main(msg_len=8, msg_count=1,verbose=True,buffer_time_to_load=5, pcap_path=args.pcap)
\ No newline at end of file
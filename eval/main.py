@@ -20,6 +20,14 @@ def send_encoded_message(destination_ip, destination_port, message):
     encoder.send_covert_message(destination_ip, destination_port, message)
     print("Encoded message sent successfully.")
 
+def send_encoded_file(destination_ip, destination_port, path):
+    """Function to stream a file (or stdin for '-') as an encoded message."""
+    print(f"Streaming {path} to {destination_ip}:{destination_port}")
+    # The saved configuration's version/session prefix and seq/FEC/compression framing must match the decoder's
+    config = encoder.stego_config.load_config()
+    encoder.send_covert_stream(destination_ip, destination_port, path, config.header_bit_fields, 'none', 0, False, False, **encoder.framing(config))
+    print("Encoded file sent successfully.")
+
 def decode_message(port, timeout):
     """Function to capture and decode packets to retrieve the covert message."""
     print(f"Sniffing packets on port {port} for {timeout} seconds...")
@@ -36,6 +44,7 @@ if __name__ == "__main__":
     parser.add_argument("destination_ip", nargs='?', help="Destination IP address")
     parser.add_argument("destination_port", type=int, nargs='?', help="Destination port number (required for decode)")
     parser.add_argument("--message", help="Message to send (required for send_message)", default="")
+    parser.add_argument("--file", help="File to stream as the message for send_message ('-' for stdin)")
     parser.add_argument("--timeout", type=int, help="Sniffing duration in seconds for decoding (default: 30)", default=30)
 
     args = parser.parse_args()
@@ -53,10 +62,12 @@ if __name__ == "__main__":
             print("Error: Destination IP and port are required for starting network noise.")
 
     elif args.action == "send_message":
-        if args.destination_ip and args.destination_port and args.message:
+        if args.destination_ip and args.destination_port and args.file:
+            send_encoded_file(args.destination_ip, args.destination_port, args.file)
+        elif args.destination_ip and args.destination_port and args.message:
             send_encoded_message(args.destination_ip, args.destination_port, args.message)
         else:
-            print("Error: Destination IP, port, and --message are required for sending an encoded message.")
+            print("Error: Destination IP, port, and --message or --file are required for sending an encoded message.")
 
     elif args.action == "decode":
         if args.destination_port is not None:
@@ -69,6 +80,7 @@ if __name__ == "__main__":
 # python network_noise_generator.py 127.0.0.1 8080 --server (Start the HTTP server and background noise generator)
 # python network_noise_generator.py 127.0.0.1 8080 (Run just the noise generator without the server)
 # python main.py send_message 127.0.0.1 8080 --message "Hello, this is a covert message"
+# python main.py send_message 127.0.0.1 8080 --file payload.bin
 # python main.py decode 127.0.0.1 8080 --timeout 30
 
 # For local testing